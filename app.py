@@ -1,14 +1,37 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import uuid
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import os
+import atexit
+import csv
+import io
+import json
 
 # Import configuration
 from config import config
+from db_pool import ConnectionPool
+from write_buffer import SessionProgressBuffer, UserAccessBuffer
+import migrations
+from backup import BackupManager
+from book_renderer import BookRenderer
+from catalog import BookCatalog, UnknownBook, validate_slug
+from page_archive import InvalidArchive, PageArchive
+from static_assets import StaticAssets
+from versioned_cache import VersionedCache
+from profiling import RequestProfiler
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, QUERY_BUCKETS, MetricsRegistry,
+                     RequestMetrics, RequestTracer, timed_connection_factory)
+from progress_sync import ProgressHub
+from library_ids import LibraryIdGenerator, SequenceExhausted, normalize as normalize_library_id
+from provisioning import COLUMNS as PROVISIONING_COLUMNS, FORMATS as PROVISIONING_FORMATS, provision_users
+from maintenance import SessionReaper
+from events import InvalidEvent, apply_batch, parse_batch
+from pagination import InvalidCursor, encode_cursor, decode_cursor, parse_limit
 
 # Get environment
 env = os.environ.get('FLASK_ENV', 'development')
@@ -24,151 +47,233 @@ app.config.from_object(app_config)
 # Configure CORS with origins from config
 CORS(app, origins="*", allow_headers="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
+# Verbose per-request logging only for a sampled fraction of requests
+trace = RequestTracer(logger, sample_rate=app_config.TRACE_SAMPLE_RATE)
+trace.init_app(app)
+
+# Profiling hooks are only registered when enabled, so they cost nothing otherwise
+profiler = RequestProfiler.from_config(app_config)
+if app_config.PROFILING_ENABLED:
+    profiler.init_app(app)
+
+# Prometheus-style metrics, served at /metrics
+metrics = MetricsRegistry()
+pool_options = {}
+if app_config.METRICS_ENABLED:
+    RequestMetrics(metrics).init_app(app)
+    query_latency = metrics.histogram(
+        'sqlite_query_duration_seconds', 'SQLite statement execution time',
+        ('statement',), buckets=QUERY_BUCKETS)
+    pool_wait = metrics.histogram(
+        'sqlite_pool_wait_seconds', 'Time spent acquiring a pooled connection',
+        buckets=QUERY_BUCKETS)
+    pool_options = {
+        'connection_factory': timed_connection_factory(query_latency),
+        'wait_observer': pool_wait.observe,
+    }
+
+# Shared connection pool (connections are opened lazily)
+db_pool = ConnectionPool.from_config(app_config, **pool_options)
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(app_config.DATABASE_URL)
-    conn.row_factory = sqlite3.Row  # Enable row factory for better data access
-    try:
+    """Context manager for pooled database connections"""
+    with db_pool.connection() as conn:
         yield conn
-    finally:
-        conn.close()
+
+# Page-turn heartbeats are coalesced in memory and flushed in batches
+progress_buffer = SessionProgressBuffer(
+    get_db_connection,
+    flush_interval=app_config.PROGRESS_FLUSH_INTERVAL,
+    max_pending=app_config.PROGRESS_FLUSH_MAX_PENDING
+)
+
+# Login access_count/last_access increments, coalesced per user
+access_buffer = UserAccessBuffer(
+    get_db_connection,
+    flush_interval=app_config.ACCESS_FLUSH_INTERVAL,
+    max_pending=app_config.ACCESS_FLUSH_MAX_PENDING
+)
+
+def load_session_progress(session_ids, chunk_size=500):
+    """Latest pages_read per session, preferring values still in the write buffer"""
+    progress = {}
+    with get_db_connection() as conn:
+        for i in range(0, len(session_ids), chunk_size):
+            chunk = session_ids[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT id, pages_read FROM user_sessions WHERE id IN ({placeholders})', chunk
+            )
+            progress.update((row[0], row[1]) for row in rows)
+    for session_id in progress:
+        pending = progress_buffer.peek(session_id)
+        if pending is not None:
+            progress[session_id] = pending
+    return progress
+
+# Long-poll progress waiters (served by asgi.py); blocking reads use a bounded executor
+db_executor = ThreadPoolExecutor(max_workers=app_config.DB_POOL_SIZE, thread_name_prefix='db')
+progress_hub = ProgressHub(
+    load_session_progress,
+    db_executor,
+    poll_interval=app_config.PROGRESS_POLL_INTERVAL
+)
+
+# Book pages are split into templates once and rendered per name pair
+book = BookRenderer.from_path(
+    os.path.join(app.root_path, app_config.BOOK_SOURCE),
+    female_placeholder=app_config.BOOK_FEMALE_PLACEHOLDER,
+    male_placeholder=app_config.BOOK_MALE_PLACEHOLDER,
+    cache_size=app_config.PAGE_CACHE_SIZE
+)
+
+# Pre-rendered page responses for common name pairs, mmapped and shared through the OS page cache
+page_archive = None
+if app_config.PAGE_ARCHIVE:
+    try:
+        page_archive = PageArchive.for_source(
+            os.path.join(app.root_path, app_config.PAGE_ARCHIVE),
+            os.path.join(app.root_path, app_config.BOOK_SOURCE),
+            book
+        )
+    except (OSError, InvalidArchive) as e:
+        logger.warning(f"Page archive disabled: {e}")
+
+# Every other book is opened through the catalog, with a page cache per open edition
+catalog = BookCatalog(
+    get_db_connection,
+    app.root_path,
+    open_books=app_config.CATALOG_OPEN_BOOKS,
+    page_cache_size=app_config.PAGE_CACHE_SIZE,
+    resolve_ttl=app_config.CATALOG_RESOLVE_TTL
+)
+
+# Frontend assets are hashed and precompressed once at startup
+static_assets = StaticAssets(
+    os.path.join(app.root_path, 'frontend'),
+    auto_reload=app_config.STATIC_AUTO_RELOAD
+)
+
+# Library IDs come from block-allocated sequence numbers through a keyed permutation
+library_id_generator = LibraryIdGenerator(
+    get_db_connection,
+    key=app_config.LIBRARY_ID_KEY,
+    block_size=app_config.LIBRARY_ID_BLOCK_SIZE
+)
+
+# User stats payloads, valid until the user's stats_version changes
+user_stats_cache = VersionedCache(maxsize=app_config.USER_STATS_CACHE_SIZE)
+
+# Online backups run in the background with the SQLite backup API
+backup_manager = BackupManager(
+    app_config.DATABASE_URL,
+    get_db_connection,
+    backup_dir=app_config.BACKUP_DIR,
+    retention=app_config.BACKUP_RETENTION,
+    pages_per_step=app_config.BACKUP_PAGES_PER_STEP,
+    step_sleep=app_config.BACKUP_STEP_SLEEP
+)
+
+# Idle sessions are closed and old ones archived in the background
+session_reaper = SessionReaper(
+    get_db_connection,
+    app_config.SESSION_ARCHIVE_URL,
+    idle_timeout=app_config.SESSION_IDLE_TIMEOUT,
+    retention_days=app_config.SESSION_RETENTION_DAYS,
+    event_retention_days=app_config.PROCESSED_EVENTS_RETENTION_DAYS,
+    chunk_size=app_config.MAINTENANCE_CHUNK_SIZE,
+    interval=app_config.MAINTENANCE_INTERVAL,
+    # Workers of one in-memory database share nothing, so there is no one to elect
+    lock_path=None if app_config.DATABASE_URL == ':memory:' else app_config.MAINTENANCE_LOCK
+)
 
 def migrate_database():
-    """Migrate existing database to new schema"""
+    """Bring the database schema up to the latest migration version"""
     try:
         with get_db_connection() as conn:
-            c = conn.cursor()
-            
-            # Check if user_names table exists and get its current schema
-            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_names'")
-            if not c.fetchone():
-                logger.info("user_names table doesn't exist, will be created by init_db()")
-                return
-            
-            # Get current schema
-            c.execute('PRAGMA table_info(user_names)')
-            current_columns = [row[1] for row in c.fetchall()]
-            logger.info(f"Current user_names columns: {current_columns}")
-            
-            # Check if we need to migrate
-            required_columns = ['id', 'user_id', 'female_name', 'male_name', 'created_at', 'usage_count']
-            missing_columns = [col for col in required_columns if col not in current_columns]
-            
-            if not missing_columns:
+            before = migrations.current_version(conn)
+            applied = migrations.migrate(conn)
+            if applied:
+                logger.info(f"Database migrated from version {before} to {applied[-1]}")
+            else:
                 logger.info("Database schema is up to date")
-                return
-            
-            logger.info(f"Missing columns: {missing_columns}")
-            
-            # Create backup of existing data
-            c.execute('SELECT * FROM user_names')
-            existing_data = c.fetchall()
-            logger.info(f"Backing up {len(existing_data)} existing records")
-            
-            # Drop and recreate table with correct schema
-            c.execute('DROP TABLE user_names')
-            c.execute('''
-                CREATE TABLE user_names (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    female_name TEXT NOT NULL,
-                    male_name TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    usage_count INTEGER DEFAULT 1,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            # Restore data with default values for new columns
-            for row in existing_data:
-                # Assuming old schema had: female_name, male_name, timestamp
-                female_name = row[0] if len(row) > 0 else ''
-                male_name = row[1] if len(row) > 1 else ''
-                timestamp = row[2] if len(row) > 2 else datetime.now()
-                
-                # Use a default user_id for existing records
-                default_user_id = str(uuid.uuid4())
-                
-                c.execute('''
-                    INSERT INTO user_names (user_id, female_name, male_name, created_at, usage_count)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (default_user_id, female_name, male_name, timestamp, 1))
-            
-            conn.commit()
-            logger.info("Database migration completed successfully")
-            
     except Exception as e:
         logger.error(f"Database migration failed: {e}")
         raise
 
 def init_db():
+    """Create or upgrade the database schema"""
+    migrate_database()
+
+_default_book_registered = False
+
+def default_book_slug():
+    """Slug of the configured book, registering its edition in the catalog on first use"""
+    global _default_book_registered
+    if not _default_book_registered:
+        catalog.ensure(app_config.BOOK_SLUG, app_config.BOOK_TITLE, app_config.BOOK_AUTHOR,
+                       app_config.BOOK_SOURCE, book.default_female, book.default_male,
+                       renderer=book)
+        _default_book_registered = True
+    return app_config.BOOK_SLUG
+
+def warm_up():
+    """Prime the pool and render caches before a worker takes traffic"""
+    # Fails startup if LIBRARY_ID_KEY no longer matches the stored key
+    library_id_generator.codec
+    default_book_slug()
     with get_db_connection() as conn:
-        c = conn.cursor()
-        
-        # Users table for library card system
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                library_id TEXT UNIQUE NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_access DATETIME DEFAULT CURRENT_TIMESTAMP,
-                access_count INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # User sessions table to track each reading session
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                session_start DATETIME DEFAULT CURRENT_TIMESTAMP,
-                session_end DATETIME,
-                pages_read INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # User names table to track names used by each user
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS user_names (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                female_name TEXT NOT NULL,
-                male_name TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                usage_count INTEGER DEFAULT 1,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
+        # Most used name pairs first; the defaults are what new readers see
+        pairs = conn.execute('''
+            SELECT female_name, male_name FROM user_names
+            GROUP BY female_name, male_name
+            ORDER BY SUM(usage_count) DESC
+            LIMIT ?
+        ''', (app_config.WARMUP_NAME_PAIRS,)).fetchall()
     
-    # Run migration after init_db
-    migrate_database()
+    pairs = [(book.default_female, book.default_male)] + [tuple(p) for p in pairs]
+    for female, male in pairs:
+        if validate_names(female, male):
+            continue
+        for page in book.templates:
+            book.render_page(page, female, male)
+    logger.info(f"Warm-up rendered {len(book.templates)} pages for {len(pairs)} name pairs")
+
+def start_background_jobs():
+    """Start periodic maintenance once the schema is current"""
+    if app_config.MAINTENANCE_ENABLED:
+        session_reaper.start()
+
+_shutdown_done = False
+
+def shutdown():
+    """Drain pending writes and close pooled connections (safe to call twice)"""
+    global _shutdown_done
+    if _shutdown_done:
+        return
+    _shutdown_done = True
+    session_reaper.stop()
+    progress_buffer.stop()
+    access_buffer.stop()
+    db_executor.shutdown(wait=True)
+    if not backup_manager.wait(timeout=app_config.GRACEFUL_TIMEOUT):
+        logger.warning("Shutting down with a backup still running")
+    db_pool.close_all()
+
+atexit.register(shutdown)
 
 def generate_library_id():
     """Generate a unique library ID in format: LIB-XXXX-XXXX"""
-    import random
-    import string
-    chars = string.ascii_uppercase + string.digits
-    part1 = ''.join(random.choice(chars) for _ in range(4))
-    part2 = ''.join(random.choice(chars) for _ in range(4))
-    return f"LIB-{part1}-{part2}"
-
-def backup_database():
-    """Create a backup of the database"""
-    import shutil
-    from datetime import datetime
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"names_backup_{timestamp}.db"
-        shutil.copy2(app_config.DATABASE_URL, backup_filename)
-        logger.info(f"Database backed up to {backup_filename}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to backup database: {e}")
-        return False
+    return library_id_generator.next_id()
+
+def validate_names(female, male):
+    """Return an error message if a character name pair is not acceptable"""
+    if len(female) > 50 or len(male) > 50:
+        return 'Names must be 50 characters or less'
+    if not female.replace(' ', '').isalnum() or not male.replace(' ', '').isalnum():
+        return 'Names can only contain letters, numbers, and spaces'
+    return None
 
 @app.route('/api/create-user', methods=['POST'])
 def create_user():
@@ -188,18 +293,77 @@ def create_user():
             'library_id': library_id,
             'message': 'User created successfully'
         })
+    except SequenceExhausted as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/users/bulk', methods=['POST'])
+def create_users_bulk():
+    """Create many users in one transaction and stream their library IDs as CSV or NDJSON"""
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', request.args.get('format', 'csv'))
+    
+    if fmt not in PROVISIONING_FORMATS:
+        return jsonify({'success': False, 'error': 'Format must be csv or ndjson'}), 400
+    try:
+        count = int(data.get('count'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'count must be an integer'}), 400
+    if not 1 <= count <= app_config.BULK_USERS_MAX:
+        return jsonify({'success': False, 'error': f'count must be between 1 and {app_config.BULK_USERS_MAX}'}), 400
+    
+    try:
+        library_ids = library_id_generator.next_ids(count)
+        with get_db_connection() as conn:
+            users = provision_users(conn, library_ids)
+    except SequenceExhausted as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        logger.exception(f"Bulk creation of {count} users failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    logger.info(f"Provisioned {count} users")
+    batch_size = app_config.EXPORT_BATCH_SIZE
+    batches = (users[i:i + batch_size] for i in range(0, count, batch_size))
+    if fmt == 'csv':
+        body = _export_csv(PROVISIONING_COLUMNS, batches)
+        mimetype = 'text/csv'
+    else:
+        body = _export_ndjson(PROVISIONING_COLUMNS, batches)
+        mimetype = 'application/x-ndjson'
+    
+    filename = f"library-cards-{datetime.now().strftime('%Y-%m-%d-%H%M%S')}.{fmt}"
+    return Response(
+        body,
+        status=201,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                 'X-Users-Created': str(count)}
+    )
+
 @app.route('/api/login', methods=['POST'])
 def login_user():
     """Login user with library ID"""
     data = request.get_json()
-    library_id = data.get('library_id')
+    library_id = normalize_library_id(data.get('library_id'))
     
     if not library_id:
         return jsonify({'success': False, 'error': 'Library ID required'}), 400
     
+    # Typos fail the check digit and never reach the database
+    if not library_id_generator.accepts(library_id):
+        return jsonify({'success': False, 'error': 'Malformed Library ID'}), 400
+    
+    try:
+        # Resolved before taking a connection; cached lookups need none
+        book_slug = data.get('book') or default_book_slug()
+        book_id = catalog.book_id(book_slug)
+    except UnknownBook as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -213,29 +377,44 @@ def login_user():
             
             user_id, library_id, access_count = user
             
-            # Update access count and last access time
-            c.execute('''
-                UPDATE users 
-                SET access_count = access_count + 1, last_access = CURRENT_TIMESTAMP 
-                WHERE id = ?
-            ''', (user_id,))
-            
-            # Create new session
-            c.execute('''
-                INSERT INTO user_sessions (user_id, session_start) 
-                VALUES (?, CURRENT_TIMESTAMP)
-            ''', (user_id,))
-            
-            session_id = c.lastrowid
+            # Continue the user's latest open session of this book if it saw activity recently
+            session = None
+            if app_config.SESSION_RESUME_WINDOW > 0:
+                c.execute('''
+                    SELECT id, pages_read FROM user_sessions
+                    WHERE user_id = ? AND session_end IS NULL AND book_id = ?
+                      AND COALESCE(last_activity, session_start) >= datetime('now', ?)
+                    ORDER BY COALESCE(last_activity, session_start) DESC
+                    LIMIT 1
+                ''', (user_id, book_id, f'-{app_config.SESSION_RESUME_WINDOW} seconds'))
+                session = c.fetchone()
             
-            conn.commit()
+            if session:
+                session_id, pages_read = session
+                buffered = progress_buffer.peek(session_id)
+                if buffered is not None:
+                    pages_read = buffered
+            else:
+                c.execute('''
+                    INSERT INTO user_sessions (user_id, book_id, session_start) 
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                ''', (user_id, book_id))
+                session_id, pages_read = c.lastrowid, 0
+                conn.commit()
+        
+        # Access count and time are buffered and written in batches
+        pending = access_buffer.peek(user_id)
+        access_buffer.record(user_id, (1, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')))
         
         return jsonify({
             'success': True,
             'user_id': user_id,
             'library_id': library_id,
             'session_id': session_id,
-            'access_count': access_count + 1,
+            'book': book_slug,
+            'resumed': session is not None,
+            'pages_read': pages_read,
+            'access_count': access_count + (pending[0] if pending else 0) + 1,
             'message': 'Login successful'
         })
     except Exception as e:
@@ -244,89 +423,53 @@ def login_user():
 @app.route('/api/save-names', methods=['POST'])
 def save_names():
     """Save names for a specific user"""
-    logger.info("=== /api/save-names endpoint called ===")
-    
     try:
         data = request.get_json()
-        logger.info(f"Received data: {data}")
         
         user_id = data.get('user_id')
         female = data.get('female', '').strip()
         male = data.get('male', '').strip()
         
-        logger.info(f"Parsed values - user_id: {user_id}, female: {female}, male: {male}")
+        trace('save-names user_id=%s female=%s male=%s', user_id, female, male)
         
         # Input validation
         if not all([user_id, female, male]):
-            logger.warning("Missing required fields")
             return jsonify({'success': False, 'error': 'User ID and both names required'}), 400
         
         # Sanitize inputs (basic validation)
-        if len(female) > 50 or len(male) > 50:
-            logger.warning("Name length validation failed")
-            return jsonify({'success': False, 'error': 'Names must be 50 characters or less'}), 400
-        
-        if not female.replace(' ', '').isalnum() or not male.replace(' ', '').isalnum():
-            logger.warning("Name character validation failed")
-            return jsonify({'success': False, 'error': 'Names can only contain letters, numbers, and spaces'}), 400
-
-        logger.info("Input validation passed, connecting to database...")
+        error = validate_names(female, male)
+        if error:
+            trace('save-names validation failed: %s', error)
+            return jsonify({'success': False, 'error': error}), 400
         
         with get_db_connection() as conn:
             c = conn.cursor()
             
-            # Check if user exists
-            logger.info(f"Checking if user {user_id} exists...")
-            c.execute('SELECT id FROM users WHERE id = ?', (user_id,))
-            user_exists = c.fetchone()
-            if not user_exists:
-                logger.warning(f"User {user_id} not found")
-                return jsonify({'success': False, 'error': 'Invalid user ID'}), 404
-            
-            logger.info(f"User {user_id} found, checking for existing name combination...")
-            
-            # Check if this name combination already exists for this user
+            # Insert the combination or bump its usage in a single statement;
+            # nothing is written when the user does not exist
             c.execute('''
-                SELECT id, usage_count FROM user_names 
-                WHERE user_id = ? AND female_name = ? AND male_name = ?
-            ''', (user_id, female, male))
+                INSERT INTO user_names (user_id, female_name, male_name)
+                SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM users WHERE id = ?)
+                ON CONFLICT (user_id, female_name, male_name) DO UPDATE
+                SET usage_count = usage_count + 1, created_at = CURRENT_TIMESTAMP
+            ''', (user_id, female, male, user_id))
             
-            existing = c.fetchone()
-            logger.info(f"Existing name combination found: {existing}")
-            
-            if existing:
-                # Update usage count
-                name_id, current_count = existing
-                logger.info(f"Updating usage count for name_id {name_id} from {current_count} to {current_count + 1}")
-                c.execute('''
-                    UPDATE user_names 
-                    SET usage_count = usage_count + 1, created_at = CURRENT_TIMESTAMP 
-                    WHERE id = ?
-                ''', (name_id,))
-            else:
-                # Insert new name combination
-                logger.info(f"Inserting new name combination for user {user_id}")
-                c.execute('''
-                    INSERT INTO user_names (user_id, female_name, male_name) 
-                    VALUES (?, ?, ?)
-                ''', (user_id, female, male))
+            if c.rowcount == 0:
+                trace('save-names user %s not found', user_id)
+                return jsonify({'success': False, 'error': 'Invalid user ID'}), 404
             
             conn.commit()
-            logger.info("Database transaction committed successfully")
         
-        logger.info("=== /api/save-names completed successfully ===")
+        trace('save-names committed for user %s', user_id)
         return jsonify({'success': True, 'message': 'Names saved successfully'})
         
     except Exception as e:
-        logger.error(f"=== /api/save-names ERROR: {str(e)} ===")
-        logger.error(f"Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"/api/save-names failed: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/update-session', methods=['POST'])
 def update_session():
-    """Update session with pages read"""
+    """Queue the latest pages read for a session"""
     data = request.get_json()
     session_id = data.get('session_id')
     pages_read = data.get('pages_read', 0)
@@ -335,20 +478,16 @@ def update_session():
         return jsonify({'success': False, 'error': 'Session ID required'}), 400
     
     try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            
-            c.execute('''
-                UPDATE user_sessions 
-                SET pages_read = ? 
-                WHERE id = ?
-            ''', (pages_read, session_id))
-            
-            conn.commit()
-        
-        return jsonify({'success': True, 'message': 'Session updated'})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        session_id = int(session_id)
+        pages_read = int(pages_read)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Session ID and pages read must be integers'}), 400
+    
+    # Written by the background flusher; only the newest value per session is kept
+    progress_buffer.record(session_id, pages_read)
+    progress_hub.publish(session_id, pages_read)
+    
+    return jsonify({'success': True, 'message': 'Session update queued'}), 202
 
 @app.route('/api/end-session', methods=['POST'])
 def end_session():
@@ -359,124 +498,252 @@ def end_session():
     if not session_id:
         return jsonify({'success': False, 'error': 'Session ID required'}), 400
     
+    try:
+        session_id = int(session_id)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Session ID must be an integer'}), 400
+    
+    # Write any progress still waiting in the buffer together with the end time
+    pending_pages = progress_buffer.pop(session_id)
+    
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
             
             c.execute('''
                 UPDATE user_sessions 
-                SET session_end = CURRENT_TIMESTAMP 
+                SET session_end = CURRENT_TIMESTAMP,
+                    pages_read = COALESCE(?, pages_read)
                 WHERE id = ?
-            ''', (session_id,))
+            ''', (pending_pages, session_id))
             
             conn.commit()
         
         return jsonify({'success': True, 'message': 'Session ended'})
     except Exception as e:
+        # Nothing was written, so the popped progress goes back unless newer progress arrived
+        if pending_pages is not None:
+            progress_buffer.restore(session_id, pending_pages)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/events/batch', methods=['POST'])
+def ingest_events():
+    """Apply a batch of reader events in one transaction, skipping replayed ids"""
+    try:
+        # force=True: sendBeacon posts the JSON body as text/plain
+        user_id, events = parse_batch(request.get_json(force=True, silent=True), app_config.EVENT_BATCH_MAX, validate_names)
+    except InvalidEvent as e:
+        return jsonify({'success': False, 'error': str(e), 'index': e.index}), 400
+    
+    # Buffered heartbeats for these sessions are written in the same transaction
+    session_ids = {e['session_id'] for e in events if 'session_id' in e}
+    pending = {sid: pages for sid in session_ids
+               if (pages := progress_buffer.pop(sid)) is not None}
+    
+    try:
+        with get_db_connection() as conn:
+            results, progress = apply_batch(conn, user_id, events, pending)
+    except Exception as e:
+        # Nothing was written, so the popped heartbeats go back unless newer ones arrived
+        for sid, pages in pending.items():
+            progress_buffer.restore(sid, pages)
+        if isinstance(e, InvalidEvent):
+            return jsonify({'success': False, 'error': str(e), 'index': e.index}), 400
+        if isinstance(e, LookupError):
+            return jsonify({'success': False, 'error': str(e)}), 404
+        logger.exception(f"/api/events/batch failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    for session_id, pages_read in progress.items():
+        progress_hub.publish(session_id, pages_read)
+    
+    applied = sum(1 for r in results if r['status'] == 'applied')
+    return jsonify({
+        'success': True,
+        'applied': applied,
+        'duplicates': len(results) - applied,
+        'results': results
+    })
+
+def _load_user_stats(c, user_id, names_limit, names_offset):
+    """Build the user stats payload from the user row, its counters and one page of names"""
+    c.execute('''
+        SELECT u.library_id, u.created_at, u.last_access, u.access_count,
+               uc.total_sessions, uc.total_pages_read
+        FROM users u
+        JOIN user_counters uc ON uc.user_id = u.id
+        WHERE u.id = ?
+    ''', (user_id,))
+    user = c.fetchone()
+    if not user:
+        return None
+    
+    library_id, created_at, last_access, access_count, total_sessions, total_pages = user
+    
+    # Get name combinations used, newest first, one page at a time
+    c.execute('''
+        SELECT female_name, male_name, usage_count, created_at 
+        FROM user_names 
+        WHERE user_id = ? 
+        ORDER BY created_at DESC
+        LIMIT ? OFFSET ?
+    ''', (user_id, names_limit + 1, names_offset))
+    names = c.fetchall()
+    
+    c.execute('''
+        SELECT b.slug, b.title, ubc.total_sessions, ubc.total_pages_read
+        FROM user_book_counters ubc
+        JOIN books b ON b.id = ubc.book_id
+        WHERE ubc.user_id = ?
+        ORDER BY ubc.book_id
+    ''', (user_id,))
+    books = c.fetchall()
+    
+    return {
+        'success': True,
+        'user': {
+            'library_id': library_id,
+            'created_at': created_at,
+            'last_access': last_access,
+            'access_count': access_count
+        },
+        'names_used': [
+            {
+                'female_name': row[0],
+                'male_name': row[1],
+                'usage_count': row[2],
+                'created_at': row[3]
+            } for row in names[:names_limit]
+        ],
+        'names_pagination': {
+            'limit': names_limit,
+            'offset': names_offset,
+            'has_more': len(names) > names_limit
+        },
+        'session_stats': {
+            'total_sessions': total_sessions,
+            'total_pages_read': total_pages,
+            'avg_pages_per_session': round(total_pages / total_sessions, 2) if total_sessions else 0
+        },
+        'books': [
+            {
+                'slug': row[0],
+                'title': row[1],
+                'total_sessions': row[2],
+                'total_pages_read': row[3]
+            } for row in books
+        ]
+    }
+
 @app.route('/api/user-stats/<user_id>', methods=['GET'])
 def get_user_stats(user_id):
-    """Get user statistics"""
+    """Get user statistics, revalidated with an ETag"""
+    try:
+        names_limit = parse_limit(request.args.get('names_limit'),
+                                  default=app_config.USER_STATS_NAMES_LIMIT, maximum=100)
+        names_offset = max(0, int(request.args.get('names_offset', 0)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
+            # Read the version and the stats from one snapshot
+            c.execute('BEGIN')
             
-            # Get user info
-            c.execute('''
-                SELECT library_id, created_at, last_access, access_count 
-                FROM users WHERE id = ?
-            ''', (user_id,))
-            user = c.fetchone()
-            
-            if not user:
+            # Primary-key lookup that validates both the client's ETag and our cache
+            c.execute('SELECT stats_version FROM user_counters WHERE user_id = ?', (user_id,))
+            row = c.fetchone()
+            if not row:
                 return jsonify({'success': False, 'error': 'User not found'}), 404
             
-            library_id, created_at, last_access, access_count = user
-            
-            # Get name combinations used
-            c.execute('''
-                SELECT female_name, male_name, usage_count, created_at 
-                FROM user_names 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC
-            ''', (user_id,))
-            names = c.fetchall()
-            
-            # Get session statistics
-            c.execute('''
-                SELECT COUNT(*) as total_sessions, 
-                       SUM(pages_read) as total_pages,
-                       AVG(pages_read) as avg_pages_per_session
-                FROM user_sessions 
-                WHERE user_id = ?
-            ''', (user_id,))
-            session_stats = c.fetchone()
+            etag = f'{row[0]}-{names_offset}-{names_limit}'
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                key = (user_id, names_offset, names_limit)
+                payload = user_stats_cache.get(key, row[0])
+                if payload is None:
+                    payload = _load_user_stats(c, user_id, names_limit, names_offset)
+                    if payload is None:
+                        return jsonify({'success': False, 'error': 'User not found'}), 404
+                    user_stats_cache.put(key, row[0], payload)
+                response = jsonify(payload)
         
-        return jsonify({
-            'success': True,
-            'user': {
-                'library_id': library_id,
-                'created_at': created_at,
-                'last_access': last_access,
-                'access_count': access_count
-            },
-            'names_used': [
-                {
-                    'female_name': row[0],
-                    'male_name': row[1],
-                    'usage_count': row[2],
-                    'created_at': row[3]
-                } for row in names
-            ],
-            'session_stats': {
-                'total_sessions': session_stats[0] or 0,
-                'total_pages_read': session_stats[1] or 0,
-                'avg_pages_per_session': round(session_stats[2] or 0, 2)
-            }
-        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Sortable admin columns: (sort expression, unique tie-breaker); each has an index.
+# Nullable columns sort on COALESCE so a NULL never ends up in a cursor comparison.
+ADMIN_USER_SORTS = {
+    'created_at': ("COALESCE(u.created_at, '')", 'u.rowid'),
+    'last_access': ("COALESCE(u.last_access, '')", 'u.rowid'),
+    'access_count': ('COALESCE(u.access_count, 0)', 'u.rowid'),
+    'library_id': ('u.library_id', 'u.rowid'),
+    'total_pages_read': ('uc.total_pages_read', 'uc.user_id'),
+    'total_sessions': ('uc.total_sessions', 'uc.user_id'),
+}
+
 @app.route('/api/admin/stats', methods=['GET'])
 def get_admin_stats():
-    """Get overall statistics for admin panel"""
+    """Get overall statistics and one page of users for the admin panel"""
+    sort = request.args.get('sort', 'created_at')
+    order = request.args.get('order', 'desc').lower()
+    cursor = request.args.get('cursor')
+    
+    if sort not in ADMIN_USER_SORTS:
+        return jsonify({'success': False, 'error': f'Unsupported sort column: {sort}'}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'error': 'Order must be asc or desc'}), 400
+    
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = decode_cursor(cursor, 2) if cursor else None
+    except (ValueError, InvalidCursor) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    sort_column, tie_breaker = ADMIN_USER_SORTS[sort]
+    direction = 'DESC' if order == 'desc' else 'ASC'
+    comparison = '<' if order == 'desc' else '>'
+    
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
             
-            # Get overall statistics
-            c.execute('SELECT COUNT(*) FROM users')
-            total_users = c.fetchone()[0]
-            
-            c.execute('SELECT COUNT(*) FROM user_sessions')
-            total_sessions = c.fetchone()[0]
-            
-            c.execute('SELECT SUM(pages_read) FROM user_sessions')
-            total_pages = c.fetchone()[0] or 0
-            
-            c.execute('SELECT COUNT(*) FROM user_names')
-            total_name_combinations = c.fetchone()[0]
+            # Totals are maintained by triggers on every write
+            c.execute('SELECT name, value FROM stats_counters')
+            counters = {row[0]: row[1] for row in c.fetchall()}
             
-            # Get all users with their stats
-            c.execute('''
+            # Keyset pagination: seek past the last row of the previous page. Spelled out
+            # rather than as a row value so expression indexes can seek on the first term.
+            where = (f'WHERE {sort_column} {comparison}= ? AND ({sort_column} {comparison} ? '
+                     f'OR {tie_breaker} {comparison} ?)') if after else ''
+            c.execute(f'''
                 SELECT u.id, u.library_id, u.created_at, u.last_access, u.access_count,
-                       COALESCE(SUM(us.pages_read), 0) as total_pages_read,
-                       COUNT(us.id) as total_sessions
+                       uc.total_pages_read, uc.total_sessions,
+                       {sort_column}, {tie_breaker}
                 FROM users u
-                LEFT JOIN user_sessions us ON u.id = us.user_id
-                GROUP BY u.id
-                ORDER BY u.created_at DESC
-            ''')
+                JOIN user_counters uc ON uc.user_id = u.id
+                {where}
+                ORDER BY {sort_column} {direction}, {tie_breaker} {direction}
+                LIMIT ?
+            ''', (*((after[0], after[0], after[1]) if after else ()), limit + 1))
             users = c.fetchall()
         
+        has_more = len(users) > limit
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1][7:9]) if has_more else None
+        
         return jsonify({
             'success': True,
             'stats': {
-                'total_users': total_users,
-                'total_sessions': total_sessions,
-                'total_pages_read': total_pages,
-                'total_name_combinations': total_name_combinations
+                'total_users': counters.get('total_users', 0),
+                'total_sessions': counters.get('total_sessions', 0),
+                'total_pages_read': counters.get('total_pages_read', 0),
+                'total_name_combinations': counters.get('total_name_combinations', 0)
             },
             'users': [
                 {
@@ -488,37 +755,597 @@ def get_admin_stats():
                     'total_pages_read': row[5],
                     'total_sessions': row[6]
                 } for row in users
+            ],
+            'pagination': {
+                'sort': sort,
+                'order': order,
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': next_cursor
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _user_search_query(term, mode, use_fts=True):
+    """Pick the cheapest indexed lookup for a library ID search term"""
+    columns = '''
+        SELECT u.id, u.library_id, u.created_at, u.last_access, u.access_count,
+               uc.total_pages_read, uc.total_sessions
+    '''
+    if mode == 'prefix':
+        # Range scan on the UNIQUE library_id index, already in sorted order
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        return columns + '''
+            FROM users u JOIN user_counters uc ON uc.user_id = u.id
+            WHERE u.library_id >= ? AND u.library_id < ?
+            ORDER BY u.library_id
+            LIMIT ? OFFSET ?
+        ''', (term, upper)
+    if use_fts and len(term) >= 3:
+        # Trigram index answers arbitrary substrings of three or more characters
+        phrase = '"' + term.replace('"', '""') + '"'
+        return columns + '''
+            FROM users_library_id_fts f
+            JOIN users u ON u.rowid = f.rowid
+            JOIN user_counters uc ON uc.user_id = u.id
+            WHERE users_library_id_fts MATCH ?
+            ORDER BY f.rowid
+            LIMIT ? OFFSET ?
+        ''', (phrase,)
+    # One or two characters are too short for trigrams; bounded scan instead
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return columns + '''
+        FROM users u JOIN user_counters uc ON uc.user_id = u.id
+        WHERE u.library_id LIKE ? ESCAPE '\\'
+        ORDER BY u.rowid
+        LIMIT ? OFFSET ?
+    ''', (pattern,)
+
+@app.route('/api/admin/users/search', methods=['GET'])
+def search_users():
+    """Search users by library ID prefix or substring"""
+    term = request.args.get('q', '').strip().upper()
+    mode = request.args.get('mode', 'substring')
+    
+    if not term:
+        return jsonify({'success': False, 'error': 'Search term required'}), 400
+    if len(term) > 50:
+        return jsonify({'success': False, 'error': 'Search term must be 50 characters or less'}), 400
+    if mode not in ('prefix', 'substring'):
+        return jsonify({'success': False, 'error': 'Mode must be prefix or substring'}), 400
+    
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    query, params = _user_search_query(term, mode)
+    
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            try:
+                c.execute(query, (*params, limit + 1, offset))
+            except sqlite3.OperationalError:
+                if mode == 'prefix' or len(term) < 3:
+                    raise
+                # No trigram index on this SQLite build
+                query, params = _user_search_query(term, mode, use_fts=False)
+                c.execute(query, (*params, limit + 1, offset))
+            users = c.fetchall()
+        
+        has_more = len(users) > limit
+        return jsonify({
+            'success': True,
+            'query': term,
+            'mode': mode,
+            'users': [
+                {
+                    'user_id': row[0],
+                    'library_id': row[1],
+                    'created_at': row[2],
+                    'last_access': row[3],
+                    'access_count': row[4],
+                    'total_pages_read': row[5],
+                    'total_sessions': row[6]
+                } for row in users[:limit]
+            ],
+            'pagination': {
+                'limit': limit,
+                'offset': offset,
+                'has_more': has_more
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Exportable datasets: (column names, query). Each query selects its keyset
+# column first (not exported) and takes the last key seen and a batch size.
+EXPORT_DATASETS = {
+    'users': (
+        ['user_id', 'library_id', 'created_at', 'last_access', 'access_count',
+         'total_pages_read', 'total_sessions'],
+        '''
+            SELECT u.rowid, u.id, u.library_id, u.created_at, u.last_access, u.access_count,
+                   uc.total_pages_read, uc.total_sessions
+            FROM users u JOIN user_counters uc ON uc.user_id = u.id
+            WHERE u.rowid > ? ORDER BY u.rowid LIMIT ?
+        '''
+    ),
+    'sessions': (
+        ['session_id', 'user_id', 'book_id', 'session_start', 'session_end', 'pages_read'],
+        '''
+            SELECT id, id, user_id, book_id, session_start, session_end, pages_read
+            FROM user_sessions WHERE id > ? ORDER BY id LIMIT ?
+        '''
+    ),
+    'names': (
+        ['name_id', 'user_id', 'female_name', 'male_name', 'created_at', 'usage_count'],
+        '''
+            SELECT id, id, user_id, female_name, male_name, created_at, usage_count
+            FROM user_names WHERE id > ? ORDER BY id LIMIT ?
+        '''
+    ),
+}
+
+def _export_rows(query, batch_size):
+    """Yield batches of rows, one keyset page per pooled connection
+
+    A connection is held only while a batch is fetched, so a slow download
+    neither ties up the pool nor keeps a read transaction open for the whole
+    stream.
+    """
+    after = 0
+    while True:
+        with get_db_connection() as conn:
+            rows = conn.execute(query, (after, batch_size)).fetchall()
+        if rows:
+            after = rows[-1][0]
+            yield [row[1:] for row in rows]
+        if len(rows) < batch_size:
+            break
+
+def _export_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _export_ndjson(columns, batches):
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+
+@app.route('/api/admin/export', methods=['GET'])
+def export_data():
+    """Stream users, sessions or name combinations as CSV or NDJSON"""
+    dataset = request.args.get('dataset', 'users')
+    fmt = request.args.get('format', 'csv')
+    
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'success': False, 'error': f'Unknown dataset: {dataset}'}), 400
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'error': 'Format must be csv or ndjson'}), 400
+    
+    columns, query = EXPORT_DATASETS[dataset]
+    batches = _export_rows(query, app_config.EXPORT_BATCH_SIZE)
+    if fmt == 'csv':
+        body = _export_csv(columns, batches)
+        mimetype = 'text/csv'
+    else:
+        body = _export_ndjson(columns, batches)
+        mimetype = 'application/x-ndjson'
+    
+    filename = f"ebook-library-{dataset}-{datetime.now().strftime('%Y-%m-%d')}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+ROLLUP_BUCKETS = {
+    # bucket: (bucket_start format, default look-back)
+    'hour': ('%Y-%m-%d %H:00:00', timedelta(hours=48)),
+    'day': ('%Y-%m-%d', timedelta(days=30)),
+}
+
+def _parse_utc(value):
+    """ISO date or datetime as an aware UTC datetime; naive values are already UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+@app.route('/api/admin/reading/pages', methods=['GET'])
+def get_page_rollups():
+    """Get hourly or daily views and dwell time per page of one book from the rollups"""
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ROLLUP_BUCKETS:
+        return jsonify({'success': False, 'error': 'Bucket must be hour or day'}), 400
+    bucket_format, lookback = ROLLUP_BUCKETS[bucket]
+    
+    try:
+        since = request.args.get('since')
+        # Rollup buckets are UTC, so offsets are converted before formatting
+        since = _parse_utc(since) if since else datetime.now(timezone.utc) - lookback
+        until = request.args.get('until')
+        until = _parse_utc(until) if until else None
+        page = request.args.get('page')
+        page = int(page) if page is not None else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since/until must be ISO dates and page an integer'}), 400
+    
+    try:
+        book_slug = request.args.get('book') or default_book_slug()
+        book_id = catalog.book_id(book_slug)
+    except UnknownBook as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    query = ('SELECT bucket_start, page, views, dwell_ms_total FROM page_rollups '
+             'WHERE bucket = ? AND book_id = ? AND bucket_start >= ?')
+    params = [bucket, book_id, since.strftime(bucket_format)]
+    if until is not None:
+        query += ' AND bucket_start < ?'
+        params.append(until.strftime(bucket_format))
+    if page is not None:
+        query += ' AND page = ?'
+        params.append(page)
+    query += ' ORDER BY bucket_start, page'
+    
+    try:
+        with get_db_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        return jsonify({
+            'success': True,
+            'book': book_slug,
+            'bucket': bucket,
+            'rollups': [
+                {
+                    'bucket_start': row[0],
+                    'page': row[1],
+                    'views': row[2],
+                    'avg_dwell_ms': round(row[3] / row[2]) if row[2] else 0
+                } for row in rows
             ]
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/reading/drop-off', methods=['GET'])
+def get_drop_off():
+    """Get how many sessions of one book reached each page and how many stopped there"""
+    try:
+        book_slug = request.args.get('book') or default_book_slug()
+        edition = catalog.resolve(book_slug)
+    except UnknownBook as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    try:
+        with get_db_connection() as conn:
+            # One row per page of the book, maintained by a trigger on page_events
+            stopped = {row[0]: row[1] for row in conn.execute(
+                'SELECT page, sessions FROM page_depth WHERE book_id = ?', (edition['book_id'],)
+            )}
+        
+        last_page = max([edition['total_pages'] - 1] + list(stopped))
+        pages = []
+        reached = 0
+        # Sessions that reached a page are those that stopped there or further on
+        for page in range(last_page, -1, -1):
+            reached += stopped.get(page, 0)
+            pages.append({
+                'page': page,
+                'reached': reached,
+                'stopped': stopped.get(page, 0),
+                'drop_off_rate': round(stopped.get(page, 0) / reached, 4) if reached else 0.0
+            })
+        pages.reverse()
+        
+        return jsonify({'success': True, 'book': book_slug, 'total_sessions': reached, 'pages': pages})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/pool-stats', methods=['GET'])
+def get_pool_stats():
+    """Get database connection pool metrics"""
+    return jsonify({
+        'success': True,
+        'pool': db_pool.stats(),
+        'progress_buffer': progress_buffer.stats(),
+        'access_buffer': access_buffer.stats(),
+        'progress_sync': progress_hub.stats(),
+        'maintenance': session_reaper.stats()
+    })
+
+def _register_collectors(registry):
+    """Expose pool, buffer and cache statistics, read at scrape time"""
+    caches = {
+        'page_render': book.cache_stats,
+        'user_stats': user_stats_cache.stats,
+    }
+    
+    def per_cache(field):
+        return lambda: {name: stats()[field] for name, stats in caches.items()}
+    
+    registry.collect('sqlite_pool_connections', 'Pooled connections by state', 'gauge',
+                     lambda: {'idle': db_pool.stats()['idle'], 'in_use': db_pool.stats()['in_use']},
+                     ('state',))
+    registry.collect('sqlite_pool_timeouts_total', 'Connection acquires that timed out', 'counter',
+                     lambda: db_pool.stats()['timeouts_total'])
+    registry.collect('progress_buffer_pending', 'Session progress updates waiting to be flushed',
+                     'gauge', lambda: progress_buffer.stats()['pending'])
+    registry.collect('progress_buffer_rows_flushed_total', 'Session progress rows written',
+                     'counter', lambda: progress_buffer.stats()['rows_flushed'])
+    registry.collect('sessions_closed_total', 'Idle sessions closed by the reaper', 'counter',
+                     lambda: session_reaper.sessions_closed)
+    registry.collect('sessions_archived_total', 'Sessions moved to the archive database', 'counter',
+                     lambda: session_reaper.sessions_archived)
+    registry.collect('cache_hits_total', 'Cache hits', 'counter', per_cache('hits'), ('cache',))
+    registry.collect('cache_misses_total', 'Cache misses', 'counter', per_cache('misses'), ('cache',))
+    registry.collect('cache_hit_ratio', 'Cache hit ratio since startup', 'gauge',
+                     per_cache('hit_rate'), ('cache',))
+    registry.collect('cache_entries', 'Entries currently cached', 'gauge', per_cache('size'), ('cache',))
+
+if app_config.METRICS_ENABLED:
+    _register_collectors(metrics)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, query, pool and cache metrics (this worker only)"""
+    if not app_config.METRICS_ENABLED:
+        return jsonify({'success': False, 'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List the most recent request profiles"""
+    if not app_config.PROFILING_ENABLED:
+        return jsonify({'success': False, 'error': 'Profiling is disabled'}), 404
+    return jsonify({'success': True, 'profiles': profiler.profiles()})
+
+@app.route('/api/admin/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Get one request profile with its cProfile report"""
+    if not app_config.PROFILING_ENABLED:
+        return jsonify({'success': False, 'error': 'Profiling is disabled'}), 404
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return jsonify({'success': True, 'profile': profile})
+
+def _book_summary(edition):
+    return {
+        'slug': edition['slug'],
+        'title': edition['title'],
+        'author': edition['author'],
+        'edition': edition['label'],
+        'total_pages': edition['total_pages'],
+        'default_names': {'female': edition['female_placeholder'], 'male': edition['male_placeholder']}
+    }
+
+def _render_book_page(renderer, page, archive=None):
+    """Page response with the reader's character names substituted"""
+    female = request.args.get('female', '').strip() or renderer.default_female
+    male = request.args.get('male', '').strip() or renderer.default_male
+    
+    if not renderer.has_page(page):
+        return jsonify({'success': False, 'error': 'Page not found'}), 404
+    
+    error = validate_names(female, male)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    # Archived name pairs are sent as stored, without rendering or compressing
+    if archive is not None:
+        response = archive.response(request, page, female, male)
+        if response is not None:
+            return response
+    
+    return jsonify({
+        'success': True,
+        'page': page,
+        'total_pages': renderer.total_pages,
+        'html': renderer.render_page(page, female, male)
+    })
+
+@app.route('/api/book', methods=['GET'])
+def get_book_info():
+    """Get book metadata needed by the reader"""
+    return jsonify({
+        'success': True,
+        'total_pages': book.total_pages,
+        'default_names': {'female': book.default_female, 'male': book.default_male}
+    })
+
+@app.route('/api/book/pages/<int:page>', methods=['GET'])
+def get_book_page(page):
+    """Get one page of the configured book"""
+    return _render_book_page(book, page, page_archive)
+
+@app.route('/api/books', methods=['GET'])
+def list_books():
+    """List the catalog in id order, one keyset page at a time"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        after_id = int(decode_cursor(cursor, 1)[0]) if cursor else 0
+    except (InvalidCursor, ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        default_book_slug()
+        books, has_more = catalog.list(limit, after_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'books': [_book_summary(edition) for edition in books],
+        'next_cursor': encode_cursor([books[-1]['book_id']]) if has_more else None
+    })
+
+@app.route('/api/books/<slug>', methods=['GET'])
+def get_catalog_book(slug):
+    """Get one book's metadata by slug"""
+    try:
+        default_book_slug()
+        edition = catalog.resolve(slug)
+    except UnknownBook as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, **_book_summary(edition)})
+
+@app.route('/api/books/<slug>/pages/<int:page>', methods=['GET'])
+def get_catalog_book_page(slug, page):
+    """Get one page of any book in the catalog"""
+    try:
+        default_book_slug()
+        _, renderer = catalog.open(slug)
+    except UnknownBook as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        logger.exception(f"Opening book {slug} failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return _render_book_page(renderer, page, page_archive if renderer is book else None)
+
+@app.route('/api/admin/books', methods=['GET', 'POST'])
+def admin_books():
+    """GET: reading totals per book; POST: register a new edition of a book"""
+    if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            after_id = int(decode_cursor(cursor, 1)[0]) if cursor else 0
+        except (InvalidCursor, ValueError, TypeError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        try:
+            default_book_slug()
+            with get_db_connection() as conn:
+                rows = conn.execute('''
+                    SELECT b.id, b.slug, b.title, b.current_edition_id,
+                           COALESCE(bc.total_sessions, 0), COALESCE(bc.total_pages_read, 0)
+                    FROM books b
+                    LEFT JOIN book_counters bc ON bc.book_id = b.id
+                    WHERE b.id > ?
+                    ORDER BY b.id
+                    LIMIT ?
+                ''', (after_id, limit + 1)).fetchall()
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+        
+        return jsonify({
+            'success': True,
+            'books': [
+                {
+                    'slug': row[1],
+                    'title': row[2],
+                    'edition_id': row[3],
+                    'total_sessions': row[4],
+                    'total_pages_read': row[5]
+                } for row in rows[:limit]
+            ],
+            'next_cursor': encode_cursor([rows[limit - 1][0]]) if len(rows) > limit else None
+        })
+    
+    data = request.get_json(silent=True) or {}
+    slug = str(data.get('slug') or '').strip()
+    title = str(data.get('title') or '').strip()
+    source = str(data.get('source') or '').strip()
+    female = str(data.get('female_placeholder') or '').strip()
+    male = str(data.get('male_placeholder') or '').strip()
+    
+    error = validate_slug(slug)
+    if not error and not all([title, source, female, male]):
+        error = 'title, source, female_placeholder and male_placeholder required'
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    try:
+        edition = catalog.register(slug, title, data.get('author'), source, female, male,
+                                   label=data.get('label'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.exception(f"Registering book {slug} failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    logger.info(f"Registered edition {edition['edition_id']} of {slug}")
+    return jsonify({'success': True, 'edition_id': edition['edition_id'], **_book_summary(edition)}), 201
+
+@app.route('/api/admin/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss statistics for server-side caches"""
+    return jsonify({
+        'success': True,
+        'page_render': book.cache_stats(),
+        'catalog': catalog.stats(),
+        'page_archive': page_archive.stats() if page_archive else None,
+        'user_stats': user_stats_cache.stats(),
+        'static_assets': static_assets.stats()
+    })
+
 @app.route('/api/backup', methods=['POST'])
 def create_backup():
-    """Create a database backup"""
+    """Start an online database backup in the background"""
     try:
-        if backup_database():
-            return jsonify({'success': True, 'message': 'Database backup created successfully'})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to create backup'}), 500
+        job, started = backup_manager.start()
+        if not started:
+            return jsonify({'success': False, 'error': 'A backup is already running', 'job': job}), 409
+        return jsonify({'success': True, 'message': 'Database backup started', 'job': job}), 202
     except Exception as e:
         logger.error(f"Backup error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/maintenance', methods=['GET', 'POST'])
+def session_maintenance():
+    """Get reaper statistics, or run a maintenance pass now (POST)"""
+    if request.method == 'POST':
+        result = session_reaper.run()
+        if result['error']:
+            return jsonify({'success': False, 'error': result['error'], 'run': result}), 500
+        return jsonify({'success': True, 'run': result})
+    return jsonify({'success': True, 'maintenance': session_reaper.stats()})
+
+@app.route('/api/backup/status', methods=['GET'])
+def backup_status():
+    """Get progress of the latest (or a specific) backup job"""
+    job = backup_manager.status(request.args.get('job_id'))
+    if job is None:
+        return jsonify({'success': False, 'error': 'No backup job found'}), 404
+    return jsonify({'success': True, 'job': job})
+
 @app.route('/')
 def home():
     return 'E-Book Library API is running!'
 
 @app.route('/frontend/')
 def frontend():
-    return send_from_directory('frontend', 'index.html')
+    return serve_frontend('index.html')
 
 @app.route('/frontend/<path:filename>')
 def serve_frontend(filename):
-    return send_from_directory('frontend', filename)
+    response = static_assets.response(request, filename)
+    if response is None:
+        return send_from_directory('frontend', filename)
+    return response
 
 if __name__ == '__main__':
     init_db()
+    start_background_jobs()
     app.run(
         debug=app_config.FLASK_DEBUG, 
         host=app_config.HOST, 
@@ -0,0 +1,205 @@
+"""
+ASGI entry point for serving many concurrent idle readers.
+
+Long-poll progress sync is handled natively on the event loop, so a waiting
+reader costs a future instead of a thread. Every other route is the regular
+Flask app, run through a WSGI bridge on a bounded thread pool (ASGI_THREADS)
+so blocking SQLite work can never grow the thread count. Serve with:
+
+    uvicorn asgi:application --workers 4
+
+Each worker migrates the schema under the same file lock used by gunicorn,
+so only the first one to start does any work.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+import app as flask_app  # noqa: E402
+import lifecycle  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PATH = re.compile(r'^/api/sessions/(\d+)/progress$')
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope (PEP 3333)"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get('body', b''))
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+class WsgiBridge:
+    """Run a WSGI app on a bounded executor, streaming its output back to ASGI"""
+
+    def __init__(self, wsgi_app, executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        environ = build_environ(scope, await read_body(receive))
+        loop = asyncio.get_running_loop()
+
+        def send_sync(message):
+            # Blocks the worker thread until the client has taken the chunk
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            # The whole response is produced on one thread so request contexts
+            # held open by streaming generators stay valid
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started.append({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+                })
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                send_sync(started[0])
+                for chunk in result:
+                    if chunk:
+                        send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                send_sync({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        await loop.run_in_executor(self.executor, run)
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode('latin-1')),
+                    (b'cache-control', b'no-store'),
+                    (b'access-control-allow-origin', b'*')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def session_progress(scope, send, session_id):
+    """Long-poll until a session's pages_read differs from ?since=, or time out"""
+    cfg = flask_app.app_config
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    try:
+        since = int(query['since'][0]) if 'since' in query else None
+        timeout = float(query['timeout'][0]) if 'timeout' in query else cfg.LONG_POLL_TIMEOUT
+    except ValueError:
+        await send_json(send, 400, {'success': False, 'error': 'since and timeout must be numbers'})
+        return
+    timeout = min(max(timeout, 0.0), cfg.LONG_POLL_MAX_TIMEOUT)
+
+    try:
+        if since is None:
+            pages_read, changed = await flask_app.progress_hub.current(session_id), True
+            if pages_read is None:
+                raise KeyError(session_id)
+        else:
+            pages_read, changed = await flask_app.progress_hub.wait(session_id, since, timeout)
+    except KeyError:
+        await send_json(send, 404, {'success': False, 'error': 'Session not found'})
+        return
+    except Exception as e:
+        await send_json(send, 500, {'success': False, 'error': str(e)})
+        return
+
+    await send_json(send, 200, {
+        'success': True,
+        'session_id': session_id,
+        'pages_read': pages_read,
+        'changed': changed,
+    })
+
+
+async def lifespan(receive, send):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                if flask_app.app_config.DATABASE_URL == ':memory:':
+                    await loop.run_in_executor(None, flask_app.init_db)
+                else:
+                    await loop.run_in_executor(
+                        None, lifecycle.migrate_once, flask_app.app_config.DATABASE_URL)
+                await loop.run_in_executor(None, flask_app.warm_up)
+                flask_app.start_background_jobs()
+            except Exception as e:
+                logger.error(f"ASGI startup failed: {e}")
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await loop.run_in_executor(None, flask_app.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+wsgi = WsgiBridge(flask_app.app, ThreadPoolExecutor(
+    max_workers=flask_app.app_config.ASGI_THREADS, thread_name_prefix='wsgi'))
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    match = PROGRESS_PATH.match(scope['path'])
+    if match and scope['method'] == 'GET':
+        await session_progress(scope, send, int(match.group(1)))
+    else:
+        await wsgi(scope, receive, send)
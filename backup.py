@@ -0,0 +1,236 @@
+"""
+Online database backups using the SQLite backup API.
+
+A background thread copies the live database a few pages at a time, so
+writers are only paused for the duration of a single step, then gzips the
+snapshot and prunes old snapshots beyond the retention count.
+
+Job state is shared by every process using the same backup directory: each
+job's status is a small JSON file next to the snapshots, and the running job
+holds an exclusive lock on backup.lock, so only one backup runs at a time
+across all workers and any worker can report on any job. Snapshots are
+compressed to a .partial file and renamed into place, so a crash never
+leaves a truncated snapshot behind.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+from lifecycle import try_lock
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = 'names_backup_'
+BACKUP_SUFFIX = '.db.gz'
+STATUS_SUFFIX = '.json'
+LOCK_NAME = 'backup.lock'
+JOB_ID = re.compile(r'^\d{8}_\d{6}_\d{6}$')
+# Progress is written to the status file at most this often
+STATUS_INTERVAL = 0.5
+
+
+class BackupManager:
+    """Runs one backup job at a time per backup directory and keeps a short history of results"""
+
+    def __init__(self, database, connection_factory, backup_dir='backups', retention=7,
+                 pages_per_step=256, step_sleep=0.005, history=20):
+        self.database = database
+        self.connection_factory = connection_factory
+        self.backup_dir = backup_dir
+        self.retention = max(1, int(retention))
+        self.pages_per_step = max(1, int(pages_per_step))
+        self.step_sleep = step_sleep
+        self.history = history
+
+        self._lock = threading.Lock()
+        self._running = None
+
+    def _status_path(self, job_id):
+        return os.path.join(self.backup_dir, f'{BACKUP_PREFIX}{job_id}{STATUS_SUFFIX}')
+
+    def _save(self, job):
+        """Atomically publish a job's state for every process"""
+        path = self._status_path(job['job_id'])
+        with open(path + '.tmp', 'w') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def start(self):
+        """Start a backup job unless one is running in any process; returns (job, started)"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        with self._lock:
+            if self._running is not None:
+                return dict(self._running), False
+            # Held by the job thread until it finishes; released by the OS if the process dies
+            job_lock = try_lock(os.path.join(self.backup_dir, LOCK_NAME))
+            if job_lock is not None:
+                job_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+                job = {
+                    'job_id': job_id,
+                    'state': 'running',
+                    'started_at': datetime.now().isoformat(timespec='seconds'),
+                    'finished_at': None,
+                    'duration_seconds': None,
+                    'pages_total': None,
+                    'pages_copied': 0,
+                    'progress': 0.0,
+                    'path': None,
+                    'size_bytes': None,
+                    'compressed_bytes': None,
+                    'removed': [],
+                    'error': None,
+                }
+                self._running = job
+                self._save(job)
+                self._prune_history()
+
+        if job_lock is None:
+            # Running in another process
+            return self.status(), False
+
+        thread = threading.Thread(target=self._run, args=(job, job_lock), name='BackupJob', daemon=True)
+        thread.start()
+        return dict(job), True
+
+    def status(self, job_id=None):
+        """State of one job (the latest by default), as any process last published it, or None"""
+        with self._lock:
+            running = dict(self._running) if self._running else None
+        if running and job_id in (None, running['job_id']):
+            return running
+
+        if job_id is None:
+            paths = sorted(glob.glob(os.path.join(self.backup_dir, f'{BACKUP_PREFIX}*{STATUS_SUFFIX}')))
+            job = self._load(paths[-1]) if paths else None
+        elif JOB_ID.match(job_id):
+            job = self._load(self._status_path(job_id))
+        else:
+            job = None
+
+        if job is not None and job['state'] == 'running':
+            # Running elsewhere unless nobody holds the lock, i.e. its process died mid-job
+            probe = try_lock(os.path.join(self.backup_dir, LOCK_NAME))
+            if probe is not None:
+                probe.close()
+                job = self._load(self._status_path(job['job_id'])) or job
+                if job['state'] == 'running':
+                    job.update({'state': 'failed', 'error': 'Backup process exited before finishing'})
+        return job
+
+    def _prune_history(self):
+        paths = sorted(glob.glob(os.path.join(self.backup_dir, f'{BACKUP_PREFIX}*{STATUS_SUFFIX}')))
+        for path in paths[:-self.history]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _source(self):
+        # An in-memory database is only reachable through the shared pooled connection
+        if self.database == ':memory:':
+            return self.connection_factory()
+        return closing(sqlite3.connect(self.database))
+
+    def _run(self, job, job_lock):
+        started = time.perf_counter()
+        base = os.path.join(self.backup_dir, f"{BACKUP_PREFIX}{job['job_id']}")
+        partial = base + '.db.partial'
+        final = base + BACKUP_SUFFIX
+        packing = final + '.partial'
+        last_saved = [0.0]
+
+        def progress(status, remaining, total):
+            with self._lock:
+                job['pages_total'] = total
+                job['pages_copied'] = total - remaining
+                job['progress'] = round((total - remaining) / total * 100, 1) if total else 100.0
+                if time.monotonic() - last_saved[0] >= STATUS_INTERVAL:
+                    last_saved[0] = time.monotonic()
+                    self._save(job)
+
+        try:
+            with self._source() as src:
+                dst = sqlite3.connect(partial)
+                try:
+                    # Each step holds the source read lock only for pages_per_step pages
+                    src.backup(dst, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+                finally:
+                    dst.close()
+
+            with open(partial, 'rb') as raw, gzip.open(packing, 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            # Only complete snapshots ever carry the .db.gz name that rotation counts
+            os.replace(packing, final)
+
+            size = os.path.getsize(partial)
+            os.remove(partial)
+            removed = self._rotate()
+
+            with self._lock:
+                job.update({
+                    'state': 'completed',
+                    'path': final,
+                    'size_bytes': size,
+                    'compressed_bytes': os.path.getsize(final),
+                    'progress': 100.0,
+                    'removed': removed,
+                })
+            logger.info(f"Database backed up to {final}")
+        except Exception as e:
+            logger.error(f"Failed to backup database: {e}")
+            for path in (partial, packing):
+                if os.path.exists(path):
+                    os.remove(path)
+            with self._lock:
+                job.update({'state': 'failed', 'error': str(e)})
+        finally:
+            with self._lock:
+                job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+                job['duration_seconds'] = round(time.perf_counter() - started, 3)
+                try:
+                    self._save(job)
+                finally:
+                    self._running = None
+                    job_lock.close()
+
+    def _rotate(self):
+        """Delete the oldest snapshots beyond the retention count"""
+        snapshots = sorted(glob.glob(os.path.join(self.backup_dir, f'{BACKUP_PREFIX}*{BACKUP_SUFFIX}')))
+        removed = []
+        for path in snapshots[:-self.retention]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already rotated away by another process
+                continue
+            removed.append(path)
+        return removed
+
+    def wait(self, timeout=None):
+        """Block until the running job finishes; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._running is None:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Load-testing and benchmark harness for the E-Book Library API.
+
+Replays realistic reader traffic (create-user, login, a save-names burst,
+one update-session per page turned, end-session) from concurrent readers
+and reports p50/p95/p99 latency and throughput per endpoint.
+
+By default the Flask app is driven in-process through its test client
+against a throwaway database; pass --url to hit a running server instead.
+Results are written as JSON and can be compared against a saved baseline:
+
+    python bench.py --readers 200 --concurrency 8 --output bench.json
+    python bench.py --baseline bench.json --max-regression 20
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+FEMALE_NAMES = ['Asha', 'Mira', 'Priya', 'Sameena', 'Kavya', 'Nila']
+MALE_NAMES = ['Ravi', 'Dev', 'Arjun', 'Sanjay', 'Karthik', 'Vikram']
+
+
+class InProcessClient:
+    """Drive the Flask app through its test client"""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        # Test clients keep cookie state, so each worker thread gets its own
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpClient:
+    """Drive a running server over HTTP"""
+
+    def __init__(self, base_url, timeout=10):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        response = session.post(self.base_url + path, json=payload, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency samples"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, client, path, payload, expected=(200, 202)):
+        start = time.perf_counter()
+        try:
+            status, body = client.post(path, payload)
+        except Exception:
+            status, body = None, {}
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.samples.setdefault(path, []).append(elapsed)
+            if status not in expected:
+                self.errors[path] = self.errors.get(path, 0) + 1
+        return body if status in expected else None
+
+
+def run_reader(client, recorder, rng, pages, names_burst):
+    """One reader's visit: sign up, log in, pick names, read, leave"""
+    user = recorder.call(client, '/api/create-user', {})
+    if not user:
+        return
+    login = recorder.call(client, '/api/login', {'library_id': user['library_id']})
+    if not login:
+        return
+
+    # Readers try a few name pairs before settling on one
+    for _ in range(names_burst):
+        recorder.call(client, '/api/save-names', {
+            'user_id': user['user_id'],
+            'female': rng.choice(FEMALE_NAMES),
+            'male': rng.choice(MALE_NAMES),
+        })
+
+    for page in range(1, rng.randint(1, pages) + 1):
+        recorder.call(client, '/api/update-session', {
+            'session_id': login['session_id'],
+            'pages_read': page,
+        })
+
+    recorder.call(client, '/api/end-session', {'session_id': login['session_id']})
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder, duration):
+    """Per-endpoint latency percentiles (ms) and throughput"""
+    endpoints = {}
+    for path, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        endpoints[path] = {
+            'requests': len(values),
+            'errors': recorder.errors.get(path, 0),
+            'throughput_rps': round(len(values) / duration, 2) if duration else 0.0,
+            'mean_ms': round(sum(values) / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'max_ms': round(values[-1] * 1000, 3),
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'total_requests': total,
+        'total_errors': sum(e['errors'] for e in endpoints.values()),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(total / duration, 2) if duration else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Return the endpoints whose p95 grew by more than max_regression percent"""
+    regressions = []
+    for path, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(path)
+        if not previous or not previous['p95_ms']:
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+        if change > max_regression:
+            regressions.append((path, previous['p95_ms'], current['p95_ms'], change))
+    return regressions
+
+
+def in_process_client(database):
+    """Import the app against a benchmark database and migrate it"""
+    os.environ['DATABASE_URL'] = database
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    app_module.init_db()
+    return InProcessClient(app_module.app), app_module
+
+
+def print_report(summary):
+    print(f"{'endpoint':<22}{'reqs':>7}{'err':>5}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for path, e in summary['endpoints'].items():
+        print(f"{path:<22}{e['requests']:>7}{e['errors']:>5}{e['throughput_rps']:>10.1f}"
+              f"{e['p50_ms']:>9.2f}{e['p95_ms']:>9.2f}{e['p99_ms']:>9.2f}")
+    print(f"Total: {summary['total_requests']} requests, {summary['total_errors']} errors, "
+          f"{summary['throughput_rps']} req/s over {summary['duration_s']}s (latencies in ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process app')
+    parser.add_argument('--database', help='Database for in-process runs (default: a temporary file)')
+    parser.add_argument('--readers', type=int, default=100, help='Reader visits to simulate')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent readers')
+    parser.add_argument('--pages', type=int, default=29, help='Most pages a reader turns')
+    parser.add_argument('--names-burst', type=int, default=3, help='save-names calls per reader')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for reproducible traffic')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write JSON results')
+    parser.add_argument('--baseline', help='Previous results JSON to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Allowed p95 increase in percent before failing (with --baseline)')
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    app_module = None
+    if args.url:
+        client = HttpClient(args.url)
+        target = args.url
+    else:
+        if args.database is None:
+            tmpdir = tempfile.TemporaryDirectory()
+            args.database = os.path.join(tmpdir.name, 'bench.db')
+        client, app_module = in_process_client(args.database)
+        target = 'in-process'
+
+    print(f"=== Benchmark: {args.readers} readers x {args.concurrency} concurrent ({target}) ===")
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_reader, client, recorder, random.Random(args.seed + i),
+                            args.pages, args.names_burst)
+            for i in range(args.readers)
+        ]
+        for future in futures:
+            future.result()
+    duration = time.perf_counter() - start
+
+    if app_module is not None:
+        app_module.progress_buffer.stop()
+
+    summary = summarize(recorder, duration)
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'target': target,
+        'parameters': {
+            'readers': args.readers,
+            'concurrency': args.concurrency,
+            'pages': args.pages,
+            'names_burst': args.names_burst,
+            'seed': args.seed,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        **summary,
+    }
+    print_report(summary)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for path, before, after, change in regressions:
+            print(f"❌ {path}: p95 {before:.2f}ms -> {after:.2f}ms (+{change:.1f}%)")
+        if regressions:
+            return 1
+        print(f"✅ No p95 regression above {args.max_regression}%")
+
+    return 1 if summary['total_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
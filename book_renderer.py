@@ -0,0 +1,141 @@
+"""
+Server-side rendering of personalised book pages.
+
+The story is split into per-page templates once, with the character-name
+placeholders cut out, so rendering a page is a single join of pre-split
+segments. Rendered pages are kept in a bounded LRU cache keyed by
+(page, female, male) because a handful of name pairs dominate traffic.
+"""
+
+import re
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
+
+PAGE_ID = re.compile(r'^page-(\d+)$')
+
+
+class _PageSplitter(HTMLParser):
+    """Find the source span of every top-level <div id="page-N"> block"""
+
+    def __init__(self, source):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.line_offsets = [0]
+        for line in source.splitlines(keepends=True):
+            self.line_offsets.append(self.line_offsets[-1] + len(line))
+        self.pages = {}
+        self._current = None
+        self._start = None
+        self._depth = 0
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'div':
+            return
+        if self._current is not None:
+            self._depth += 1
+            return
+        match = PAGE_ID.match(dict(attrs).get('id') or '')
+        if match:
+            self._current = int(match.group(1))
+            self._start = self._offset()
+            self._depth = 1
+
+    def handle_endtag(self, tag):
+        if tag != 'div' or self._current is None:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            end = self.source.index('>', self._offset()) + 1
+            self.pages[self._current] = self.source[self._start:end]
+            self._current = None
+
+
+def split_pages(source):
+    """Return {page number: HTML} for every page-N div in the source"""
+    splitter = _PageSplitter(source)
+    splitter.feed(source)
+    splitter.close()
+    return splitter.pages
+
+
+class PageTemplate:
+    """A page pre-split around its character-name placeholders"""
+
+    def __init__(self, html, placeholders):
+        # Alternating literal text and placeholder keys: [text, key, text, key, text]
+        pattern = '(' + '|'.join(re.escape(p) for p in placeholders) + ')'
+        self.parts = re.split(pattern, html)
+        self.placeholders = placeholders
+
+    def render(self, values):
+        parts = list(self.parts)
+        for i in range(1, len(parts), 2):
+            parts[i] = values[self.placeholders[parts[i]]]
+        return ''.join(parts)
+
+
+class BookRenderer:
+    """Render personalised pages from templates with an LRU cache"""
+
+    def __init__(self, pages, female_placeholder='Sameena', male_placeholder='Sanjay',
+                 cache_size=1024):
+        placeholders = {female_placeholder: 'female', male_placeholder: 'male'}
+        # Page numbers come from the page-N ids; the cover may live in the HTML shell
+        self.templates = {n: PageTemplate(html, placeholders) for n, html in pages.items()}
+        self.default_female = female_placeholder
+        self.default_male = male_placeholder
+        self.render_page = lru_cache(maxsize=cache_size)(self._render)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            return cls(split_pages(f.read()), **kwargs)
+
+    @classmethod
+    def from_store(cls, path, **kwargs):
+        """Load the pages of a SQLite page store built by ingest_book.py"""
+        with closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as conn:
+            meta = dict(conn.execute('SELECT key, value FROM book_meta'))
+            pages = dict(conn.execute('SELECT page, html FROM pages'))
+        for key in ('female_placeholder', 'male_placeholder'):
+            if key in meta:
+                kwargs.setdefault(key, meta[key])
+        return cls(pages, **kwargs)
+
+    @classmethod
+    def from_path(cls, path, **kwargs):
+        """Page store (.db) or hand-written HTML, by file extension"""
+        if path.endswith('.db'):
+            return cls.from_store(path, **kwargs)
+        return cls.from_file(path, **kwargs)
+
+    @property
+    def total_pages(self):
+        return max(self.templates) + 1 if self.templates else 0
+
+    def has_page(self, page):
+        return page in self.templates
+
+    def _render(self, page, female, male):
+        # Names are escaped once here, so cached output is always safe to inject
+        values = {'female': escape(female), 'male': escape(male)}
+        return self.templates[page].render(values)
+
+    def cache_stats(self):
+        """Hit/miss counters of the rendered page cache"""
+        info = self.render_page.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+        }
@@ -0,0 +1,215 @@
+"""
+Catalog of books, their editions and the page renderers that serve them.
+
+A book is addressed by its slug; its current edition names the page source
+(a page store built by ingest_book.py or hand-written HTML) and the
+character-name placeholders used in its text. Opening a book is a slug
+lookup on a unique index, cached for ``resolve_ttl`` seconds, and a
+renderer from an LRU of at most ``open_books`` editions, each with its own
+rendered-page cache. Listing is keyset-paginated on books.id, so neither
+depends on the size of the catalog.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from book_renderer import BookRenderer
+
+SLUG = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+MAX_SLUG_LENGTH = 64
+# Row the book_catalog migration seeded for history recorded before the catalog
+SEED_BOOK_ID = 1
+EDITION_COLUMNS = ('book_id', 'slug', 'title', 'author', 'edition_id', 'label', 'source',
+                   'female_placeholder', 'male_placeholder', 'total_pages')
+EDITION_QUERY = '''
+    SELECT b.id, b.slug, b.title, b.author, e.id, e.label, e.source,
+           e.female_placeholder, e.male_placeholder, e.total_pages
+    FROM books b
+    JOIN book_editions e ON e.id = b.current_edition_id
+'''
+
+
+class UnknownBook(LookupError):
+    """No book with this slug, or it has no edition yet"""
+
+
+def validate_slug(slug):
+    """Return an error message if slug cannot name a book"""
+    if not isinstance(slug, str) or not slug:
+        return 'Book slug required'
+    if len(slug) > MAX_SLUG_LENGTH or not SLUG.match(slug):
+        return f'Book slug must be lowercase words joined by hyphens, at most {MAX_SLUG_LENGTH} characters'
+    return None
+
+
+def load_source(root, source, female_placeholder, male_placeholder, cache_size=1024):
+    """Open an edition's page source, which must live under root"""
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([path, os.path.realpath(root)]) != os.path.realpath(root):
+        raise ValueError('Book source must be inside the application directory')
+    if not os.path.isfile(path):
+        raise ValueError(f'Book source not found: {source}')
+    return BookRenderer.from_path(path, female_placeholder=female_placeholder,
+                                  male_placeholder=male_placeholder, cache_size=cache_size)
+
+
+def register_edition(conn, slug, title, author, source, female_placeholder, male_placeholder,
+                     total_pages, label=None):
+    """Create or update a book and make a new edition current; returns (book_id, edition_id)
+
+    Runs inside the caller's transaction.
+    """
+    book_id = conn.execute('''
+        INSERT INTO books (slug, title, author) VALUES (?, ?, ?)
+        ON CONFLICT (slug) DO UPDATE SET title = excluded.title, author = excluded.author
+        RETURNING id
+    ''', (slug, title, author)).fetchone()[0]
+    edition_id = conn.execute('''
+        INSERT INTO book_editions
+            (book_id, label, source, female_placeholder, male_placeholder, total_pages)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (book_id, label, source, female_placeholder, male_placeholder, total_pages)).lastrowid
+    conn.execute('UPDATE books SET current_edition_id = ? WHERE id = ?', (edition_id, book_id))
+    return book_id, edition_id
+
+
+class BookCatalog:
+    """Resolve slugs to editions and keep renderers for recently opened books"""
+
+    def __init__(self, connection_factory, root, open_books=16, page_cache_size=1024,
+                 resolve_ttl=30.0):
+        self.connection_factory = connection_factory
+        self.root = root
+        self.open_books = max(1, int(open_books))
+        self.page_cache_size = page_cache_size
+        self.resolve_ttl = resolve_ttl
+
+        self._resolved = {}
+        self._renderers = OrderedDict()
+        # Renderers built elsewhere (the configured book) are never evicted
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def resolve(self, slug):
+        """Current edition of a book as a dict; raises UnknownBook"""
+        cached = self._resolved.get(slug)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        with self.connection_factory() as conn:
+            row = conn.execute(EDITION_QUERY + ' WHERE b.slug = ?', (slug,)).fetchone()
+        self.lookups += 1
+        if row is None:
+            raise UnknownBook(f'Unknown book: {slug}')
+        edition = dict(zip(EDITION_COLUMNS, row))
+        self._resolved[slug] = (time.monotonic() + self.resolve_ttl, edition)
+        return edition
+
+    def open(self, slug):
+        """(edition, renderer) for a book, loading its pages on first use"""
+        edition = self.resolve(slug)
+        edition_id = edition['edition_id']
+        renderer = self._pinned.get(edition_id)
+        if renderer is not None:
+            return edition, renderer
+        with self._lock:
+            renderer = self._renderers.get(edition_id)
+            if renderer is not None:
+                self._renderers.move_to_end(edition_id)
+                return edition, renderer
+
+        # Loaded outside the lock; two threads racing on a cold book both load it once
+        renderer = load_source(self.root, edition['source'], edition['female_placeholder'],
+                               edition['male_placeholder'], self.page_cache_size)
+        with self._lock:
+            renderer = self._renderers.setdefault(edition_id, renderer)
+            self._renderers.move_to_end(edition_id)
+            self.loads += 1
+            while len(self._renderers) > self.open_books:
+                self._renderers.popitem(last=False)
+                self.evictions += 1
+        return edition, renderer
+
+    def book_id(self, slug):
+        return self.resolve(slug)['book_id']
+
+    def list(self, limit, after_id=0):
+        """One page of books in id order; returns (books, has_more)"""
+        with self.connection_factory() as conn:
+            rows = conn.execute(EDITION_QUERY + ' WHERE b.id > ? ORDER BY b.id LIMIT ?',
+                                (after_id, limit + 1)).fetchall()
+        return [dict(zip(EDITION_COLUMNS, row)) for row in rows[:limit]], len(rows) > limit
+
+    def register(self, slug, title, author, source, female_placeholder, male_placeholder,
+                 label=None, renderer=None):
+        """Validate a page source and make it the book's current edition; returns the edition"""
+        error = validate_slug(slug)
+        if error:
+            raise ValueError(error)
+        if renderer is None:
+            renderer = load_source(self.root, source, female_placeholder, male_placeholder,
+                                   self.page_cache_size)
+        if not renderer.templates:
+            raise ValueError(f'Book source has no pages: {source}')
+
+        with self.connection_factory() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                register_edition(conn, slug, title, author, source, female_placeholder,
+                                 male_placeholder, renderer.total_pages, label)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._resolved.pop(slug, None)
+        return self.resolve(slug)
+
+    def ensure(self, slug, title, author, source, female_placeholder, male_placeholder,
+               renderer=None):
+        """Register the book unless its current edition already matches; pins renderer
+
+        The configured book takes over the seeded book row while that row has no
+        edition, whatever its slug, so sessions recorded before the catalog stay
+        with it.
+        """
+        try:
+            edition = self.resolve(slug)
+        except UnknownBook:
+            edition = None
+            with self.connection_factory() as conn:
+                conn.execute('''
+                    UPDATE books SET slug = ?, title = ?, author = ?
+                    WHERE id = ? AND current_edition_id IS NULL
+                      AND NOT EXISTS (SELECT 1 FROM books WHERE slug = ?)
+                ''', (slug, title, author, SEED_BOOK_ID, slug))
+                conn.commit()
+        wanted = (source, female_placeholder, male_placeholder,
+                  renderer.total_pages if renderer is not None else None)
+        current = edition and (edition['source'], edition['female_placeholder'],
+                               edition['male_placeholder'],
+                               edition['total_pages'] if renderer is not None else None)
+        if current != wanted:
+            edition = self.register(slug, title, author, source, female_placeholder,
+                                    male_placeholder, renderer=renderer)
+        if renderer is not None:
+            self._pinned[edition['edition_id']] = renderer
+        return edition
+
+    def stats(self):
+        with self._lock:
+            open_books = {edition_id: renderer.cache_stats()
+                          for edition_id, renderer in {**self._renderers, **self._pinned}.items()}
+        return {
+            'open_books': len(open_books),
+            'max_open_books': self.open_books,
+            'lookups': self.lookups,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'page_caches': open_books,
+        }
@@ -23,13 +23,111 @@ class Config:
     # CORS configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5000,https://novel-ebook.onrender.com').split(',')
     
+    # Production serving (gunicorn.conf.py)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or min(2 * (os.cpu_count() or 1) + 1, 8))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 4)
+    WORKER_TIMEOUT = int(os.environ.get('WORKER_TIMEOUT') or 30)
+    GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT') or 30)
+    WARMUP_NAME_PAIRS = int(os.environ.get('WARMUP_NAME_PAIRS') or 5)
+
+    # ASGI serving (asgi.py): threads for the wrapped sync API and long-poll limits
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS') or 32)
+    PROGRESS_POLL_INTERVAL = float(os.environ.get('PROGRESS_POLL_INTERVAL') or 1.0)
+    LONG_POLL_TIMEOUT = float(os.environ.get('LONG_POLL_TIMEOUT') or 25.0)
+    LONG_POLL_MAX_TIMEOUT = float(os.environ.get('LONG_POLL_MAX_TIMEOUT') or 60.0)
+    
+    # Library ID permutation key (stored in the database on first use; when set it
+    # must match the stored key) and sequence block size
+    LIBRARY_ID_KEY = os.environ.get('LIBRARY_ID_KEY') or None
+    LIBRARY_ID_BLOCK_SIZE = int(os.environ.get('LIBRARY_ID_BLOCK_SIZE') or 100)
+    # Most library cards one /api/users/bulk request may create
+    BULK_USERS_MAX = int(os.environ.get('BULK_USERS_MAX') or 5000)
+    
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
 
+    # Metrics endpoint and sampled per-request debug trace (0.0 - 1.0)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE') or 0.0)
+
+    # Opt-in request profiling: listed paths and/or requests with a signed X-Profile header
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_SECRET = os.environ.get('PROFILE_SECRET') or None
+    PROFILE_ENDPOINTS = [p for p in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if p]
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 1.0)
+    PROFILE_HISTORY = int(os.environ.get('PROFILE_HISTORY') or 20)
+
+    # Database connection pool
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 8)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 5.0)
+
+    # SQLite tuning applied to every pooled connection
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB') or 8192)
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 64 * 1024 * 1024)
+    SQLITE_STATEMENT_CACHE_SIZE = int(os.environ.get('SQLITE_STATEMENT_CACHE_SIZE') or 256)
+
+    # Reading progress write-behind buffer
+    PROGRESS_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_FLUSH_INTERVAL') or 2.0)
+    PROGRESS_FLUSH_MAX_PENDING = int(os.environ.get('PROGRESS_FLUSH_MAX_PENDING') or 500)
+
+    # Logins within this many seconds of a session's last activity resume it (0 disables)
+    SESSION_RESUME_WINDOW = int(os.environ.get('SESSION_RESUME_WINDOW') or 1800)
+    # Login access_count/last_access write-behind buffer
+    ACCESS_FLUSH_INTERVAL = float(os.environ.get('ACCESS_FLUSH_INTERVAL') or 5.0)
+    ACCESS_FLUSH_MAX_PENDING = int(os.environ.get('ACCESS_FLUSH_MAX_PENDING') or 500)
+
+    # Most events accepted by one /api/events/batch request
+    EVENT_BATCH_MAX = int(os.environ.get('EVENT_BATCH_MAX') or 200)
+
+    # Rows fetched per round trip when streaming admin exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 500)
+
+    # Server-side page rendering; the configured book is registered in the catalog at startup
+    BOOK_SLUG = os.environ.get('BOOK_SLUG') or 'when-hearts-whisper'
+    BOOK_TITLE = os.environ.get('BOOK_TITLE') or 'When Hearts Whisper'
+    BOOK_AUTHOR = os.environ.get('BOOK_AUTHOR') or 'Athil S'
+    BOOK_SOURCE = os.environ.get('BOOK_SOURCE') or 'book/when-hearts-whisper.html'
+    BOOK_FEMALE_PLACEHOLDER = os.environ.get('BOOK_FEMALE_PLACEHOLDER') or 'Sameena'
+    BOOK_MALE_PLACEHOLDER = os.environ.get('BOOK_MALE_PLACEHOLDER') or 'Sanjay'
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE') or 1024)
+    # Memory-mapped archive of pre-rendered pages built by page_archive.py (disabled when empty)
+    PAGE_ARCHIVE = os.environ.get('PAGE_ARCHIVE') or ''
+
+    # Catalog: books kept open (each with its own page cache) and slug lookup cache lifetime
+    CATALOG_OPEN_BOOKS = int(os.environ.get('CATALOG_OPEN_BOOKS') or 16)
+    CATALOG_RESOLVE_TTL = float(os.environ.get('CATALOG_RESOLVE_TTL') or 30.0)
+
+    # Per-user stats cache and names_used page size
+    USER_STATS_CACHE_SIZE = int(os.environ.get('USER_STATS_CACHE_SIZE') or 2048)
+    USER_STATS_NAMES_LIMIT = int(os.environ.get('USER_STATS_NAMES_LIMIT') or 20)
+
+    # Static assets are rebuilt when files change (development only)
+    STATIC_AUTO_RELOAD = os.environ.get('STATIC_AUTO_RELOAD', 'False').lower() == 'true'
+
+    # Online backups
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or 'backups'
+    BACKUP_RETENTION = int(os.environ.get('BACKUP_RETENTION') or 7)
+    BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP') or 256)
+    BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP') or 0.005)
+
+    # Session reaper: close idle sessions, archive old ones, prune idempotency keys
+    MAINTENANCE_ENABLED = os.environ.get('MAINTENANCE_ENABLED', 'True').lower() == 'true'
+    MAINTENANCE_INTERVAL = float(os.environ.get('MAINTENANCE_INTERVAL') or 300.0)
+    MAINTENANCE_CHUNK_SIZE = int(os.environ.get('MAINTENANCE_CHUNK_SIZE') or 500)
+    SESSION_IDLE_TIMEOUT = int(os.environ.get('SESSION_IDLE_TIMEOUT') or 1800)
+    SESSION_RETENTION_DAYS = int(os.environ.get('SESSION_RETENTION_DAYS') or 90)
+    SESSION_ARCHIVE_URL = os.environ.get('SESSION_ARCHIVE_URL') or 'names_archive.db'
+    PROCESSED_EVENTS_RETENTION_DAYS = int(os.environ.get('PROCESSED_EVENTS_RETENTION_DAYS') or 7)
+    # Only the worker holding this lock runs scheduled passes (defaults to <DATABASE_URL>.maintenance.lock)
+    MAINTENANCE_LOCK = os.environ.get('MAINTENANCE_LOCK') or f'{DATABASE_URL}.maintenance.lock'
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     FLASK_DEBUG = True
+    STATIC_AUTO_RELOAD = os.environ.get('STATIC_AUTO_RELOAD', 'True').lower() == 'true'
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -40,6 +138,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DATABASE_URL = ':memory:'
+    SESSION_ARCHIVE_URL = ':memory:'
+    MAINTENANCE_ENABLED = False
 
 # Configuration dictionary
 config = {
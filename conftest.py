@@ -0,0 +1,9 @@
+"""
+pytest setup: test modules that import app share one instance, so it must be
+created with the testing configuration (in-memory database) whichever module
+imports it first
+"""
+
+import os
+
+os.environ.setdefault('FLASK_ENV', 'testing')
@@ -0,0 +1,196 @@
+"""
+Bounded SQLite connection pool used by the Flask app.
+
+Connections are opened lazily, tuned once with the configured PRAGMAs and
+then reused across requests so that the per-connection statement cache stays
+warm. An in-memory database is served by a single shared connection so every
+request sees the same data.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable sqlite3 connections"""
+
+    def __init__(self, database, max_size=5, timeout=5.0, busy_timeout_ms=5000,
+                 synchronous='NORMAL', cache_size_kb=8192, mmap_size=67108864,
+                 statement_cache_size=256, connection_factory=sqlite3.Connection,
+                 wait_observer=None):
+        self.database = database
+        self.is_memory = database == ':memory:'
+        # A private :memory: database only exists for the connection that created it
+        self.max_size = 1 if self.is_memory else max(1, int(max_size))
+        self.timeout = timeout
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self.synchronous = synchronous
+        self.cache_size_kb = int(cache_size_kb)
+        self.mmap_size = int(mmap_size)
+        self.statement_cache_size = int(statement_cache_size)
+        self.connection_factory = connection_factory
+        # Called with the seconds spent in every acquire(), e.g. a metrics histogram
+        self.wait_observer = wait_observer
+
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._wal_checked = False
+
+        # Metrics
+        self._acquired = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @classmethod
+    def from_config(cls, cfg, **kwargs):
+        """Build a pool from a config class"""
+        return cls(
+            cfg.DATABASE_URL,
+            max_size=cfg.DB_POOL_SIZE,
+            timeout=cfg.DB_POOL_TIMEOUT,
+            busy_timeout_ms=cfg.SQLITE_BUSY_TIMEOUT_MS,
+            synchronous=cfg.SQLITE_SYNCHRONOUS,
+            cache_size_kb=cfg.SQLITE_CACHE_SIZE_KB,
+            mmap_size=cfg.SQLITE_MMAP_SIZE,
+            statement_cache_size=cfg.SQLITE_STATEMENT_CACHE_SIZE,
+            **kwargs
+        )
+
+    def _connect(self):
+        """Open and tune a new connection"""
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000.0,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+            factory=self.connection_factory,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout_ms}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        # Negative cache_size is expressed in KiB rather than pages
+        conn.execute(f'PRAGMA cache_size = -{self.cache_size_kb}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        if not self.is_memory:
+            conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+            if not self._wal_checked:
+                # journal_mode is persistent, so this only does work on first boot
+                conn.execute('PRAGMA journal_mode = WAL')
+                self._wal_checked = True
+        return conn
+
+    def acquire(self):
+        """Take a connection from the pool, opening one if there is room"""
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('Connection pool is closed')
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s'
+                    )
+                self._cond.wait(remaining)
+
+            elapsed = time.perf_counter() - started
+            self._acquired += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += elapsed
+            self._wait_time_max = max(self._wait_time_max, elapsed)
+
+        if self.wait_observer is not None:
+            self.wait_observer(elapsed)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped instead of being handed out again
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close idle connections and stop handing out new ones"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._size -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """Snapshot of pool size and wait-time metrics"""
+        with self._cond:
+            acquired = self._acquired
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'acquired_total': acquired,
+                'waits_total': self._waits,
+                'timeouts_total': self._timeouts,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 3),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / acquired, 3) if acquired else 0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+            }
@@ -0,0 +1,188 @@
+"""
+Batched reader telemetry for ``/api/events/batch``.
+
+A batch carries typed events (page_view, page_read, names_set, session_end) with
+client timestamps and client-generated ids. The whole batch is validated
+first, then every event not seen before is applied in one transaction
+together with its idempotency key, so a retried batch is a no-op.
+
+page_view moves a session's progress; page_read is sent when the reader
+leaves a page and is appended to the page_events log with its dwell time.
+"""
+
+import time
+from datetime import datetime, timezone
+
+EVENT_TYPES = ('page_view', 'page_read', 'names_set', 'session_end')
+MAX_EVENT_ID_LENGTH = 64
+# Client clocks are clamped to [now - MAX_EVENT_AGE, now]
+MAX_EVENT_AGE = 30 * 24 * 3600
+# Longer dwell times are idle tabs, not reading
+MAX_DWELL_MS = 30 * 60 * 1000
+
+
+class InvalidEvent(ValueError):
+    """A batch failed validation; index points at the offending event"""
+
+    def __init__(self, message, index=None):
+        self.index = index
+        super().__init__(message if index is None else f'Event {index}: {message}')
+
+
+def _timestamp(value, index, now):
+    """Client epoch milliseconds -> SQLite UTC datetime string, clamped to a sane window"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise InvalidEvent('ts must be epoch milliseconds', index)
+    seconds = min(max(value / 1000.0, now - MAX_EVENT_AGE), now)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _int(value, name, index, minimum=0):
+    if isinstance(value, bool):
+        raise InvalidEvent(f'{name} must be an integer', index)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidEvent(f'{name} must be an integer', index)
+    if value < minimum:
+        raise InvalidEvent(f'{name} must be at least {minimum}', index)
+    return value
+
+
+def parse_batch(data, max_events, validate_names, now=None):
+    """Validate a batch payload; returns (user_id, normalised events)"""
+    if not isinstance(data, dict):
+        raise InvalidEvent('Request body must be a JSON object')
+    user_id = data.get('user_id')
+    if not user_id or not isinstance(user_id, str):
+        raise InvalidEvent('User ID required')
+    raw_events = data.get('events')
+    if not isinstance(raw_events, list) or not raw_events:
+        raise InvalidEvent('events must be a non-empty list')
+    if len(raw_events) > max_events:
+        raise InvalidEvent(f'At most {max_events} events per batch')
+
+    now = time.time() if now is None else now
+    default_session = data.get('session_id')
+    events = []
+    for index, raw in enumerate(raw_events):
+        if not isinstance(raw, dict):
+            raise InvalidEvent('must be an object', index)
+        event_id = raw.get('id')
+        if not isinstance(event_id, str) or not 0 < len(event_id) <= MAX_EVENT_ID_LENGTH:
+            raise InvalidEvent(f'id must be a string of 1-{MAX_EVENT_ID_LENGTH} characters', index)
+        event_type = raw.get('type')
+        if event_type not in EVENT_TYPES:
+            raise InvalidEvent(f"type must be one of {', '.join(EVENT_TYPES)}", index)
+
+        event = {
+            'index': index,
+            'id': event_id,
+            'type': event_type,
+            'ts': raw.get('ts'),
+            'at': _timestamp(raw.get('ts'), index, now),
+        }
+        if event_type == 'names_set':
+            female = str(raw.get('female') or '').strip()
+            male = str(raw.get('male') or '').strip()
+            error = 'Both names required' if not (female and male) else validate_names(female, male)
+            if error:
+                raise InvalidEvent(error, index)
+            event['female'], event['male'] = female, male
+        else:
+            event['session_id'] = _int(raw.get('session_id', default_session), 'session_id', index, 1)
+            if event_type in ('page_view', 'page_read'):
+                event['page'] = _int(raw.get('page'), 'page', index)
+            if event_type == 'page_read':
+                event['dwell_ms'] = min(_int(raw.get('dwell_ms'), 'dwell_ms', index), MAX_DWELL_MS)
+                event['viewed_at'] = _timestamp(event['ts'] - event['dwell_ms'], index, now)
+        events.append(event)
+    return user_id, events
+
+
+def apply_batch(conn, user_id, events, pending_progress=None):
+    """Apply unseen events in one transaction; returns (results, progress written)
+
+    pending_progress holds buffered pages_read for the batch's sessions that
+    has not reached the database yet; it is written first so batch events win.
+    """
+    session_ids = sorted({e['session_id'] for e in events if 'session_id' in e})
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if conn.execute('SELECT 1 FROM users WHERE id = ?', (user_id,)).fetchone() is None:
+            raise LookupError('Invalid user ID')
+
+        if session_ids:
+            placeholders = ','.join('?' * len(session_ids))
+            # Session id -> the book it reads, which page_read events are logged under
+            owned = dict(conn.execute(
+                f'SELECT id, book_id FROM user_sessions WHERE user_id = ? AND id IN ({placeholders})',
+                [user_id] + session_ids
+            ).fetchall())
+            for event in events:
+                if 'session_id' in event and event['session_id'] not in owned:
+                    raise InvalidEvent('Unknown session', event['index'])
+
+        placeholders = ','.join('?' * len(events))
+        seen = {row[0] for row in conn.execute(
+            f'SELECT event_id FROM processed_events WHERE user_id = ? AND event_id IN ({placeholders})',
+            [user_id] + [e['id'] for e in events]
+        )}
+
+        results = []
+        new_events = []
+        for event in events:
+            if event['id'] in seen:
+                results.append({'id': event['id'], 'status': 'duplicate'})
+            else:
+                seen.add(event['id'])
+                new_events.append(event)
+                results.append({'id': event['id'], 'status': 'applied'})
+
+        # Client time order decides which page view is the latest
+        new_events.sort(key=lambda e: (e['ts'], e['index']))
+        progress = dict(pending_progress or {})
+        names = []
+        reads = []
+        ends = {}
+        for event in new_events:
+            if event['type'] == 'page_view':
+                progress[event['session_id']] = event['page']
+            elif event['type'] == 'page_read':
+                reads.append((event['session_id'], user_id, owned[event['session_id']],
+                              event['page'], event['viewed_at'], event['dwell_ms']))
+            elif event['type'] == 'names_set':
+                names.append((user_id, event['female'], event['male'], event['at']))
+            else:
+                ends.setdefault(event['session_id'], event['at'])
+
+        if progress:
+            conn.executemany('UPDATE user_sessions SET pages_read = ? WHERE id = ?',
+                             [(pages, sid) for sid, pages in progress.items()])
+        if names:
+            conn.executemany('''
+                INSERT INTO user_names (user_id, female_name, male_name, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, female_name, male_name) DO UPDATE
+                SET usage_count = usage_count + 1, created_at = excluded.created_at
+            ''', names)
+        if reads:
+            # Rollups and per-page depth are maintained by triggers on page_events
+            conn.executemany('''
+                INSERT INTO page_events (session_id, user_id, book_id, page, viewed_at, dwell_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', reads)
+        if ends:
+            # The first end wins so a replayed end never moves it
+            conn.executemany('UPDATE user_sessions SET session_end = COALESCE(session_end, ?) WHERE id = ?',
+                             [(at, sid) for sid, at in ends.items()])
+        conn.executemany(
+            'INSERT INTO processed_events (user_id, event_id, event_type) VALUES (?, ?, ?)',
+            [(user_id, e['id'], e['type']) for e in new_events]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results, progress
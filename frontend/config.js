@@ -18,6 +18,9 @@ class FrontendConfig {
             ? 'https://novel-ebook.onrender.com' 
             : 'http://localhost:5000';
         
+        // Catalog book to read (?book=<slug>); the configured book when absent
+        this.bookSlug = new URLSearchParams(window.location.search).get('book');
+        
         // Log configuration for debugging
         console.log(`Frontend Config: Environment detected as ${isProduction ? 'production' : 'development'}`);
         console.log(`Frontend Config: API Base URL set to ${this.API_BASE_URL}`);
@@ -55,10 +58,41 @@ class FrontendConfig {
         return this.getApiUrl('api/end-session');
     }
 
+    get eventsBatchUrl() {
+        return this.getApiUrl('api/events/batch');
+    }
+
+    get bookUrl() {
+        return this.getApiUrl(this.bookSlug ? `api/books/${encodeURIComponent(this.bookSlug)}` : 'api/book');
+    }
+
+    get booksUrl() {
+        return this.getApiUrl('api/books');
+    }
+
+    bookPageUrl(page, female, male) {
+        const params = new URLSearchParams();
+        if (female) params.set('female', female);
+        if (male) params.set('male', male);
+        const query = params.toString();
+        const path = this.bookSlug
+            ? `api/books/${encodeURIComponent(this.bookSlug)}/pages/${page}`
+            : `api/book/pages/${page}`;
+        return this.getApiUrl(path) + (query ? `?${query}` : '');
+    }
+
     get adminStatsUrl() {
         return this.getApiUrl('api/admin/stats');
     }
 
+    get adminSearchUrl() {
+        return this.getApiUrl('api/admin/users/search');
+    }
+
+    get adminExportUrl() {
+        return this.getApiUrl('api/admin/export');
+    }
+
     get backupUrl() {
         return this.getApiUrl('api/backup');
     }
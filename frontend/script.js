@@ -1,9 +1,131 @@
 // E-Book Navigation and Features - Professional Novel Layout
+// Reader events queued in localStorage and sent in batches to /api/events/batch.
+// Every event has a client id, so a batch that is retried (or was already sent
+// by sendBeacon) is only applied once on the server.
+class EventQueue {
+    constructor(storageKey = 'ebookEventQueue') {
+        this.storageKey = storageKey;
+        this.maxBatch = 100;
+        this.maxQueued = 500;
+        this.flushDelay = 2000;
+        this.retryDelay = 15000;
+        this.flushTimer = null;
+        this.flushing = false;
+        
+        try {
+            this.events = JSON.parse(localStorage.getItem(storageKey)) || [];
+        } catch (e) {
+            this.events = [];
+        }
+        
+        window.addEventListener('online', () => this.flush());
+    }
+
+    newId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+    }
+
+    persist() {
+        try {
+            localStorage.setItem(this.storageKey, JSON.stringify(this.events));
+        } catch (e) {
+            console.error('Failed to persist event queue:', e);
+        }
+    }
+
+    push(userId, type, data) {
+        // Only the newest page view of a session matters
+        if (type === 'page_view') {
+            this.events = this.events.filter(e => !(e.type === 'page_view' && e.session_id === data.session_id));
+        }
+        this.events.push({ id: this.newId(), user_id: userId, type, ts: Date.now(), ...data });
+        if (this.events.length > this.maxQueued) {
+            this.events = this.events.slice(-this.maxQueued);
+        }
+        this.persist();
+        this.scheduleFlush(this.flushDelay);
+    }
+
+    scheduleFlush(delay) {
+        if (this.flushTimer) return;
+        this.flushTimer = setTimeout(() => {
+            this.flushTimer = null;
+            this.flush();
+        }, delay);
+    }
+
+    nextBatch() {
+        if (this.events.length === 0) return null;
+        const userId = this.events[0].user_id;
+        const events = this.events.filter(e => e.user_id === userId).slice(0, this.maxBatch);
+        return {
+            user_id: userId,
+            events: events.map(({ user_id, ...event }) => event)
+        };
+    }
+
+    remove(ids) {
+        const sent = new Set(ids);
+        this.events = this.events.filter(e => !sent.has(e.id));
+        this.persist();
+    }
+
+    async flush() {
+        if (this.flushing || !navigator.onLine) return;
+        this.flushing = true;
+        
+        try {
+            let batch;
+            while ((batch = this.nextBatch())) {
+                const response = await fetch(frontendConfig.eventsBatchUrl, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(batch)
+                });
+                
+                if (response.ok) {
+                    this.remove(batch.events.map(e => e.id));
+                } else if (response.status === 400 || response.status === 404) {
+                    // Drop what the server will never accept instead of retrying it forever
+                    const data = await response.json().catch(() => ({}));
+                    const rejected = Number.isInteger(data.index)
+                        ? [batch.events[data.index].id]
+                        : batch.events.map(e => e.id);
+                    this.remove(rejected);
+                } else {
+                    break;
+                }
+            }
+        } catch (error) {
+            // Offline or server unreachable: events stay queued
+            console.error('Failed to send reader events:', error);
+        } finally {
+            this.flushing = false;
+            if (this.events.length > 0) {
+                this.scheduleFlush(this.retryDelay);
+            }
+        }
+    }
+
+    flushOnUnload() {
+        // Events are kept until a normal flush confirms them; replays are ignored server-side
+        const batch = this.nextBatch();
+        if (batch && navigator.sendBeacon) {
+            navigator.sendBeacon(frontendConfig.eventsBatchUrl, JSON.stringify(batch));
+        }
+    }
+}
+
 class EBookReader {
     
     constructor() {
         this.currentPage = 0;
-        this.totalPages = 30; // Now only 30 pages
+        this.totalPages = 30; // Replaced by the server's page count in loadBookInfo()
+        // The book's own character names, also replaced in loadBookInfo()
+        this.defaultNames = { female: 'Sameena', male: 'Sanjay' };
         this.fontSize = 12; // Default font size in pt (matches Garamond 12pt)
         this.isDarkMode = false;
         
@@ -11,6 +133,17 @@ class EBookReader {
         this.currentUser = null;
         this.currentSession = null;
         this.userStats = null;
+        this.eventQueue = new EventQueue();
+        this.pageEnteredAt = Date.now();
+        
+        // Story pages are fetched on demand and personalised on the server
+        this.storyUnlocked = false;
+        this.femaleName = localStorage.getItem('ebookFemaleName') || '';
+        this.maleName = localStorage.getItem('ebookMaleName') || '';
+        this.pageCache = new Map();
+        this.pageRequests = new Map();
+        this.pageGeneration = 0;
+        this.maxCachedPages = 8;
         
         // Touch/swipe variables
         this.startX = 0;
@@ -27,6 +160,8 @@ class EBookReader {
         this.applyFontSize();
         this.initializeStoryPages(); // Hide story pages by default - require library card login
         this.checkExistingSession();
+        this.loadBookInfo();
+        this.eventQueue.flush();
     }
 
     initializeElements() {
@@ -36,7 +171,8 @@ class EBookReader {
         this.fontSizeBtn = document.getElementById('fontSizeBtn');
         this.themeBtn = document.getElementById('themeBtn');
         this.progressBar = document.getElementById('progressBar');
-        this.pages = document.querySelectorAll('.page');
+        this.coverPage = document.getElementById('page-0');
+        this.storyPage = document.getElementById('storyPage');
         
         // Library card elements
         this.libraryIdInput = document.getElementById('libraryIdInput');
@@ -159,7 +295,7 @@ class EBookReader {
             const response = await fetch(frontendConfig.loginUrl, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ library_id: libraryId })
+                body: JSON.stringify({ library_id: libraryId, book: frontendConfig.bookSlug || undefined })
             });
             
             const data = await response.json();
@@ -179,7 +315,7 @@ class EBookReader {
                 
                 this.showUserInterface();
                 this.loadUserStats();
-                this.showStatus('Login successful!', 'success');
+                this.showStatus(data.resumed ? 'Welcome back! Continuing your reading session.' : 'Login successful!', 'success');
             } else {
                 this.showStatus('Login failed: ' + data.error, 'error');
             }
@@ -240,8 +376,8 @@ class EBookReader {
     }
 
     async saveNamesAndStartReading() {
-        const femaleName = this.femaleNameInput.value.trim() || 'Sameena';
-        const maleName = this.maleNameInput.value.trim() || 'Sanjay';
+        const femaleName = this.femaleNameInput.value.trim() || this.defaultNames.female;
+        const maleName = this.maleNameInput.value.trim() || this.defaultNames.male;
 
         this.setNamesBtn.disabled = true;
         this.setNamesBtn.textContent = 'Saving...';
@@ -253,7 +389,7 @@ class EBookReader {
                 localStorage.setItem('ebookFemaleName', femaleName);
                 localStorage.setItem('ebookMaleName', maleName);
                 this.showNameStatus('Names set! Enjoy your story.', 'success');
-                this.replaceNamesInBook(femaleName, maleName);
+                this.setNames(femaleName, maleName);
                 this.showStoryPages();
             } else {
                 this.showNameStatus('Failed to save. Please try again.', 'error');
@@ -267,48 +403,54 @@ class EBookReader {
     }
 
     async saveNamesToDatabase(female, male) {
-                    const response = await fetch(frontendConfig.saveNamesUrl, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ 
-                user_id: this.currentUser.user_id,
-                female, 
-                male 
-            })
-        });
-        return response.ok;
+        try {
+            const response = await fetch(frontendConfig.saveNamesUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ 
+                    user_id: this.currentUser.user_id,
+                    female, 
+                    male 
+                })
+            });
+            return response.ok;
+        } catch (error) {
+            // Offline: the event queue delivers the names once we are back online
+            this.eventQueue.push(this.currentUser.user_id, 'names_set', { female, male });
+            return true;
+        }
     }
 
-    async updateSessionProgress() {
+    updateSessionProgress() {
         if (this.currentSession) {
-            try {
-                await fetch(frontendConfig.updateSessionUrl, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ 
-                        session_id: this.currentSession.session_id,
-                        pages_read: this.currentPage + 1
-                    })
-                });
-            } catch (error) {
-                console.error('Failed to update session:', error);
-            }
+            this.eventQueue.push(this.currentUser.user_id, 'page_view', {
+                session_id: this.currentSession.session_id,
+                page: this.currentPage + 1
+            });
+        }
+    }
+
+    // Log time spent on the current page and restart the dwell timer
+    recordPageRead() {
+        const now = Date.now();
+        const dwell = now - this.pageEnteredAt;
+        this.pageEnteredAt = now;
+        if (this.currentSession && this.storyUnlocked && dwell >= 1000) {
+            this.eventQueue.push(this.currentUser.user_id, 'page_read', {
+                session_id: this.currentSession.session_id,
+                page: this.currentPage,
+                dwell_ms: dwell
+            });
         }
     }
 
-    async endCurrentSession() {
+    endCurrentSession() {
         if (this.currentSession) {
-            try {
-                await fetch(frontendConfig.endSessionUrl, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ 
-                        session_id: this.currentSession.session_id
-                    })
-                });
-            } catch (error) {
-                console.error('Failed to end session:', error);
-            }
+            this.recordPageRead();
+            this.eventQueue.push(this.currentUser.user_id, 'session_end', {
+                session_id: this.currentSession.session_id
+            });
+            this.eventQueue.flush();
         }
     }
 
@@ -329,13 +471,17 @@ class EBookReader {
     }
 
     hideStoryPages() {
-        const storyPages = document.querySelectorAll('.page:not(#page-0)');
-        storyPages.forEach(page => page.style.display = 'none');
+        this.storyUnlocked = false;
+        this.storyPage.style.display = 'none';
     }
 
     showStoryPages() {
-        const storyPages = document.querySelectorAll('.page:not(#page-0)');
-        storyPages.forEach(page => page.style.display = '');
+        this.storyUnlocked = true;
+        this.storyPage.style.display = '';
+        if (this.currentPage > 0) {
+            this.renderStoryPage(this.currentPage);
+        }
+        this.prefetchAround(this.currentPage);
     }
 
     // Hide story pages by default - require library card login
@@ -343,11 +489,95 @@ class EBookReader {
         this.hideStoryPages();
     }
 
-    replaceNamesInBook(female, male) {
-        document.querySelectorAll('.novel-text').forEach(el => {
-            el.innerHTML = el.innerHTML
-                .replace(/Sameena/g, female)
-                .replace(/Sanjay/g, male);
+    setNames(female, male) {
+        this.femaleName = female;
+        this.maleName = male;
+        // Pages already fetched carry the previous names
+        this.pageCache.clear();
+        this.pageRequests.clear();
+        this.pageGeneration++;
+    }
+
+    async loadBookInfo() {
+        try {
+            const response = await fetch(frontendConfig.bookUrl);
+            const data = await response.json();
+
+            if (data.success) {
+                this.totalPages = data.total_pages;
+                this.defaultNames = data.default_names;
+                this.updatePageInfo();
+                this.updateNavigationButtons();
+                this.updateProgress();
+            }
+        } catch (error) {
+            console.error('Failed to load book info:', error);
+        }
+    }
+
+    fetchPage(pageIndex) {
+        if (this.pageCache.has(pageIndex)) {
+            return Promise.resolve(this.pageCache.get(pageIndex));
+        }
+        if (this.pageRequests.has(pageIndex)) {
+            return this.pageRequests.get(pageIndex);
+        }
+
+        const generation = this.pageGeneration;
+        const url = frontendConfig.bookPageUrl(pageIndex, this.femaleName, this.maleName);
+        const request = fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                if (generation === this.pageGeneration) {
+                    this.pageCache.set(pageIndex, data.html);
+                    // Keep only a small window of pages around the reader
+                    if (this.pageCache.size > this.maxCachedPages) {
+                        this.pageCache.delete(this.pageCache.keys().next().value);
+                    }
+                }
+                return data.html;
+            })
+            .finally(() => {
+                if (this.pageRequests.get(pageIndex) === request) {
+                    this.pageRequests.delete(pageIndex);
+                }
+            });
+
+        this.pageRequests.set(pageIndex, request);
+        return request;
+    }
+
+    async renderStoryPage(pageIndex) {
+        let html;
+        try {
+            html = await this.fetchPage(pageIndex);
+        } catch (error) {
+            console.error('Failed to load page:', error);
+            return;
+        }
+
+        // The reader may have turned the page again while this one loaded
+        if (this.currentPage !== pageIndex || !this.storyUnlocked) return;
+
+        this.storyPage.innerHTML = html;
+        const page = this.storyPage.querySelector('.page');
+        if (page) {
+            page.classList.add('active');
+        }
+        this.applyFontSize();
+        this.addPageChangeFeedback();
+    }
+
+    prefetchAround(pageIndex) {
+        if (!this.storyUnlocked) return;
+
+        [pageIndex + 1, pageIndex - 1].forEach(neighbour => {
+            if (neighbour > 0 && neighbour < this.totalPages) {
+                this.fetchPage(neighbour).catch(() => {});
+            }
         });
     }
 
@@ -369,16 +599,13 @@ class EBookReader {
     }
 
     showPage(pageIndex) {
-        // Hide all pages
-        this.pages.forEach(page => {
-            page.classList.remove('active');
-        });
+        this.goToPage(pageIndex);
+    }
 
-        // Show current page
-        if (this.pages[pageIndex]) {
-            this.pages[pageIndex].classList.add('active');
+    async goToPage(pageIndex) {
+        if (pageIndex !== this.currentPage) {
+            this.recordPageRead();
         }
-
         this.currentPage = pageIndex;
         this.updatePageInfo();
         this.updateNavigationButtons();
@@ -391,9 +618,20 @@ class EBookReader {
         } else {
             window.scrollTo(0, 0);
         }
-        
-        // Add visual feedback for page change on mobile
-        this.addPageChangeFeedback();
+
+        // The cover lives in the page shell; story pages come from the server
+        if (pageIndex === 0) {
+            this.coverPage.classList.add('active');
+            this.storyPage.innerHTML = '';
+            this.addPageChangeFeedback();
+        } else {
+            this.coverPage.classList.remove('active');
+            if (this.storyUnlocked) {
+                await this.renderStoryPage(pageIndex);
+            }
+        }
+
+        this.prefetchAround(pageIndex);
     }
 
     nextPage() {
@@ -540,10 +778,21 @@ document.addEventListener('DOMContentLoaded', () => {
     // Apply mobile optimizations
     reader.optimizeForMobile();
     
+    // Time in a background tab is not reading time
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') {
+            reader.recordPageRead();
+            reader.eventQueue.flushOnUnload();
+        } else {
+            reader.pageEnteredAt = Date.now();
+        }
+    });
+    
     // Handle page unload to end session
     window.addEventListener('beforeunload', () => {
         if (reader.currentSession) {
             reader.endCurrentSession();
         }
+        reader.eventQueue.flushOnUnload();
     });
 });
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Gunicorn settings and lifecycle hooks for production serving.
+
+- on_starting: migrate the schema once, under a file lock, in the master
+- post_worker_init: prime each worker's pool and render caches; the session
+  reaper starts everywhere but only the worker holding its lock runs passes
+- worker_exit: flush buffered progress writes and close connections
+"""
+
+import os
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from config import config as app_configs  # noqa: E402
+
+cfg = app_configs[os.environ['FLASK_ENV']]
+
+wsgi_app = 'wsgi:app'
+bind = f'{cfg.HOST}:{cfg.PORT}'
+workers = cfg.WEB_CONCURRENCY
+# Threads share one connection pool and write buffer per worker
+worker_class = 'gthread'
+threads = cfg.WEB_THREADS
+timeout = cfg.WORKER_TIMEOUT
+graceful_timeout = cfg.GRACEFUL_TIMEOUT
+# Each worker imports the app itself so no pool connections or threads cross a fork
+preload_app = False
+accesslog = '-'
+loglevel = cfg.LOG_LEVEL.lower()
+
+
+def on_starting(server):
+    import lifecycle
+    applied = lifecycle.migrate_once(cfg.DATABASE_URL)
+    server.log.info(f"Migrations applied: {applied or 'none'}")
+
+
+def post_worker_init(worker):
+    import app
+    if cfg.DATABASE_URL == ':memory:':
+        # Nothing was migrated in the master; each worker has its own database
+        app.init_db()
+    app.warm_up()
+    app.start_background_jobs()
+
+
+def worker_exit(server, worker):
+    import app
+    app.shutdown()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Offline build of a book's page store from its .docx manuscript.
+
+The .docx is read with zipfile and streamed through ElementTree.iterparse,
+one paragraph at a time, so memory stays flat however long the manuscript
+is. Paragraphs are packed greedily onto A5 pages using a line budget that
+approximates the reader's layout (12pt Garamond, 0.6in margins); chapter
+headings and explicit page breaks always start a new page, and the
+manuscript's own "Page N" markers are dropped. Each page is emitted in the
+same markup as book/when-hearts-whisper.html and written to a SQLite page
+store keyed by page number, which BookRenderer.from_store() loads:
+
+    python ingest_book.py "When Hearts Whisper.docx" book/when-hearts-whisper.pages.db
+
+With --register the store also becomes the current edition of a book in the
+application database's catalog (paths are relative to the application root):
+
+    python ingest_book.py novel.docx book/novel.pages.db --register names.db --slug novel \
+        --female Asha --male Ravi
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import zipfile
+from contextlib import closing
+from datetime import datetime, timezone
+from html import escape
+from xml.etree.ElementTree import iterparse
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DOCUMENT_XML = 'word/document.xml'
+STORE_FORMAT = 1
+
+CHAPTER = re.compile(r'^Chapter\s+\d+\b', re.IGNORECASE)
+PAGE_MARKER = re.compile(r'^Page\s+\d+$', re.IGNORECASE)
+METADATA = re.compile(r'(Title|Author):\s*(.*?)(?=\s+(?:Title|Author):|$)')
+# Word form-field artefacts that carry no story text
+ARTEFACTS = {'Top of Form', 'Bottom of Form'}
+QUOTES = '"“‘\''
+
+# Reader layout: text width of 7.3in at 12pt Garamond, heading plus spacing
+CHARS_PER_LINE = 55
+LINES_PER_PAGE = 24
+HEADING_LINES = 3
+
+
+def iter_paragraphs(path):
+    """Yield {'lines', 'bold'} per <w:p>, streaming document.xml; None in lines is a page break"""
+    with zipfile.ZipFile(path) as archive, archive.open(DOCUMENT_XML) as document:
+        lines, current, bold = [], [], False
+        in_properties = False
+        for event, element in iterparse(document, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if tag == W + 'p':
+                    lines, current, bold = [], [], False
+                elif tag == W + 'pPr':
+                    in_properties = True
+                continue
+
+            if tag == W + 'pPr':
+                # Formatting of the paragraph mark itself, not of its text
+                in_properties = False
+
+            elif tag == W + 't':
+                current.append(element.text or '')
+            elif tag == W + 'tab':
+                current.append(' ')
+            elif tag == W + 'br':
+                # Soft line breaks separate lines of verse and chat messages
+                lines.append(''.join(current))
+                current = []
+                if element.get(W + 'type') == 'page':
+                    lines.append(None)
+            elif tag == W + 'b' and not in_properties and element.get(W + 'val') not in ('0', 'false'):
+                bold = True
+            elif tag == W + 'p':
+                lines.append(''.join(current))
+                yield {
+                    'lines': [line if line is None else line.strip()
+                              for line in lines if line is None or line.strip()],
+                    'bold': bold,
+                }
+                element.clear()
+
+
+def read_manuscript(path):
+    """Metadata and a flat list of ('heading' | 'break' | 'text', text, css class) blocks"""
+    meta = {}
+    blocks = []
+    for paragraph in iter_paragraphs(path):
+        for line in paragraph['lines']:
+            if line is None:
+                blocks.append(('break', '', None))
+            elif line in ARTEFACTS or PAGE_MARKER.match(line):
+                continue
+            elif not blocks and METADATA.findall(line):
+                meta.update((key.lower(), value.strip()) for key, value in METADATA.findall(line))
+            elif CHAPTER.match(line):
+                blocks.append(('heading', line, 'chapter-title'))
+            elif paragraph['bold'] and line[0] in QUOTES:
+                blocks.append(('text', line, 'message'))
+            else:
+                blocks.append(('text', line, None))
+    return meta, blocks
+
+
+def _lines(text, chars_per_line):
+    return max(1, -(-len(text) // chars_per_line))
+
+
+def paginate(blocks, lines_per_page=LINES_PER_PAGE, chars_per_line=CHARS_PER_LINE):
+    """Pack blocks onto pages; returns [{'heading': str or None, 'paragraphs': [(text, class)]}]"""
+    pages = []
+    page = None
+    used = 0
+    for kind, text, css in blocks:
+        if kind == 'break':
+            page = None
+            continue
+        if kind == 'heading':
+            page = {'heading': text, 'paragraphs': []}
+            pages.append(page)
+            used = HEADING_LINES
+            continue
+        cost = _lines(text, chars_per_line)
+        # A paragraph longer than a whole page still gets a page of its own
+        if page is None or (used + cost > lines_per_page and page['paragraphs']):
+            page = {'heading': None, 'paragraphs': []}
+            pages.append(page)
+            used = 0
+        page['paragraphs'].append((text, css))
+        used += cost
+    return pages
+
+
+def render_page(number, page):
+    """Page markup matching the hand-written story pages"""
+    out = [f'<div id="page-{number}" class="page">',
+           '    <div class="a5-page">',
+           '        <div class="page-content">']
+    if page['heading']:
+        out.append(f'            <h2 class="chapter-title">{escape(page["heading"], quote=False)}</h2>')
+    out.append('            <div class="novel-text">')
+    for text, css in page['paragraphs']:
+        attrs = f' class="{css}"' if css else ''
+        out.append(f'                <p{attrs}>{escape(text, quote=False)}</p>')
+    out.extend(['            </div>', '        </div>', '    </div>', '</div>'])
+    return '\n'.join(out)
+
+
+def write_store(path, pages, meta):
+    """Write pages to a SQLite page store, replacing any existing one atomically"""
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    with closing(sqlite3.connect(partial)) as conn:
+        conn.execute('PRAGMA page_size = 4096')
+        conn.execute('CREATE TABLE book_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+        conn.execute('''
+            CREATE TABLE pages (
+                page INTEGER PRIMARY KEY,
+                html TEXT NOT NULL,
+                words INTEGER NOT NULL
+            )
+        ''')
+        conn.executemany('INSERT INTO pages (page, html, words) VALUES (?, ?, ?)', [
+            (number, html, len(re.sub(r'<[^>]+>', ' ', html).split()))
+            for number, html in pages.items()
+        ])
+        conn.executemany('INSERT INTO book_meta (key, value) VALUES (?, ?)',
+                         [(key, str(value)) for key, value in meta.items()])
+        conn.commit()
+        conn.execute('VACUUM')
+    os.replace(partial, path)
+
+
+def build(source, output, first_page=1, lines_per_page=LINES_PER_PAGE,
+          chars_per_line=CHARS_PER_LINE, female=None, male=None):
+    """Ingest a .docx into a page store; returns the metadata written"""
+    meta, blocks = read_manuscript(source)
+    laid_out = paginate(blocks, lines_per_page, chars_per_line)
+    pages = {first_page + i: render_page(first_page + i, page) for i, page in enumerate(laid_out)}
+
+    with open(source, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    meta.update({
+        'format': STORE_FORMAT,
+        'source': os.path.basename(source),
+        'source_sha256': digest,
+        'built_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'first_page': first_page,
+        'total_pages': first_page + len(pages),
+    })
+    if female:
+        meta['female_placeholder'] = female
+    if male:
+        meta['male_placeholder'] = male
+    write_store(output, pages, meta)
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a page store from a .docx manuscript')
+    parser.add_argument('source', help='.docx manuscript')
+    parser.add_argument('output', help='page store to write, e.g. book/<slug>.pages.db')
+    parser.add_argument('--first-page', type=int, default=1,
+                        help='number of the first story page (page 0 is the cover)')
+    parser.add_argument('--lines-per-page', type=int, default=LINES_PER_PAGE)
+    parser.add_argument('--chars-per-line', type=int, default=CHARS_PER_LINE)
+    parser.add_argument('--female', help='female name placeholder used in the text')
+    parser.add_argument('--male', help='male name placeholder used in the text')
+    parser.add_argument('--register', metavar='DATABASE',
+                        help='add the store to the catalog of this application database')
+    parser.add_argument('--slug', help='catalog slug of the book (required with --register)')
+    parser.add_argument('--label', help='edition label shown in the catalog')
+    args = parser.parse_args(argv)
+    if args.register and not args.slug:
+        parser.error('--slug is required with --register')
+
+    if not zipfile.is_zipfile(args.source):
+        parser.error(f'{args.source} is not a .docx file')
+    meta = build(args.source, args.output, args.first_page, args.lines_per_page,
+                 args.chars_per_line, args.female, args.male)
+    print(f"✅ {meta.get('title', args.source)}: {meta['total_pages'] - meta['first_page']} pages "
+          f"written to {args.output}", file=sys.stderr)
+    if args.register:
+        edition_id = register(args.register, args.slug, args.output, meta, args.label)
+        print(f"✅ Edition {edition_id} is now the current edition of {args.slug}", file=sys.stderr)
+
+
+def register(database, slug, store, meta, label=None):
+    """Make a freshly built store the current edition of slug; returns the edition id"""
+    from catalog import register_edition, validate_slug
+    import migrations
+
+    error = validate_slug(slug)
+    if error:
+        raise ValueError(error)
+    if 'female_placeholder' not in meta or 'male_placeholder' not in meta:
+        raise ValueError('--female and --male are required to register a book')
+    with closing(sqlite3.connect(database, timeout=30.0, isolation_level=None)) as conn:
+        migrations.migrate(conn)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _, edition_id = register_edition(
+                conn, slug, meta.get('title') or slug, meta.get('author'), store,
+                meta['female_placeholder'], meta['male_placeholder'], meta['total_pages'], label)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return edition_id
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Collision-free library ID generation in the LIB-XXXX-XXXX format.
+
+IDs come from a database sequence handed out to each process in blocks, so
+uniqueness never depends on the UNIQUE constraint and most IDs cost no
+database round trip. Each sequence number is passed through a keyed Feistel
+permutation (with cycle walking) of the 36^7 space, so consecutive users do
+not get guessable consecutive IDs. The eighth character is a Luhn mod 36
+check digit, which lets malformed or mistyped IDs be rejected without a
+query. IDs issued before this scheme are kept in legacy_library_ids.
+
+The permutation key is stored in the settings table the first time it is
+needed and read from there afterwards, since a different key would map new
+sequence numbers onto IDs already issued. A configured key that disagrees
+with the stored one is refused with KeyMismatch.
+"""
+
+import hashlib
+import hmac
+import re
+import secrets
+import string
+import threading
+
+ALPHABET = string.digits + string.ascii_uppercase
+BASE = len(ALPHABET)
+DATA_CHARS = 7
+SPACE = BASE ** DATA_CHARS
+# Smallest even bit width whose range covers SPACE, split into two halves
+HALF_BITS = (SPACE - 1).bit_length() // 2 + (SPACE - 1).bit_length() % 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 6
+FORMAT = re.compile(r'^LIB-[0-9A-Z]{4}-[0-9A-Z]{4}$')
+SEQUENCE_NAME = 'library_id'
+KEY_SETTING = 'library_id_key'
+
+
+class SequenceExhausted(Exception):
+    """Every ID in the LIB-XXXX-XXXX space has been issued"""
+
+
+class KeyMismatch(RuntimeError):
+    """The configured key is not the one issued IDs were generated with"""
+
+
+def check_digit(chars):
+    """Luhn mod 36 check character for a string over ALPHABET"""
+    total = 0
+    factor = 2
+    for char in reversed(chars):
+        addend = factor * ALPHABET.index(char)
+        total += addend // BASE + addend % BASE
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(BASE - total % BASE) % BASE]
+
+
+def is_valid(library_id):
+    """True when library_id is well formed and its check digit matches"""
+    if not isinstance(library_id, str) or not FORMAT.match(library_id):
+        return False
+    chars = library_id[4:8] + library_id[9:13]
+    return check_digit(chars[:-1]) == chars[-1]
+
+
+def normalize(library_id):
+    return library_id.strip().upper() if isinstance(library_id, str) else library_id
+
+
+class LibraryIdCodec:
+    """Keyed bijection from sequence numbers to check-digited library IDs"""
+
+    def __init__(self, key):
+        self.key = key.encode('utf-8') if isinstance(key, str) else key
+
+    def _round(self, i, half):
+        digest = hmac.new(self.key, bytes([i]) + half.to_bytes(8, 'big'), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], 'big') & HALF_MASK
+
+    def _feistel(self, value):
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for i in range(ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << HALF_BITS) | right
+
+    def permute(self, value):
+        """Map [0, SPACE) onto itself; cycle walking keeps results in range"""
+        if not 0 <= value < SPACE:
+            raise ValueError(f'Sequence value {value} out of range')
+        value = self._feistel(value)
+        while value >= SPACE:
+            value = self._feistel(value)
+        return value
+
+    def encode(self, value):
+        number = self.permute(value)
+        chars = []
+        for _ in range(DATA_CHARS):
+            number, digit = divmod(number, BASE)
+            chars.append(ALPHABET[digit])
+        data = ''.join(reversed(chars))
+        data += check_digit(data)
+        return f'LIB-{data[:4]}-{data[4:]}'
+
+
+def ensure_key(conn, configured=None):
+    """The stored permutation key, storing the configured or a random one on first use"""
+    row = conn.execute('SELECT value FROM settings WHERE name = ?', (KEY_SETTING,)).fetchone()
+    if row is None:
+        key = configured or secrets.token_urlsafe(32)
+        # Another process may store its key first; everyone uses whichever won
+        conn.execute('INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)', (KEY_SETTING, key))
+        conn.commit()
+        row = conn.execute('SELECT value FROM settings WHERE name = ?', (KEY_SETTING,)).fetchone()
+    if configured and row[0] != configured:
+        raise KeyMismatch('LIBRARY_ID_KEY differs from the key stored with the issued library IDs')
+    return row[0]
+
+
+class LibraryIdGenerator:
+    """Hand out IDs from per-process blocks of the shared database sequence"""
+
+    def __init__(self, connection_factory, key=None, block_size=100, legacy_ids=None):
+        self.connection_factory = connection_factory
+        self.key = key
+        self._codec = None
+        self.block_size = block_size
+        # Randomly generated IDs from before the sequence; loaded on first use
+        # (after migrations) and skipped if the permutation ever lands on one
+        self._legacy_ids = legacy_ids
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+        self.blocks_allocated = 0
+
+    @property
+    def codec(self):
+        """Codec for the stored key, loaded (and checked against key) on first use"""
+        if self._codec is None:
+            with self.connection_factory() as conn:
+                self._codec = LibraryIdCodec(ensure_key(conn, self.key))
+        return self._codec
+
+    @property
+    def legacy_ids(self):
+        if self._legacy_ids is None:
+            with self.connection_factory() as conn:
+                rows = conn.execute('SELECT library_id FROM legacy_library_ids')
+                self._legacy_ids = frozenset(row[0] for row in rows)
+        return self._legacy_ids
+
+    def _allocate(self, size=None):
+        size = size or self.block_size
+        with self.connection_factory() as conn:
+            row = conn.execute(
+                'UPDATE sequences SET next_value = next_value + ? WHERE name = ? RETURNING next_value',
+                (size, SEQUENCE_NAME)
+            ).fetchone()
+            conn.commit()
+        end = min(row[0], SPACE)
+        start = row[0] - size
+        if start >= SPACE:
+            raise SequenceExhausted('No library IDs left')
+        self._next, self._end = start, end
+        self.blocks_allocated += 1
+
+    def _take(self):
+        while True:
+            if self._next >= self._end:
+                self._allocate()
+            value = self._next
+            self._next += 1
+            library_id = self.codec.encode(value)
+            if library_id not in self.legacy_ids:
+                return library_id
+
+    def next_id(self):
+        with self._lock:
+            return self._take()
+
+    def next_ids(self, count):
+        """Issue count IDs, reserving whatever the current block lacks in one round trip"""
+        with self._lock:
+            if count > self._end - self._next:
+                self._allocate(max(count, self.block_size))
+            return [self._take() for _ in range(count)]
+
+    def accepts(self, library_id):
+        """Cheap pre-check for login: check digit valid or a known legacy ID"""
+        return is_valid(library_id) or library_id in self.legacy_ids
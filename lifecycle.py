@@ -0,0 +1,61 @@
+"""
+Process lifecycle helpers for multi-worker serving.
+
+Schema migrations run once per deployment under an exclusive file lock, so
+concurrently starting processes (or several hosts sharing a volume) never
+race each other; whoever takes the lock second finds the schema current.
+Singleton background work (the session reaper) is elected the same way: the
+process holding a non-blocking lock does it until it exits.
+"""
+
+import logging
+import sqlite3
+from contextlib import closing
+
+import migrations
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_once(database, lock_path=None, timeout=30.0):
+    """Apply pending migrations while holding <database>.migrate.lock"""
+    if database == ':memory:':
+        # Every connection gets its own empty database; the process migrates it itself
+        logger.info("In-memory database: skipping the shared migration")
+        return []
+    lock_path = lock_path or f'{database}.migrate.lock'
+    with open(lock_path, 'a') as lock:
+        if fcntl is not None:
+            # Blocks until any other process has finished migrating
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with closing(sqlite3.connect(database, timeout=timeout)) as conn:
+                before = migrations.current_version(conn)
+                applied = migrations.migrate(conn)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    if applied:
+        logger.info(f"Database migrated from version {before} to {applied[-1]}")
+    else:
+        logger.info(f"Database schema is up to date (version {before})")
+    return applied
+
+
+def try_lock(lock_path):
+    """Take an exclusive lock without waiting; returns the open lock file, or None if held elsewhere"""
+    lock = open(lock_path, 'a')
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
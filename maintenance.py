@@ -0,0 +1,283 @@
+"""
+Background maintenance that keeps the live session tables small.
+
+Every run, in order:
+
+1. Sessions with no activity for ``idle_timeout`` seconds are closed, with
+   session_end set to their last activity.
+2. Sessions that ended more than ``retention_days`` ago are copied with their
+   page_events into an archive database, then folded into a per-user row of
+   session_summaries and deleted from the live tables.
+3. Idempotency keys in processed_events older than ``event_retention_days``
+   are pruned.
+
+With ``lock_path`` set, the background thread only runs in the process that
+holds that lock, so several workers sharing a database elect one reaper; the
+others retry the lock every interval and take over if the holder exits.
+
+All work happens in chunks of ``chunk_size`` rows, each in its own short
+transaction, so writers are never blocked for long. Counters and rollups are
+maintained incrementally by triggers and are not touched by archiving.
+"""
+
+import logging
+import threading
+import time
+
+from lifecycle import try_lock
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS archive.user_sessions (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        session_start DATETIME,
+        session_end DATETIME,
+        pages_read INTEGER,
+        last_activity DATETIME,
+        book_id INTEGER,
+        archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_sessions_user ON user_sessions (user_id);
+    CREATE TABLE IF NOT EXISTS archive.page_events (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        user_id TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        viewed_at DATETIME NOT NULL,
+        dwell_ms INTEGER NOT NULL DEFAULT 0,
+        book_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_page_events_session ON page_events (session_id);
+'''
+
+
+class SessionReaper:
+    """Close idle sessions, archive old ones and prune idempotency keys"""
+
+    def __init__(self, connection_factory, archive_database, idle_timeout=1800, retention_days=90,
+                 event_retention_days=7, chunk_size=500, interval=300.0, chunk_sleep=0.01,
+                 lock_path=None):
+        self.connection_factory = connection_factory
+        self.archive_database = archive_database
+        self.idle_timeout = idle_timeout
+        self.retention_days = retention_days
+        self.event_retention_days = event_retention_days
+        self.chunk_size = max(1, int(chunk_size))
+        self.interval = interval
+        self.chunk_sleep = chunk_sleep
+        self.lock_path = lock_path
+        self._leader_lock = None
+
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.runs = 0
+        self.failed_runs = 0
+        self.sessions_closed = 0
+        self.sessions_archived = 0
+        self.events_pruned = 0
+        self.last_run = None
+
+    def _chunks(self, conn, select_ids, work, params=()):
+        """Repeat work(conn, keys) one chunk at a time until select_ids finds nothing"""
+        total = 0
+        while not self._stopping.is_set():
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Selected inside the write transaction so concurrent reapers never share rows
+                rows = conn.execute(select_ids, (*params, self.chunk_size)).fetchall()
+                ids = [row[0] if len(row) == 1 else tuple(row) for row in rows]
+                if ids:
+                    work(conn, ids)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            total += len(ids)
+            if len(ids) < self.chunk_size:
+                break
+            time.sleep(self.chunk_sleep)
+        return total
+
+    def close_idle(self, conn):
+        """End sessions idle longer than idle_timeout at their last activity"""
+        def close(conn, ids):
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(f'''
+                UPDATE user_sessions SET session_end = COALESCE(last_activity, session_start)
+                WHERE id IN ({placeholders})
+            ''', ids)
+
+        return self._chunks(conn, '''
+            SELECT id FROM user_sessions
+            WHERE session_end IS NULL
+              AND COALESCE(last_activity, session_start) < datetime('now', ?)
+            LIMIT ?
+        ''', close, (f'-{int(self.idle_timeout)} seconds',))
+
+    def _copy_to_archive(self, conn, ids):
+        """Copy sessions and their page events into the attached archive"""
+        placeholders = ','.join('?' * len(ids))
+        conn.execute(f'''
+            INSERT OR IGNORE INTO archive.user_sessions
+                (id, user_id, session_start, session_end, pages_read, last_activity, book_id)
+            SELECT id, user_id, session_start, session_end, pages_read, last_activity, book_id
+            FROM main.user_sessions WHERE id IN ({placeholders})
+        ''', ids)
+        conn.execute(f'''
+            INSERT OR IGNORE INTO archive.page_events
+                (id, session_id, user_id, page, viewed_at, dwell_ms, book_id)
+            SELECT id, session_id, user_id, page, viewed_at, dwell_ms, book_id
+            FROM main.page_events WHERE session_id IN ({placeholders})
+        ''', ids)
+
+    def _remove_archived(self, conn, ids):
+        """Summarise and delete the live sessions and page events the archive holds"""
+        placeholders = ','.join('?' * len(ids))
+        ids = [row[0] for row in conn.execute(
+            f'SELECT id FROM archive.user_sessions WHERE id IN ({placeholders})', ids
+        )]
+        if not ids:
+            return
+        placeholders = ','.join('?' * len(ids))
+        conn.execute(f'''
+            INSERT INTO session_summaries
+                (user_id, sessions, pages_read, reading_seconds, first_session_start, last_session_end)
+            SELECT user_id, COUNT(*), COALESCE(SUM(pages_read), 0),
+                   CAST(COALESCE(SUM(MAX(0, strftime('%s', session_end) - strftime('%s', session_start))), 0) AS INTEGER),
+                   MIN(session_start), MAX(session_end)
+            FROM main.user_sessions WHERE id IN ({placeholders})
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                pages_read = pages_read + excluded.pages_read,
+                reading_seconds = reading_seconds + excluded.reading_seconds,
+                first_session_start = MIN(COALESCE(first_session_start, excluded.first_session_start),
+                                          excluded.first_session_start),
+                last_session_end = MAX(COALESCE(last_session_end, excluded.last_session_end),
+                                       excluded.last_session_end)
+        ''', ids)
+        # No delete triggers: counters, rollups and page_depth keep the archived history
+        conn.execute(f'''
+            DELETE FROM main.page_events
+            WHERE session_id IN ({placeholders})
+              AND id IN (SELECT id FROM archive.page_events WHERE session_id IN ({placeholders}))
+        ''', ids + ids)
+        conn.execute(f'DELETE FROM main.session_depth WHERE session_id IN ({placeholders})', ids)
+        conn.execute(f'DELETE FROM main.user_sessions WHERE id IN ({placeholders})', ids)
+
+    def archive(self, conn):
+        """Copy out, then summarise and delete, sessions that ended before the retention window
+
+        A transaction spanning main and an attached database is not atomic
+        across the two in WAL mode, so each chunk is copied and committed
+        first and only then summarised and deleted in a transaction of its
+        own. A crash in between leaves the rows in both databases; the next
+        run's copy ignores them and the delete finishes the move.
+        """
+        def move(conn, ids):
+            self._copy_to_archive(conn, ids)
+            conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            self._remove_archived(conn, ids)
+
+        conn.execute('ATTACH DATABASE ? AS archive', (self.archive_database,))
+        try:
+            conn.executescript(ARCHIVE_SCHEMA)
+            # Archives created before sessions were per book
+            columns = {row[1] for row in conn.execute('PRAGMA archive.table_info(user_sessions)')}
+            if 'book_id' not in columns:
+                conn.execute('ALTER TABLE archive.user_sessions ADD COLUMN book_id INTEGER')
+            columns = {row[1] for row in conn.execute('PRAGMA archive.table_info(page_events)')}
+            if 'book_id' not in columns:
+                conn.execute('ALTER TABLE archive.page_events ADD COLUMN book_id INTEGER')
+            return self._chunks(conn, '''
+                SELECT id FROM main.user_sessions
+                WHERE session_end IS NOT NULL AND session_end < datetime('now', ?)
+                ORDER BY session_end
+                LIMIT ?
+            ''', move, (f'-{int(self.retention_days)} days',))
+        finally:
+            conn.execute('DETACH DATABASE archive')
+
+    def prune_events(self, conn):
+        """Forget idempotency keys old enough that no client will replay them"""
+        def prune(conn, keys):
+            conn.executemany('DELETE FROM processed_events WHERE user_id = ? AND event_id = ?', keys)
+
+        return self._chunks(conn, '''
+            SELECT user_id, event_id FROM processed_events
+            WHERE processed_at < datetime('now', ?)
+            LIMIT ?
+        ''', prune, (f'-{int(self.event_retention_days)} days',))
+
+    def run(self):
+        """One full maintenance pass; returns a summary of what was done"""
+        with self._run_lock:
+            started = time.perf_counter()
+            result = {'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'error': None}
+            try:
+                with self.connection_factory() as conn:
+                    result['sessions_closed'] = self.close_idle(conn)
+                    result['sessions_archived'] = self.archive(conn)
+                    result['events_pruned'] = self.prune_events(conn)
+                self.runs += 1
+                self.sessions_closed += result['sessions_closed']
+                self.sessions_archived += result['sessions_archived']
+                self.events_pruned += result['events_pruned']
+            except Exception as e:
+                self.failed_runs += 1
+                result['error'] = str(e)
+                logger.error(f"Session maintenance failed: {e}")
+            result['duration_seconds'] = round(time.perf_counter() - started, 3)
+            self.last_run = result
+            if result['error'] is None and (result['sessions_closed'] or result['sessions_archived']):
+                logger.info(f"Session maintenance closed {result['sessions_closed']} and "
+                            f"archived {result['sessions_archived']} sessions")
+            return result
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='SessionReaper', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            if self._stopping.is_set():
+                break
+            if self.is_leader():
+                self.run()
+
+    def is_leader(self):
+        """True when this process should run scheduled passes"""
+        if self.lock_path is None:
+            return True
+        if self._leader_lock is None:
+            self._leader_lock = try_lock(self.lock_path)
+        return self._leader_lock is not None
+
+    def stop(self):
+        """Stop the background thread, letting a chunk in progress finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+    def stats(self):
+        return {
+            'leader': self._leader_lock is not None or self.lock_path is None,
+            'runs': self.runs,
+            'failed_runs': self.failed_runs,
+            'sessions_closed': self.sessions_closed,
+            'sessions_archived': self.sessions_archived,
+            'events_pruned': self.events_pruned,
+            'last_run': self.last_run,
+        }
@@ -0,0 +1,242 @@
+"""
+Prometheus-style metrics for the Flask app.
+
+Counters and histograms are kept in process and rendered in the Prometheus
+text exposition format at ``/metrics``. Values owned by other components
+(pool, caches, write buffer) are read at scrape time through collector
+callbacks, so the hot path only pays for the timers that are unique to
+this module: per-route request latency and per-statement SQLite timings.
+"""
+
+import functools
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from flask import g, request
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for label_values, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _labels(self.labels, label_values, [('le', _number(bound))]), cumulative)
+            yield f'{self.name}_sum', _labels(self.labels, label_values), counts[-1]
+            yield f'{self.name}_count', _labels(self.labels, label_values), cumulative
+
+
+class Collected:
+    """Metric whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name, help, kind, callback, labels=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in sorted(values.items()):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class MetricsRegistry:
+    """Holds every metric and renders the text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collect(self, name, help, kind, callback, labels=()):
+        """Register a gauge or counter whose value comes from callback()"""
+        return self.register(Collected(name, help, kind, callback, labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# The app runs a small, fixed set of statements; the bound covers generated IN (...) lists
+@functools.lru_cache(maxsize=1024)
+def statement_label(sql, max_length=80):
+    """Collapse a SQL statement into a bounded, readable metric label"""
+    label = _WHITESPACE.sub(' ', sql).strip()
+    return label if len(label) <= max_length else label[:max_length - 3] + '...'
+
+
+def timed_connection_factory(histogram):
+    """sqlite3.Connection subclass that times every statement it executes"""
+
+    class TimedCursor(sqlite3.Cursor):
+        def execute(self, sql, parameters=()):
+            start = time.perf_counter()
+            try:
+                return super().execute(sql, parameters)
+            finally:
+                histogram.observe(time.perf_counter() - start, statement_label(sql))
+
+        def executemany(self, sql, seq_of_parameters):
+            start = time.perf_counter()
+            try:
+                return super().executemany(sql, seq_of_parameters)
+            finally:
+                histogram.observe(time.perf_counter() - start, statement_label(sql))
+
+    class TimedConnection(sqlite3.Connection):
+        def cursor(self, factory=TimedCursor):
+            return super().cursor(factory)
+
+        # Connection.execute() bypasses cursor(), so route it explicitly
+        def execute(self, sql, parameters=()):
+            return self.cursor().execute(sql, parameters)
+
+        def executemany(self, sql, seq_of_parameters):
+            return self.cursor().executemany(sql, seq_of_parameters)
+
+    return TimedConnection
+
+
+class RequestMetrics:
+    """Per-route request counts and latency histograms for a Flask app"""
+
+    def __init__(self, registry):
+        self.requests = registry.counter(
+            'http_requests_total', 'HTTP requests handled', ('method', 'route', 'status'))
+        self.latency = registry.histogram(
+            'http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.request_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # The URL rule keeps label cardinality bounded (no raw IDs)
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            self.latency.observe(time.perf_counter() - started, request.method, route)
+            self.requests.inc(request.method, route, str(response.status_code))
+        return response
+
+
+class RequestTracer:
+    """Sampled verbose debug logging for individual requests"""
+
+    def __init__(self, logger, sample_rate=0.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def init_app(self, app):
+        app.before_request(self._sample)
+
+    def _sample(self):
+        g.trace = (self.sample_rate > 0
+                   and random.random() < self.sample_rate
+                   and self.logger.isEnabledFor(logging.DEBUG))
+
+    def __call__(self, message, *args):
+        """Log message % args at DEBUG, only for sampled requests"""
+        if g.get('trace'):
+            self.logger.debug(message, *args)
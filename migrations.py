@@ -0,0 +1,683 @@
+"""
+Versioned, idempotent schema migrations tracked with ``PRAGMA user_version``.
+
+Each migration runs inside its own ``BEGIN IMMEDIATE`` transaction together
+with the ``user_version`` bump, so a migration is either fully applied or not
+at all, and running ``migrate()`` again is a no-op.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+USER_NAMES_COLUMNS = ['id', 'user_id', 'female_name', 'male_name', 'created_at', 'usage_count']
+
+
+def table_columns(conn, table):
+    """Column names of a table in declaration order"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def _create_user_names(conn, table='user_names'):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            female_name TEXT NOT NULL,
+            male_name TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            usage_count INTEGER DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def initial_schema(conn):
+    """Base tables, rebuilding a legacy user_names table in place"""
+    # Users table for library card system
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            library_id TEXT UNIQUE NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_access DATETIME DEFAULT CURRENT_TIMESTAMP,
+            access_count INTEGER DEFAULT 0
+        )
+    ''')
+
+    # User sessions table to track each reading session
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            session_start DATETIME DEFAULT CURRENT_TIMESTAMP,
+            session_end DATETIME,
+            pages_read INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    if not _table_exists(conn, 'user_names'):
+        _create_user_names(conn)
+        return
+
+    legacy_columns = table_columns(conn, 'user_names')
+    if all(col in legacy_columns for col in USER_NAMES_COLUMNS):
+        return
+
+    # Early databases stored (female_name, male_name, timestamp) positionally
+    logger.info(f"Rebuilding legacy user_names table with columns {legacy_columns}")
+    female, male = (f'"{col}"' for col in legacy_columns[:2])
+    created = f'"{legacy_columns[2]}"' if len(legacy_columns) > 2 else 'NULL'
+
+    conn.execute('ALTER TABLE user_names RENAME TO user_names_legacy')
+    _create_user_names(conn)
+    conn.execute(f'''
+        INSERT INTO user_names (user_id, female_name, male_name, created_at, usage_count)
+        SELECT 'migrated_user_' || rowid,
+               COALESCE({female}, ''),
+               COALESCE({male}, ''),
+               COALESCE({created}, CURRENT_TIMESTAMP),
+               1
+        FROM user_names_legacy
+    ''')
+    conn.execute('DROP TABLE user_names_legacy')
+
+
+def unique_name_combinations(conn):
+    """Merge duplicate name rows and enforce one row per user and name pair"""
+    # Fold usage of duplicates into the oldest row of each group
+    conn.execute('''
+        UPDATE user_names
+        SET usage_count = (
+                SELECT SUM(d.usage_count) FROM user_names d
+                WHERE d.user_id = user_names.user_id
+                  AND d.female_name = user_names.female_name
+                  AND d.male_name = user_names.male_name
+            ),
+            created_at = (
+                SELECT MAX(d.created_at) FROM user_names d
+                WHERE d.user_id = user_names.user_id
+                  AND d.female_name = user_names.female_name
+                  AND d.male_name = user_names.male_name
+            )
+        WHERE id IN (
+            SELECT MIN(id) FROM user_names
+            GROUP BY user_id, female_name, male_name
+            HAVING COUNT(*) > 1
+        )
+    ''')
+    conn.execute('''
+        DELETE FROM user_names
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM user_names
+            GROUP BY user_id, female_name, male_name
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_user_names_combination
+        ON user_names (user_id, female_name, male_name)
+    ''')
+
+
+def query_indexes(conn):
+    """Covering indexes for per-user statistics and admin listings"""
+    # COUNT/SUM/AVG of pages per user are answered from the index alone
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_user_pages
+        ON user_sessions (user_id, pages_read)
+    ''')
+    # Name history for a user, newest first
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_names_user_created
+        ON user_names (user_id, created_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_users_created_at
+        ON users (created_at)
+    ''')
+
+
+def stats_counters(conn):
+    """Trigger-maintained totals so admin statistics never scan raw tables"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_counters (
+            user_id TEXT PRIMARY KEY,
+            total_pages_read INTEGER NOT NULL DEFAULT 0,
+            total_sessions INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Backfill from existing data once, set-based
+    conn.execute('''
+        INSERT OR REPLACE INTO stats_counters (name, value)
+        SELECT 'total_users', COUNT(*) FROM users
+        UNION ALL SELECT 'total_sessions', COUNT(*) FROM user_sessions
+        UNION ALL SELECT 'total_pages_read', COALESCE(SUM(pages_read), 0) FROM user_sessions
+        UNION ALL SELECT 'total_name_combinations', COUNT(*) FROM user_names
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO user_counters (user_id, total_pages_read, total_sessions)
+        SELECT u.id, COALESCE(SUM(us.pages_read), 0), COUNT(us.id)
+        FROM users u
+        LEFT JOIN user_sessions us ON u.id = us.user_id
+        GROUP BY u.id
+    ''')
+
+    # Keep the counters current on every write path, including batched flushes
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_counters_insert
+        AFTER INSERT ON users
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'total_users';
+            INSERT OR IGNORE INTO user_counters (user_id) VALUES (NEW.id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_sessions_counters_insert
+        AFTER INSERT ON user_sessions
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'total_sessions';
+            UPDATE stats_counters SET value = value + COALESCE(NEW.pages_read, 0)
+            WHERE name = 'total_pages_read';
+            INSERT INTO user_counters (user_id, total_pages_read, total_sessions)
+            VALUES (NEW.user_id, COALESCE(NEW.pages_read, 0), 1)
+            ON CONFLICT (user_id) DO UPDATE
+            SET total_sessions = total_sessions + 1,
+                total_pages_read = total_pages_read + excluded.total_pages_read;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_sessions_counters_pages
+        AFTER UPDATE OF pages_read ON user_sessions
+        WHEN COALESCE(NEW.pages_read, 0) != COALESCE(OLD.pages_read, 0)
+        BEGIN
+            UPDATE stats_counters
+            SET value = value + COALESCE(NEW.pages_read, 0) - COALESCE(OLD.pages_read, 0)
+            WHERE name = 'total_pages_read';
+            UPDATE user_counters
+            SET total_pages_read = total_pages_read + COALESCE(NEW.pages_read, 0) - COALESCE(OLD.pages_read, 0)
+            WHERE user_id = NEW.user_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_names_counters_insert
+        AFTER INSERT ON user_names
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'total_name_combinations';
+        END
+    ''')
+
+    # Keyset pagination indexes for every sortable admin column. Nullable users
+    # columns are sorted with NULLs mapped to a value, since a cursor comparison
+    # with NULL is never true; the indexes match those expressions.
+    for column, empty in (('created_at', "''"), ('last_access', "''"), ('access_count', '0')):
+        conn.execute(f'DROP INDEX IF EXISTS idx_users_{column}')
+        conn.execute(f'CREATE INDEX idx_users_{column} ON users (COALESCE({column}, {empty}))')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_counters_pages
+        ON user_counters (total_pages_read)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_counters_sessions
+        ON user_counters (total_sessions)
+    ''')
+
+
+def library_id_search_index(conn):
+    """FTS5 trigram index over users.library_id for substring search"""
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS users_library_id_fts
+            USING fts5(library_id, content='users', content_rowid='rowid', tokenize='trigram')
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite builds before 3.34 lack the trigram tokenizer; search falls back to LIKE
+        logger.warning(f"Library ID search index unavailable: {e}")
+        return
+
+    conn.execute("INSERT INTO users_library_id_fts (users_library_id_fts) VALUES ('rebuild')")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_insert
+        AFTER INSERT ON users
+        BEGIN
+            INSERT INTO users_library_id_fts (rowid, library_id) VALUES (NEW.rowid, NEW.library_id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_delete
+        AFTER DELETE ON users
+        BEGIN
+            INSERT INTO users_library_id_fts (users_library_id_fts, rowid, library_id)
+            VALUES ('delete', OLD.rowid, OLD.library_id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_update
+        AFTER UPDATE OF library_id ON users
+        BEGIN
+            INSERT INTO users_library_id_fts (users_library_id_fts, rowid, library_id)
+            VALUES ('delete', OLD.rowid, OLD.library_id);
+            INSERT INTO users_library_id_fts (rowid, library_id) VALUES (NEW.rowid, NEW.library_id);
+        END
+    ''')
+
+
+def user_stats_version(conn):
+    """Per-user version counter bumped by every write that changes user stats"""
+    if 'stats_version' not in table_columns(conn, 'user_counters'):
+        conn.execute('ALTER TABLE user_counters ADD COLUMN stats_version INTEGER NOT NULL DEFAULT 0')
+
+    triggers = {
+        # login_user
+        'trg_users_stats_version': ('AFTER UPDATE OF access_count, last_access ON users', 'NEW.id'),
+        # login_user, update_session (via the progress flush) and end_session
+        'trg_user_sessions_stats_version_insert': ('AFTER INSERT ON user_sessions', 'NEW.user_id'),
+        'trg_user_sessions_stats_version_update': ('AFTER UPDATE ON user_sessions', 'NEW.user_id'),
+        # save_names
+        'trg_user_names_stats_version_insert': ('AFTER INSERT ON user_names', 'NEW.user_id'),
+        'trg_user_names_stats_version_update': ('AFTER UPDATE ON user_names', 'NEW.user_id'),
+    }
+    for name, (event, user) in triggers.items():
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            BEGIN
+                UPDATE user_counters SET stats_version = stats_version + 1 WHERE user_id = {user};
+            END
+        ''')
+
+
+def processed_events(conn):
+    """Idempotency keys of applied /api/events/batch events"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS processed_events (
+            user_id TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, event_id)
+        ) WITHOUT ROWID
+    ''')
+    # Lets old keys be pruned by age
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_processed_events_processed_at
+        ON processed_events (processed_at)
+    ''')
+
+
+def page_events(conn):
+    """Append-only page reading log with trigger-maintained rollups"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_events (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            viewed_at DATETIME NOT NULL,
+            dwell_ms INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_rollups (
+            bucket TEXT NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            page INTEGER NOT NULL,
+            views INTEGER NOT NULL DEFAULT 0,
+            dwell_ms_total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, bucket_start, page)
+        ) WITHOUT ROWID
+    ''')
+    # Furthest page per session, and how many sessions stopped at each page
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS session_depth (
+            session_id INTEGER PRIMARY KEY,
+            max_page INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_depth (
+            page INTEGER PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    buckets = {
+        'hour': "strftime('%Y-%m-%d %H:00:00', NEW.viewed_at)",
+        'day': "date(NEW.viewed_at)",
+    }
+    for bucket, start in buckets.items():
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_page_events_rollup_{bucket}
+            AFTER INSERT ON page_events
+            BEGIN
+                INSERT INTO page_rollups (bucket, bucket_start, page, views, dwell_ms_total)
+                VALUES ('{bucket}', {start}, NEW.page, 1, NEW.dwell_ms)
+                ON CONFLICT (bucket, bucket_start, page) DO UPDATE
+                SET views = views + 1, dwell_ms_total = dwell_ms_total + excluded.dwell_ms_total;
+            END
+        ''')
+
+    # A session moving deeper leaves its old page and counts at the new one
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_page_events_depth
+        AFTER INSERT ON page_events
+        WHEN NEW.page > COALESCE(
+            (SELECT max_page FROM session_depth WHERE session_id = NEW.session_id), -1)
+        BEGIN
+            UPDATE page_depth SET sessions = sessions - 1
+            WHERE page = (SELECT max_page FROM session_depth WHERE session_id = NEW.session_id);
+            INSERT INTO session_depth (session_id, max_page) VALUES (NEW.session_id, NEW.page)
+            ON CONFLICT (session_id) DO UPDATE SET max_page = excluded.max_page;
+            INSERT INTO page_depth (page, sessions) VALUES (NEW.page, 1)
+            ON CONFLICT (page) DO UPDATE SET sessions = sessions + 1;
+        END
+    ''')
+
+
+def library_id_sequence(conn):
+    """Sequence and stored key for generated library IDs; existing random IDs are kept as legacy"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("INSERT OR IGNORE INTO sequences (name, next_value) VALUES ('library_id', 0)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS legacy_library_ids (
+            library_id TEXT PRIMARY KEY
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('INSERT OR IGNORE INTO legacy_library_ids (library_id) SELECT library_id FROM users')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+def session_lifecycle(conn):
+    """Session activity tracking for the idle reaper, and summaries of archived sessions"""
+    if 'last_activity' not in table_columns(conn, 'user_sessions'):
+        conn.execute('ALTER TABLE user_sessions ADD COLUMN last_activity DATETIME')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_sessions_last_activity
+        AFTER UPDATE OF pages_read ON user_sessions
+        WHEN NEW.pages_read IS NOT OLD.pages_read
+        BEGIN
+            UPDATE user_sessions SET last_activity = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+    ''')
+    # Open sessions by idle time, and finished sessions by end time, for the reaper
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_open
+        ON user_sessions (COALESCE(last_activity, session_start)) WHERE session_end IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_end
+        ON user_sessions (session_end) WHERE session_end IS NOT NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_page_events_session ON page_events (session_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS session_summaries (
+            user_id TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            pages_read INTEGER NOT NULL DEFAULT 0,
+            reading_seconds INTEGER NOT NULL DEFAULT 0,
+            first_session_start DATETIME,
+            last_session_end DATETIME
+        ) WITHOUT ROWID
+    ''')
+
+
+def session_resume_index(conn):
+    """Find a user's most recent open session for login resume"""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_user_open
+        ON user_sessions (user_id, COALESCE(last_activity, session_start)) WHERE session_end IS NULL
+    ''')
+
+
+def book_catalog(conn):
+    """Books and their editions; sessions and counters become per book"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY,
+            slug TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL,
+            author TEXT,
+            current_edition_id INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_editions (
+            id INTEGER PRIMARY KEY,
+            book_id INTEGER NOT NULL,
+            label TEXT,
+            source TEXT NOT NULL,
+            female_placeholder TEXT NOT NULL,
+            male_placeholder TEXT NOT NULL,
+            total_pages INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_book_editions_book ON book_editions (book_id)')
+    # Everything read so far was the original novel; its edition is registered at startup
+    conn.execute('''
+        INSERT OR IGNORE INTO books (id, slug, title, author)
+        VALUES (1, 'when-hearts-whisper', 'When Hearts Whisper', 'Athil S')
+    ''')
+
+    if 'book_id' not in table_columns(conn, 'user_sessions'):
+        conn.execute('ALTER TABLE user_sessions ADD COLUMN book_id INTEGER REFERENCES books (id)')
+    conn.execute('UPDATE user_sessions SET book_id = 1 WHERE book_id IS NULL')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_counters (
+            book_id INTEGER PRIMARY KEY,
+            total_sessions INTEGER NOT NULL DEFAULT 0,
+            total_pages_read INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_book_counters (
+            user_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            total_sessions INTEGER NOT NULL DEFAULT 0,
+            total_pages_read INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, book_id)
+        ) WITHOUT ROWID
+    ''')
+    # Archived sessions are already gone from user_sessions; their history is the default book's
+    conn.execute('''
+        INSERT OR REPLACE INTO user_book_counters (user_id, book_id, total_sessions, total_pages_read)
+        SELECT user_id, 1, total_sessions, total_pages_read FROM user_counters
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO book_counters (book_id, total_sessions, total_pages_read)
+        SELECT 1, COALESCE(SUM(total_sessions), 0), COALESCE(SUM(total_pages_read), 0) FROM user_counters
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_sessions_book_counters_insert
+        AFTER INSERT ON user_sessions
+        WHEN NEW.book_id IS NOT NULL
+        BEGIN
+            INSERT INTO book_counters (book_id, total_sessions, total_pages_read)
+            VALUES (NEW.book_id, 1, COALESCE(NEW.pages_read, 0))
+            ON CONFLICT (book_id) DO UPDATE
+            SET total_sessions = total_sessions + 1,
+                total_pages_read = total_pages_read + excluded.total_pages_read;
+            INSERT INTO user_book_counters (user_id, book_id, total_sessions, total_pages_read)
+            VALUES (NEW.user_id, NEW.book_id, 1, COALESCE(NEW.pages_read, 0))
+            ON CONFLICT (user_id, book_id) DO UPDATE
+            SET total_sessions = total_sessions + 1,
+                total_pages_read = total_pages_read + excluded.total_pages_read;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_sessions_book_counters_pages
+        AFTER UPDATE OF pages_read ON user_sessions
+        WHEN NEW.book_id IS NOT NULL AND COALESCE(NEW.pages_read, 0) != COALESCE(OLD.pages_read, 0)
+        BEGIN
+            UPDATE book_counters
+            SET total_pages_read = total_pages_read + COALESCE(NEW.pages_read, 0) - COALESCE(OLD.pages_read, 0)
+            WHERE book_id = NEW.book_id;
+            UPDATE user_book_counters
+            SET total_pages_read = total_pages_read + COALESCE(NEW.pages_read, 0) - COALESCE(OLD.pages_read, 0)
+            WHERE user_id = NEW.user_id AND book_id = NEW.book_id;
+        END
+    ''')
+
+
+def page_events_book(conn):
+    """Page events, rollups and depth per book"""
+    if 'book_id' not in table_columns(conn, 'page_events'):
+        conn.execute('ALTER TABLE page_events ADD COLUMN book_id INTEGER REFERENCES books (id)')
+    conn.execute('''
+        UPDATE page_events
+        SET book_id = COALESCE((SELECT book_id FROM user_sessions WHERE id = page_events.session_id), 1)
+        WHERE book_id IS NULL
+    ''')
+
+    for name in ('trg_page_events_rollup_hour', 'trg_page_events_rollup_day', 'trg_page_events_depth'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    # Rollups and depth of archived sessions cannot be split by book; they were the original novel's
+    if 'book_id' not in table_columns(conn, 'page_rollups'):
+        conn.execute('ALTER TABLE page_rollups RENAME TO page_rollups_unbooked')
+        conn.execute('''
+            CREATE TABLE page_rollups (
+                bucket TEXT NOT NULL,
+                book_id INTEGER NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                page INTEGER NOT NULL,
+                views INTEGER NOT NULL DEFAULT 0,
+                dwell_ms_total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, book_id, bucket_start, page)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            INSERT INTO page_rollups (bucket, book_id, bucket_start, page, views, dwell_ms_total)
+            SELECT bucket, 1, bucket_start, page, views, dwell_ms_total FROM page_rollups_unbooked
+        ''')
+        conn.execute('DROP TABLE page_rollups_unbooked')
+    if 'book_id' not in table_columns(conn, 'page_depth'):
+        conn.execute('ALTER TABLE page_depth RENAME TO page_depth_unbooked')
+        conn.execute('''
+            CREATE TABLE page_depth (
+                book_id INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                sessions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (book_id, page)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            INSERT INTO page_depth (book_id, page, sessions)
+            SELECT 1, page, sessions FROM page_depth_unbooked
+        ''')
+        conn.execute('DROP TABLE page_depth_unbooked')
+
+    buckets = {
+        'hour': "strftime('%Y-%m-%d %H:00:00', NEW.viewed_at)",
+        'day': "date(NEW.viewed_at)",
+    }
+    for bucket, start in buckets.items():
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_page_events_rollup_{bucket}
+            AFTER INSERT ON page_events
+            BEGIN
+                INSERT INTO page_rollups (bucket, book_id, bucket_start, page, views, dwell_ms_total)
+                VALUES ('{bucket}', NEW.book_id, {start}, NEW.page, 1, NEW.dwell_ms)
+                ON CONFLICT (bucket, book_id, bucket_start, page) DO UPDATE
+                SET views = views + 1, dwell_ms_total = dwell_ms_total + excluded.dwell_ms_total;
+            END
+        ''')
+
+    # A session reads one book, so its furthest page moves within that book's depth
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_page_events_depth
+        AFTER INSERT ON page_events
+        WHEN NEW.page > COALESCE(
+            (SELECT max_page FROM session_depth WHERE session_id = NEW.session_id), -1)
+        BEGIN
+            UPDATE page_depth SET sessions = sessions - 1
+            WHERE book_id = NEW.book_id
+              AND page = (SELECT max_page FROM session_depth WHERE session_id = NEW.session_id);
+            INSERT INTO session_depth (session_id, max_page) VALUES (NEW.session_id, NEW.page)
+            ON CONFLICT (session_id) DO UPDATE SET max_page = excluded.max_page;
+            INSERT INTO page_depth (book_id, page, sessions) VALUES (NEW.book_id, NEW.page, 1)
+            ON CONFLICT (book_id, page) DO UPDATE SET sessions = sessions + 1;
+        END
+    ''')
+
+
+# (version, name, function) in the order they must be applied
+MIGRATIONS = [
+    (1, 'initial_schema', initial_schema),
+    (2, 'unique_name_combinations', unique_name_combinations),
+    (3, 'query_indexes', query_indexes),
+    (4, 'stats_counters', stats_counters),
+    (5, 'library_id_search_index', library_id_search_index),
+    (6, 'user_stats_version', user_stats_version),
+    (7, 'processed_events', processed_events),
+    (8, 'page_events', page_events),
+    (9, 'library_id_sequence', library_id_sequence),
+    (10, 'session_lifecycle', session_lifecycle),
+    (11, 'session_resume_index', session_resume_index),
+    (12, 'book_catalog', book_catalog),
+    (13, 'page_events_book', page_events_book),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Schema version recorded in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """Apply every pending migration up to target; returns applied versions"""
+    applied = []
+    for version, name, func in MIGRATIONS:
+        if version > target or version <= current_version(conn):
+            continue
+
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have applied it while we waited for the lock
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            func(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {version} ({name}) failed")
+            raise
+
+        logger.info(f"Applied migration {version}: {name}")
+        applied.append(version)
+
+    return applied
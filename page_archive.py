@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Read-only archive of pre-rendered, precompressed book page responses.
+
+The archive holds the complete /api/book/pages/<n> JSON body of every page
+for the book's default character names and, optionally, the most used name
+pairs, each as an identity and a gzip (and brotli, when installed) blob.
+Layout, all integers little-endian:
+
+    header   magic b'NEPGARC1', version u32, entry count u32, meta length u32
+    meta     JSON: source digest, total pages, name pairs, encodings
+    table    one (pair u32, page u32, encoding u32, offset u64, length u32)
+             entry per blob
+    blobs    the response bodies, back to back
+
+The server mmaps the file once per worker, so every worker shares the same
+OS page cache. Under servers that provide wsgi.file_wrapper (gunicorn) a
+page is sent with sendfile() straight from the file; elsewhere it is one
+slice of the map. Either way no page is rendered or compressed per request.
+Build it offline whenever the book changes:
+
+    python page_archive.py book/when-hearts-whisper.html book/when-hearts-whisper.pagearchive \\
+        --names-from names.db --pairs 20
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MAGIC = b'NEPGARC1'
+VERSION = 1
+HEADER = struct.Struct('<8sIII')
+ENTRY = struct.Struct('<IIIQI')
+CACHE_CONTROL = 'no-cache'
+
+
+class InvalidArchive(ValueError):
+    """The file is not a page archive, or not one for the book being served"""
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def page_body(renderer, page, female, male):
+    """The JSON body /api/book/pages/<n> answers for page with these names"""
+    payload = {
+        'success': True,
+        'page': page,
+        'total_pages': renderer.total_pages,
+        'html': renderer.render_page(page, female, male),
+    }
+    # Same encoding as Flask's jsonify outside debug mode
+    return (json.dumps(payload, separators=(',', ':'), sort_keys=True) + '\n').encode('utf-8')
+
+
+def _encode(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    return body
+
+
+def build_archive(renderer, output, source_digest, pairs=()):
+    """Write every page for the default and given name pairs; returns the metadata written"""
+    pairs = [(renderer.default_female, renderer.default_male)] + [
+        tuple(pair) for pair in pairs if tuple(pair) != (renderer.default_female, renderer.default_male)
+    ]
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    meta = {
+        'source_sha256': source_digest,
+        'total_pages': renderer.total_pages,
+        'default_names': [renderer.default_female, renderer.default_male],
+        'pairs': pairs,
+        'encodings': encodings,
+        'built_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+
+    blobs = []
+    for pair_index, (female, male) in enumerate(pairs):
+        for page in sorted(renderer.templates):
+            body = page_body(renderer, page, female, male)
+            for encoding_index, encoding in enumerate(encodings):
+                blob = _encode(body, encoding)
+                # Compressed variants are only kept when they save bytes
+                if encoding_index and len(blob) >= len(body):
+                    continue
+                blobs.append((pair_index, page, encoding_index, blob))
+
+    offset = HEADER.size + len(meta_bytes) + ENTRY.size * len(blobs)
+    partial = output + '.partial'
+    with open(partial, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(blobs), len(meta_bytes)))
+        out.write(meta_bytes)
+        for pair_index, page, encoding_index, blob in blobs:
+            out.write(ENTRY.pack(pair_index, page, encoding_index, offset, len(blob)))
+            offset += len(blob)
+        for *_, blob in blobs:
+            out.write(blob)
+    os.replace(partial, output)
+    meta['entries'] = len(blobs)
+    return meta
+
+
+class ArchiveSlice:
+    """File object over one blob, for servers that sendfile() wsgi.file_wrapper bodies"""
+
+    mode = 'rb'
+
+    def __init__(self, fd, offset, length):
+        self._file = os.fdopen(fd, 'rb')
+        self._file.seek(offset)
+        self._remaining = length
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, size=-1):
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+class PageArchive:
+    """A memory-mapped page archive with O(1) lookups by (page, names, encoding)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise InvalidArchive(f'{path} is empty')
+        self._inode = os.fstat(self._file.fileno()).st_ino
+
+        try:
+            magic, version, count, meta_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise InvalidArchive(f'{path} is not a version {VERSION} page archive')
+            self.meta = json.loads(self._map[HEADER.size:HEADER.size + meta_length])
+            self.pairs = {tuple(pair): i for i, pair in enumerate(self.meta['pairs'])}
+            self.encodings = self.meta['encodings']
+            table = HEADER.size + meta_length
+            self._entries = {}
+            for i in range(count):
+                pair, page, encoding, offset, length = ENTRY.unpack_from(self._map, table + i * ENTRY.size)
+                if offset + length > len(self._map):
+                    raise InvalidArchive(f'{path} is truncated')
+                self._entries[(pair, page, encoding)] = (offset, length)
+        except (struct.error, ValueError, KeyError) as e:
+            self.close()
+            raise e if isinstance(e, InvalidArchive) else InvalidArchive(f'{path}: {e}')
+
+        self.etag_prefix = self.meta['source_sha256'][:12]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sendfile_responses = 0
+
+    @classmethod
+    def for_source(cls, path, source, renderer):
+        """Open path, checking it was built from source with renderer's placeholders"""
+        archive = cls(path)
+        if (archive.meta['source_sha256'] != file_digest(source)
+                or archive.meta['default_names'] != [renderer.default_female, renderer.default_male]
+                or archive.meta['total_pages'] != renderer.total_pages):
+            archive.close()
+            raise InvalidArchive(f'{path} was built from a different book; rebuild it')
+        return archive
+
+    def lookup(self, page, female, male, accept_encodings):
+        """(offset, length, encoding) of the best stored variant, or None"""
+        pair = self.pairs.get((female, male))
+        if pair is not None:
+            # Best compression first; 'identity' is always acceptable
+            for encoding_index in range(len(self.encodings) - 1, -1, -1):
+                encoding = self.encodings[encoding_index]
+                if encoding_index and not accept_encodings[encoding]:
+                    continue
+                entry = self._entries.get((pair, page, encoding_index))
+                if entry is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return entry[0], entry[1], encoding if encoding_index else None
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _open_slice(self, offset, length):
+        # A fresh descriptor per response: sendfile() starts at its file position.
+        # If the archive was replaced on disk, fall back to the mapped copy.
+        fd = os.open(self.path, os.O_RDONLY)
+        if os.fstat(fd).st_ino != self._inode:
+            os.close(fd)
+            return None
+        return ArchiveSlice(fd, offset, length)
+
+    def response(self, request, page, female, male):
+        """Response for a stored page honouring Accept-Encoding and If-None-Match, or None"""
+        found = self.lookup(page, female, male, request.accept_encodings)
+        if found is None:
+            return None
+        offset, length, encoding = found
+
+        etag = f"{self.etag_prefix}-{self.pairs[(female, male)]}-{page}" + (f'-{encoding}' if encoding else '')
+        headers = {'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        body = self._open_slice(offset, length) if file_wrapper else None
+        if body is not None:
+            body = file_wrapper(body)
+            with self._lock:
+                self.sendfile_responses += 1
+        else:
+            # PEP 3333 bodies must be bytes, so this is a single copy out of the map
+            body = [self._map[offset:offset + length]]
+        response = Response(body, mimetype='application/json', headers=headers,
+                            direct_passthrough=True)
+        response.content_length = length
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'bytes': len(self._map),
+            'entries': len(self._entries),
+            'name_pairs': len(self.pairs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'sendfile_responses': self.sendfile_responses,
+        }
+
+
+def popular_pairs(database, limit):
+    """The most used name pairs in an application database"""
+    with closing(sqlite3.connect(f'file:{database}?mode=ro', uri=True)) as conn:
+        return conn.execute('''
+            SELECT female_name, male_name FROM user_names
+            GROUP BY female_name, male_name
+            ORDER BY SUM(usage_count) DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+
+
+def main(argv=None):
+    from book_renderer import BookRenderer
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Build a memory-mappable page archive')
+    parser.add_argument('source', help='book source (.html or .pages.db)')
+    parser.add_argument('output', help='archive to write, e.g. book/<slug>.pagearchive')
+    parser.add_argument('--female', default=Config.BOOK_FEMALE_PLACEHOLDER,
+                        help='female name placeholder used in the text')
+    parser.add_argument('--male', default=Config.BOOK_MALE_PLACEHOLDER,
+                        help='male name placeholder used in the text')
+    parser.add_argument('--names-from', metavar='DATABASE',
+                        help='also pre-render the most used name pairs of this database')
+    parser.add_argument('--pairs', type=int, default=20, help='name pairs taken from --names-from')
+    args = parser.parse_args(argv)
+
+    # Placeholders are resolved exactly as the app resolves them, so the archive matches
+    renderer = BookRenderer.from_path(args.source, female_placeholder=args.female,
+                                      male_placeholder=args.male, cache_size=1)
+
+    pairs = popular_pairs(args.names_from, args.pairs) if args.names_from else []
+    meta = build_archive(renderer, args.output, file_digest(args.source), pairs)
+    print(f"✅ {meta['entries']} page variants for {len(meta['pairs'])} name pairs "
+          f"written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
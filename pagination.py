@@ -0,0 +1,40 @@
+"""
+Helpers for keyset (cursor) pagination of API listings.
+
+A cursor is the sort key of the last row on the previous page, encoded as
+URL-safe base64 JSON so clients can treat it as an opaque token.
+"""
+
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded"""
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row into an opaque token"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a token produced by encode_cursor into a list of size values"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default=50, maximum=200):
+    """Clamp a page size query parameter into 1..maximum"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, maximum))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-request profiling with cProfile.
+
+A request is profiled when its path is listed in the configured endpoints
+(optionally sampled) or when it carries a valid ``X-Profile`` header signed
+with the profiling secret. Each profile splits wall time into time spent
+inside the sqlite3 driver and everything else, and the last N profiles are
+kept in a ring buffer for the admin endpoints. When profiling is disabled no
+request hooks are registered at all.
+
+Sign a header for a one-off request with:
+
+    python profiling.py sign GET /api/admin/stats
+"""
+
+import cProfile
+import hashlib
+import hmac
+import io
+import itertools
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, request
+
+HEADER = 'X-Profile'
+MAX_SIGNATURE_AGE = 300
+DRIVER_METHOD = re.compile(r'sqlite3\.|Cursor\.|Connection\.')
+
+
+def sign(secret, method, path, timestamp=None):
+    """Header value authorising one profiled request: '<timestamp>:<hmac>'"""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    message = f'{timestamp}:{method.upper()}:{path}'.encode('utf-8')
+    digest = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f'{timestamp}:{digest}'
+
+
+def verify(secret, value, method, path, now=None, max_age=MAX_SIGNATURE_AGE):
+    """Check a header value produced by sign() that is not older than max_age"""
+    try:
+        timestamp, _ = value.split(':', 1)
+        timestamp = int(timestamp)
+    except (AttributeError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > max_age:
+        return False
+    return hmac.compare_digest(sign(secret, method, path, timestamp), value)
+
+
+def _is_sqlite(func):
+    """True for profiler entries spent inside the sqlite3 C driver"""
+    filename, _, name = func
+    # C methods reached through super() are reported under the subclass name,
+    # e.g. the timed cursor from metrics.py
+    return filename == '~' and DRIVER_METHOD.search(name) is not None
+
+
+class RequestProfiler:
+    """Profile selected requests and keep the most recent results"""
+
+    def __init__(self, secret=None, endpoints=(), sample_rate=1.0, history=20, top=25):
+        self.secret = secret
+        self.endpoints = frozenset(endpoints)
+        self.sample_rate = sample_rate
+        self.top = top
+        self._profiles = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            secret=cfg.PROFILE_SECRET,
+            endpoints=cfg.PROFILE_ENDPOINTS,
+            sample_rate=cfg.PROFILE_SAMPLE_RATE,
+            history=cfg.PROFILE_HISTORY,
+        )
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _selected(self):
+        signature = request.headers.get(HEADER)
+        if signature is not None:
+            return bool(self.secret) and verify(self.secret, signature, request.method, request.path)
+        return request.path in self.endpoints and random.random() < self.sample_rate
+
+    def _start(self):
+        if not self._selected():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+    def _finish(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        wall = time.perf_counter() - g.pop('profile_started')
+        self._store(profiler, wall, response.status_code)
+        return response
+
+    def _store(self, profiler, wall, status):
+        stats = pstats.Stats(profiler)
+        sql = sum(entry[2] for func, entry in stats.stats.items() if _is_sqlite(func))
+
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(self.top)
+
+        with self._lock:
+            self._profiles.append({
+                'id': next(self._ids),
+                'timestamp': datetime.now().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'status': status,
+                'wall_ms': round(wall * 1000, 3),
+                'sql_ms': round(sql * 1000, 3),
+                'python_ms': round(max(wall - sql, 0.0) * 1000, 3),
+                'report': report.getvalue(),
+            })
+
+    def profiles(self):
+        """Summaries of stored profiles, newest first"""
+        with self._lock:
+            return [{k: v for k, v in p.items() if k != 'report'} for p in reversed(self._profiles)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for profile in self._profiles:
+                if profile['id'] == profile_id:
+                    return dict(profile)
+        return None
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'sign':
+        print(f"Usage: {sys.argv[0]} sign METHOD PATH  (uses PROFILE_SECRET)")
+        sys.exit(1)
+    from config import Config
+    secret = Config.PROFILE_SECRET
+    if not secret:
+        print("❌ PROFILE_SECRET is not set")
+        sys.exit(1)
+    print(f"{HEADER}: {sign(secret, sys.argv[2], sys.argv[3])}")
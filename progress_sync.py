@@ -0,0 +1,96 @@
+"""
+Long-poll reading progress sync on an asyncio event loop.
+
+Waiting readers are plain futures, not threads, so a single process can
+hold thousands of idle long-polls. Waiters are woken immediately when the
+same process records progress (publish) and otherwise by one shared poller
+that re-reads every watched session in a single batched query per interval,
+which also picks up writes made by other worker processes.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressHub:
+    """Wake long-poll waiters when a session's pages_read changes"""
+
+    def __init__(self, load_progress, executor, poll_interval=1.0):
+        # load_progress(session_ids) -> {session_id: pages_read}; blocking, run on executor
+        self.load_progress = load_progress
+        self.executor = executor
+        self.poll_interval = poll_interval
+        # session_id -> {future: pages_read the waiter already has}
+        self._waiters = {}
+        self._loop = None
+        self._poller = None
+
+    async def current(self, session_id):
+        """Latest pages_read for one session, or None if it does not exist"""
+        loop = asyncio.get_running_loop()
+        progress = await loop.run_in_executor(self.executor, self.load_progress, [session_id])
+        return progress.get(session_id)
+
+    async def wait(self, session_id, since, timeout):
+        """Return (pages_read, changed) once progress differs from since or timeout passes"""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+
+        current = await self.current(session_id)
+        if current is None:
+            raise KeyError(session_id)
+        if current != since:
+            return current, True
+
+        future = loop.create_future()
+        self._waiters.setdefault(session_id, {})[future] = since
+        self._ensure_poller()
+        try:
+            return await asyncio.wait_for(future, timeout), True
+        except asyncio.TimeoutError:
+            return current, False
+        finally:
+            waiters = self._waiters.get(session_id)
+            if waiters is not None:
+                waiters.pop(future, None)
+                if not waiters:
+                    del self._waiters[session_id]
+
+    def publish(self, session_id, pages_read):
+        """Report new progress from any thread; a no-op when nobody is waiting"""
+        loop = self._loop
+        if loop is None or session_id not in self._waiters:
+            return
+        loop.call_soon_threadsafe(self._resolve, session_id, pages_read)
+
+    def _resolve(self, session_id, pages_read):
+        for future, since in list(self._waiters.get(session_id, {}).items()):
+            if pages_read != since and not future.done():
+                future.set_result(pages_read)
+
+    def _ensure_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            await asyncio.sleep(self.poll_interval)
+            session_ids = list(self._waiters)
+            if not session_ids:
+                break
+            try:
+                progress = await loop.run_in_executor(self.executor, self.load_progress, session_ids)
+            except Exception as e:
+                logger.error(f"Progress poll for {len(session_ids)} sessions failed: {e}")
+                continue
+            for session_id, pages_read in progress.items():
+                self._resolve(session_id, pages_read)
+
+    def stats(self):
+        return {
+            'sessions_watched': len(self._waiters),
+            'waiters': sum(len(w) for w in self._waiters.values()),
+        }
@@ -0,0 +1,176 @@
+"""
+Precompressed, fingerprinted static asset serving for the frontend.
+
+Every file under the frontend directory is loaded once, hashed and
+compressed with gzip (and brotli when the ``brotli`` package is installed).
+HTML pages have their local ``src``/``href`` references rewritten to
+content-hashed URLs such as ``script.3f2a9c1b04de.js``, which are served
+with an immutable Cache-Control header. Unhashed URLs are served with an
+ETag and must be revalidated, which answers with 304 when unchanged.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                      'image/svg+xml', 'application/xml')
+FINGERPRINT = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[^./]+)$')
+LOCAL_REFERENCE = re.compile(r'''(?P<attr>\b(?:src|href))=(?P<quote>["'])(?P<url>[^"'#?:]+)(?P=quote)''')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class Asset:
+    """One file with its hash and precompressed variants"""
+
+    def __init__(self, path, data, mtime):
+        self.path = path
+        self.data = data
+        self.mtime = mtime
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.encodings = {}
+
+        if self.mimetype.startswith(COMPRESSIBLE_TYPES) and len(data) >= 256:
+            self._add_encoding('gzip', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add_encoding('br', brotli.compress(data, quality=11))
+
+    def _add_encoding(self, name, payload):
+        # Only keep variants that actually save bytes
+        if len(payload) < len(self.data):
+            self.encodings[name] = payload
+
+    @property
+    def fingerprinted_path(self):
+        stem, ext = posixpath.splitext(self.path)
+        return f'{stem}.{self.digest}{ext}'
+
+    def etag(self, encoding=None):
+        return f'{self.digest}-{encoding}' if encoding else self.digest
+
+
+class StaticAssets:
+    """In-memory asset store built once at startup"""
+
+    def __init__(self, root, auto_reload=False):
+        self.root = root
+        self.auto_reload = auto_reload
+        self.assets = {}
+        self._lock = threading.Lock()
+        self.build()
+
+    def _scan(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                full = os.path.join(directory, name)
+                yield os.path.relpath(full, self.root).replace(os.sep, '/'), full
+
+    def build(self):
+        """Load, hash and compress every asset, then fingerprint HTML references"""
+        assets = {}
+        for rel, full in self._scan():
+            with open(full, 'rb') as f:
+                assets[rel] = Asset(rel, f.read(), os.path.getmtime(full))
+
+        # HTML is rewritten after the assets it links to have been hashed
+        for rel, asset in list(assets.items()):
+            if asset.mimetype == 'text/html':
+                html = asset.data.decode('utf-8')
+                base = posixpath.dirname(rel)
+
+                def fingerprint(match):
+                    target = posixpath.normpath(posixpath.join(base, match.group('url')))
+                    linked = assets.get(target)
+                    if linked is None or linked.mimetype == 'text/html':
+                        return match.group(0)
+                    url = posixpath.join(posixpath.dirname(match.group('url')),
+                                         posixpath.basename(linked.fingerprinted_path))
+                    return f"{match.group('attr')}={match.group('quote')}{url}{match.group('quote')}"
+
+                assets[rel] = Asset(rel, LOCAL_REFERENCE.sub(fingerprint, html).encode('utf-8'), asset.mtime)
+
+        with self._lock:
+            self.assets = assets
+
+    def _stale(self):
+        seen = 0
+        for rel, full in self._scan():
+            seen += 1
+            asset = self.assets.get(rel)
+            if asset is None or asset.mtime != os.path.getmtime(full):
+                return True
+        return seen != len(self.assets)
+
+    def lookup(self, path):
+        """Return (asset, immutable) for a request path, or (None, False)"""
+        if self.auto_reload and self._stale():
+            self.build()
+
+        asset = self.assets.get(path)
+        if asset is not None:
+            return asset, False
+
+        match = FINGERPRINT.match(path)
+        if match:
+            asset = self.assets.get(match.group('stem') + match.group('ext'))
+            if asset is not None:
+                # An outdated hash still gets the current file, just not cached forever
+                return asset, asset.digest == match.group('hash')
+        return None, False
+
+    def url_for(self, path):
+        """Fingerprinted URL path for an asset, or the path itself if unknown"""
+        asset = self.assets.get(path)
+        return asset.fingerprinted_path if asset else path
+
+    def response(self, request, path):
+        """Build a response honouring Accept-Encoding and If-None-Match"""
+        asset, immutable = self.lookup(path)
+        if asset is None:
+            return None
+
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.encodings and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        etag = asset.etag(encoding)
+        headers = {
+            'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+            'Vary': 'Accept-Encoding',
+        }
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            body = asset.encodings[encoding] if encoding else asset.data
+            response = Response(body, mimetype=asset.mimetype, headers=headers)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
+
+    def stats(self):
+        """Asset count and byte totals before and after compression"""
+        with self._lock:
+            assets = list(self.assets.values())
+        return {
+            'assets': len(assets),
+            'bytes': sum(len(a.data) for a in assets),
+            'gzip_bytes': sum(len(a.encodings.get('gzip', a.data)) for a in assets),
+            'brotli_available': brotli is not None,
+        }
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for online backups shared between worker processes
+"""
+
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backup import BackupManager, LOCK_NAME
+from lifecycle import try_lock
+
+def _database(tmp):
+    database = os.path.join(tmp, 'names.db')
+    with closing(sqlite3.connect(database)) as conn:
+        conn.execute('CREATE TABLE users (id TEXT PRIMARY KEY)')
+        conn.executemany('INSERT INTO users VALUES (?)', [(f'u{i}',) for i in range(500)])
+        conn.commit()
+    return database
+
+def _manager(database, backup_dir, **kwargs):
+    return BackupManager(database, None, backup_dir=backup_dir, pages_per_step=1, step_sleep=0, **kwargs)
+
+def test_backup_completes_atomically():
+    """A finished job leaves one complete snapshot and no partial files"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backup_dir = os.path.join(tmp, 'backups')
+        manager = _manager(_database(tmp), backup_dir)
+        job, started = manager.start()
+        assert started and job['state'] == 'running'
+        assert manager.wait(timeout=10)
+
+        job = manager.status(job['job_id'])
+        assert job['state'] == 'completed' and job['progress'] == 100.0
+        with gzip.open(job['path']) as f:
+            assert f.read(16) == b'SQLite format 3\x00'
+        assert not [name for name in os.listdir(backup_dir) if name.endswith('.partial')]
+    print("✅ Snapshots are written to .partial and renamed into place")
+
+def test_job_state_is_shared():
+    """Another manager on the same directory sees the job and cannot start a second one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = _database(tmp)
+        backup_dir = os.path.join(tmp, 'backups')
+        first, second = _manager(database, backup_dir), _manager(database, backup_dir)
+
+        # Simulate a job running in another worker by holding its lock
+        os.makedirs(backup_dir)
+        held = try_lock(os.path.join(backup_dir, LOCK_NAME))
+        _, started = second.start()
+        assert not started
+        held.close()
+
+        job, started = first.start()
+        assert started
+        first.wait(timeout=10)
+        assert second.status(job['job_id'])['state'] == 'completed'
+        assert second.status()['job_id'] == job['job_id']
+        assert second.status('../../etc/passwd') is None
+    print("✅ Job state and the one-at-a-time rule hold across managers")
+
+def test_interrupted_job_reported_failed():
+    """A running status with nobody holding the lock means its process died"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backup_dir = os.path.join(tmp, 'backups')
+        manager = _manager(_database(tmp), backup_dir)
+        os.makedirs(backup_dir)
+        manager._save({'job_id': '20240101_000000_000000', 'state': 'running'})
+        assert manager.status()['state'] == 'failed'
+    print("✅ Jobs of crashed processes are reported as failed")
+
+def test_rotation_tolerates_missing_files():
+    """Snapshots removed concurrently by another worker are skipped, not fatal"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backup_dir = os.path.join(tmp, 'backups')
+        os.makedirs(backup_dir)
+        manager = _manager(_database(tmp), backup_dir, retention=1)
+        for i in range(3):
+            open(os.path.join(backup_dir, f'names_backup_2024010{i}_000000_000000.db.gz'), 'wb').close()
+
+        original = os.remove
+        def racing_remove(path):
+            original(path)
+            if path.endswith('20240100_000000_000000.db.gz'):
+                # Another worker deletes the next one first
+                original(path.replace('20240100', '20240101'))
+        os.remove = racing_remove
+        try:
+            removed = manager._rotate()
+        finally:
+            os.remove = original
+        assert [os.path.basename(p) for p in removed] == ['names_backup_20240100_000000_000000.db.gz']
+        assert os.listdir(backup_dir) == ['names_backup_20240102_000000_000000.db.gz']
+    print("✅ Rotation skips snapshots that are already gone")
+
+def main():
+    print("=== Backup Test ===")
+    test_backup_completes_atomically()
+    test_job_state_is_shared()
+    test_interrupted_job_reported_failed()
+    test_rotation_tolerates_missing_files()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for the benchmark harness helpers
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench import Recorder, compare, percentile, summarize
+
+class FakeClient:
+    def __init__(self, status):
+        self.status = status
+
+    def post(self, path, payload):
+        return self.status, {'ok': True}
+
+def test_percentile_nearest_rank():
+    """Percentiles use nearest rank on sorted samples"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+    print("✅ Nearest-rank percentiles")
+
+def test_summary_counts_errors():
+    """Unexpected status codes are counted per endpoint"""
+    recorder = Recorder()
+    assert recorder.call(FakeClient(200), '/api/login', {}) == {'ok': True}
+    assert recorder.call(FakeClient(500), '/api/login', {}) is None
+    summary = summarize(recorder, 1.0)
+    assert summary['total_requests'] == 2 and summary['total_errors'] == 1
+    assert set(summary['endpoints']['/api/login']) >= {'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'}
+    print("✅ Summary reports errors and percentiles")
+
+def test_compare_flags_p95_regressions():
+    """Only endpoints whose p95 grew past the threshold are reported"""
+    baseline = {'endpoints': {'/a': {'p95_ms': 10.0}, '/b': {'p95_ms': 10.0}}}
+    results = {'endpoints': {'/a': {'p95_ms': 11.0}, '/b': {'p95_ms': 15.0}, '/c': {'p95_ms': 1.0}}}
+    regressions = compare(results, baseline, max_regression=20)
+    assert [r[0] for r in regressions] == ['/b']
+    print("✅ p95 regressions detected against a baseline")
+
+def main():
+    print("=== Benchmark Harness Test ===")
+    test_percentile_nearest_rank()
+    test_summary_counts_errors()
+    test_compare_flags_p95_regressions()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for personalised book pages served by /api/book/pages/<n>
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+
+PAGE = 3  # Mentions both characters
+
+def _page(client, page, **names):
+    return client.get(f'/api/book/pages/{page}', query_string=names)
+
+def test_names_substituted():
+    """Both names replace the placeholders; omitted names fall back to the defaults"""
+    client = server.app.test_client()
+    data = _page(client, PAGE, female='Asha', male='Ravi').get_json()
+    assert data['success'] and data['page'] == PAGE and data['total_pages'] == server.book.total_pages
+    assert 'Asha' in data['html'] and 'Ravi' in data['html']
+    assert server.book.default_female not in data['html'] and server.book.default_male not in data['html']
+
+    data = _page(client, PAGE, female='Zoë').get_json()
+    assert 'Zoë' in data['html'] and server.book.default_male in data['html']
+    print("✅ Pages are rendered with the reader's names")
+
+def test_missing_pages_answer_404():
+    """The cover (page 0, served by the frontend) and pages past the end are not found"""
+    client = server.app.test_client()
+    for page in (0, server.book.total_pages, 9999):
+        response = _page(client, page)
+        assert response.status_code == 404 and not response.get_json()['success'], page
+    print("✅ Cover and out-of-range pages answer 404")
+
+def test_invalid_names_answer_400():
+    """Names with markup, punctuation or over 50 characters are refused and never echoed"""
+    client = server.app.test_client()
+    for names in ({'female': '<script>alert(1)</script>'}, {'male': 'Tom & Jerry'},
+                  {'female': 'A' * 51}, {'male': 'Ravi"'}):
+        response = _page(client, PAGE, **names)
+        assert response.status_code == 400 and not response.get_json()['success'], names
+        assert b'<script>' not in response.data
+    print("✅ Invalid names answer 400")
+
+def test_names_are_html_escaped():
+    """Substituted names are escaped even if validation lets markup through"""
+    client = server.app.test_client()
+    validate_names, server.validate_names = server.validate_names, lambda female, male: None
+    try:
+        html = _page(client, PAGE, female='<b>Asha</b>', male='Tom & "Jerry"').get_json()['html']
+    finally:
+        server.validate_names = validate_names
+    assert '&lt;b&gt;Asha&lt;/b&gt;' in html and '<b>Asha' not in html
+    assert 'Tom &amp; &quot;Jerry&quot;' in html
+    print("✅ Substituted names are HTML-escaped")
+
+def test_repeated_requests_hit_render_cache():
+    """The same page and names render once; repeats are cache hits"""
+    client = server.app.test_client()
+    before = server.book.cache_stats()
+    first = _page(client, PAGE, female='Lena', male='Omar').get_json()['html']
+    for _ in range(3):
+        assert _page(client, PAGE, female='Lena', male='Omar').get_json()['html'] == first
+    _page(client, PAGE, female='Lena', male='Tomas')
+    after = client.get('/api/admin/cache-stats').get_json()['page_render']
+    assert after['misses'] - before['misses'] == 2
+    assert after['hits'] - before['hits'] == 3
+    print("✅ Repeated page requests are served from the render cache")
+
+def main():
+    print("=== Book Page Test ===")
+    test_names_substituted()
+    test_missing_pages_answer_404()
+    test_invalid_names_answer_400()
+    test_names_are_html_escaped()
+    test_repeated_requests_hit_render_cache()
+
+if __name__ == "__main__":
+    main()
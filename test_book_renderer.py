@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for server-side page rendering
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from book_renderer import BookRenderer, split_pages
+
+SOURCE = '''
+<main>
+    <div id="page-0" class="page active"><div><img src="cover.png"></div></div>
+    <div id="page-1" class="page">
+        <div class="novel-text"><p class="sameena">Sameena met Sanjay.</p><div>Sanjay smiled.</div></div>
+    </div>
+</main>
+'''
+
+def test_split_pages_keeps_nested_divs():
+    """Each page-N block is cut out whole, including nested divs"""
+    pages = split_pages(SOURCE)
+    assert len(pages) == 2
+    assert pages[0].startswith('<div id="page-0"') and pages[0].endswith('</div></div>')
+    assert 'Sanjay smiled.</div></div>\n    </div>' in pages[1]
+    print("✅ Pages split on their outer divs")
+
+def test_names_substituted_and_escaped():
+    """Placeholders in text are replaced, class names are left alone"""
+    book = BookRenderer(split_pages(SOURCE))
+    html = book.render_page(1, 'Asha', 'R&D')
+    assert '<p class="sameena">Asha met R&amp;D.</p>' in html
+    assert 'R&amp;D smiled.' in html
+    assert 'Sameena' not in html and 'Sanjay' not in html
+    print("✅ Names substituted and HTML-escaped")
+
+def test_render_cache_hits():
+    """Repeated name pairs are served from the LRU cache"""
+    book = BookRenderer(split_pages(SOURCE), cache_size=2)
+    book.render_page(1, 'Asha', 'Ravi')
+    book.render_page(1, 'Asha', 'Ravi')
+    book.render_page(1, 'Mira', 'Dev')
+    book.render_page(0, 'Mira', 'Dev')
+
+    stats = book.cache_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    assert stats['size'] == 2
+    print("✅ Render cache bounded with hit/miss stats")
+
+def main():
+    print("=== Book Renderer Test ===")
+    test_split_pages_keeps_nested_divs()
+    test_names_substituted_and_escaped()
+    test_render_cache_hits()
+
+if __name__ == "__main__":
+    main()
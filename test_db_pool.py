@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled SQLite connection manager
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import ConnectionPool, PoolTimeout
+
+def test_file_database_uses_wal_and_reuses_connections():
+    """Connections are tuned once and handed out again after release"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, 'pool.db'), max_size=2)
+
+        with pool.connection() as conn:
+            first = conn
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+        with pool.connection() as conn:
+            assert conn is first
+
+        stats = pool.stats()
+        assert stats['size'] == 1
+        assert stats['acquired_total'] == 2
+        pool.close_all()
+        print("✅ WAL mode enabled and connection reused")
+
+def test_memory_database_is_shared():
+    """An in-memory database keeps its data between checkouts"""
+    pool = ConnectionPool(':memory:', max_size=4)
+    assert pool.max_size == 1
+
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.execute('INSERT INTO t VALUES (1)')
+        conn.commit()
+
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+    pool.close_all()
+    print("✅ In-memory database shared across checkouts")
+
+def test_uncommitted_work_is_rolled_back():
+    """Released connections never leak an open transaction"""
+    pool = ConnectionPool(':memory:')
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    pool.close_all()
+    print("✅ Uncommitted work rolled back on release")
+
+def test_exhausted_pool_times_out_and_records_waits():
+    """Waiting callers time out when every connection is checked out"""
+    pool = ConnectionPool(':memory:', timeout=0.05)
+    held = pool.acquire()
+    try:
+        pool.acquire()
+        assert False, 'expected PoolTimeout'
+    except PoolTimeout:
+        pass
+
+    # A waiter is released as soon as the connection comes back
+    result = {}
+    def waiter():
+        with pool.connection() as conn:
+            result['conn'] = conn
+    pool.timeout = 2.0
+    t = threading.Thread(target=waiter)
+    t.start()
+    pool.release(held)
+    t.join()
+
+    stats = pool.stats()
+    assert result['conn'] is held
+    assert stats['timeouts_total'] == 1
+    assert stats['waits_total'] >= 1
+    pool.close_all()
+    print("✅ Pool timeout and wait metrics recorded")
+
+def main():
+    print("=== Connection Pool Test ===")
+    test_file_database_uses_wal_and_reuses_connections()
+    test_memory_database_is_shared()
+    test_uncommitted_work_is_rolled_back()
+    test_exhausted_pool_times_out_and_records_waits()
+
+if __name__ == "__main__":
+    main()
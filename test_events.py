@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for batched reader event ingestion
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+from events import InvalidEvent, apply_batch, parse_batch
+
+NOW = 1_700_000_000
+
+def no_name_errors(female, male):
+    return None
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO users (id, library_id) VALUES ('u1', 'LIB-AAAA-AAAA')")
+    conn.execute("INSERT INTO user_sessions (user_id, book_id) VALUES ('u1', 1)")
+    conn.commit()
+    return conn
+
+def batch(*events):
+    return {'user_id': 'u1', 'session_id': 1, 'events': list(events)}
+
+def test_validation_reports_index():
+    """Malformed events are rejected with the index of the offending event"""
+    good = {'id': 'a', 'type': 'page_view', 'ts': NOW * 1000, 'page': 3}
+    for bad in ({'id': 'b', 'type': 'nope', 'ts': NOW * 1000},
+                {'id': 'b', 'type': 'page_view', 'ts': 'yesterday', 'page': 1},
+                {'id': 'b', 'type': 'page_view', 'ts': NOW * 1000, 'page': -1},
+                {'id': '', 'type': 'session_end', 'ts': NOW * 1000}):
+        try:
+            parse_batch(batch(good, bad), 10, no_name_errors, now=NOW)
+            assert False, f"accepted {bad}"
+        except InvalidEvent as e:
+            assert e.index == 1
+    try:
+        parse_batch(batch(good, good, good), 2, no_name_errors, now=NOW)
+        assert False, "accepted an oversized batch"
+    except InvalidEvent as e:
+        assert e.index is None
+    print("✅ Invalid events rejected with their index")
+
+def test_client_timestamps_clamped():
+    """Future timestamps are clamped to the server clock"""
+    _, events = parse_batch(batch({'id': 'a', 'type': 'session_end', 'ts': (NOW + 3600) * 1000}),
+                            10, no_name_errors, now=NOW)
+    assert events[0]['at'] == '2023-11-14 22:13:20'
+    print("✅ Client timestamps clamped")
+
+def test_batch_applied_once():
+    """Events apply in client time order and a replayed batch changes nothing"""
+    conn = make_db()
+    _, events = parse_batch(batch(
+        {'id': 'p2', 'type': 'page_view', 'ts': (NOW - 10) * 1000, 'page': 9},
+        {'id': 'p1', 'type': 'page_view', 'ts': (NOW - 20) * 1000, 'page': 4},
+        {'id': 'n1', 'type': 'names_set', 'ts': (NOW - 15) * 1000, 'female': 'Asha', 'male': 'Ravi'},
+        {'id': 'end', 'type': 'session_end', 'ts': (NOW - 5) * 1000},
+    ), 10, no_name_errors, now=NOW)
+
+    results, progress = apply_batch(conn, 'u1', events)
+    assert [r['status'] for r in results] == ['applied'] * 4
+    assert progress == {1: 9}
+
+    results, progress = apply_batch(conn, 'u1', events)
+    assert [r['status'] for r in results] == ['duplicate'] * 4
+    assert progress == {}
+
+    pages, ended = conn.execute('SELECT pages_read, session_end FROM user_sessions WHERE id = 1').fetchone()
+    assert pages == 9 and ended is not None
+    assert conn.execute('SELECT usage_count FROM user_names').fetchone()[0] == 1
+    assert conn.execute('SELECT value FROM stats_counters WHERE name = ?', ('total_pages_read',)).fetchone()[0] == 9
+    print("✅ Batch applied once in client time order")
+
+def test_foreign_session_rolls_back():
+    """A session owned by someone else rejects the whole batch"""
+    conn = make_db()
+    conn.execute("INSERT INTO users (id, library_id) VALUES ('u2', 'LIB-BBBB-BBBB')")
+    conn.execute("INSERT INTO user_sessions (user_id, book_id) VALUES ('u2', 1)")
+    conn.commit()
+    _, events = parse_batch(batch(
+        {'id': 'n1', 'type': 'names_set', 'ts': NOW * 1000, 'female': 'Asha', 'male': 'Ravi'},
+        {'id': 'p1', 'type': 'page_view', 'ts': NOW * 1000, 'page': 2, 'session_id': 2},
+    ), 10, no_name_errors, now=NOW)
+    try:
+        apply_batch(conn, 'u1', events)
+        assert False, "accepted a foreign session"
+    except InvalidEvent as e:
+        assert e.index == 1
+    assert conn.execute('SELECT COUNT(*) FROM user_names').fetchone()[0] == 0
+    assert conn.execute('SELECT COUNT(*) FROM processed_events').fetchone()[0] == 0
+    print("✅ Foreign sessions reject the batch atomically")
+
+def test_page_reads_rolled_up():
+    """page_read events append to the log and update rollups and depth of their session's book"""
+    conn = make_db()
+    conn.execute("INSERT INTO user_sessions (user_id, book_id) VALUES ('u1', 1)")
+    conn.execute("INSERT INTO books (id, slug, title) VALUES (2, 'other', 'Other')")
+    conn.execute("INSERT INTO user_sessions (user_id, book_id) VALUES ('u1', 2)")
+    conn.commit()
+    _, events = parse_batch({'user_id': 'u1', 'events': [
+        {'id': 'a', 'type': 'page_read', 'ts': NOW * 1000, 'page': 1, 'dwell_ms': 3000, 'session_id': 1},
+        {'id': 'b', 'type': 'page_read', 'ts': NOW * 1000, 'page': 2, 'dwell_ms': 5000, 'session_id': 1},
+        {'id': 'c', 'type': 'page_read', 'ts': NOW * 1000, 'page': 1, 'dwell_ms': 10**9, 'session_id': 2},
+        {'id': 'd', 'type': 'page_read', 'ts': NOW * 1000, 'page': 1, 'dwell_ms': 4000, 'session_id': 3},
+    ]}, 10, no_name_errors, now=NOW)
+    apply_batch(conn, 'u1', events)
+
+    assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 4
+    assert conn.execute('SELECT book_id FROM page_events WHERE session_id = 3').fetchone()[0] == 2
+    views, dwell = conn.execute(
+        "SELECT views, dwell_ms_total FROM page_rollups WHERE bucket = 'day' AND book_id = 1 AND page = 1"
+    ).fetchone()
+    assert views == 2 and dwell == 3000 + 30 * 60 * 1000
+    assert conn.execute(
+        "SELECT views, dwell_ms_total FROM page_rollups WHERE bucket = 'day' AND book_id = 2 AND page = 1"
+    ).fetchone() == (1, 4000)
+    assert conn.execute("SELECT COUNT(*) FROM page_rollups WHERE bucket = 'hour'").fetchone()[0] >= 3
+    depth = {(r[0], r[1]): r[2] for r in conn.execute('SELECT book_id, page, sessions FROM page_depth')}
+    assert depth == {(1, 1): 1, (1, 2): 1, (2, 1): 1}
+    print("✅ Page reads rolled up hourly/daily with drop-off depth")
+
+def main():
+    print("=== Event Batch Test ===")
+    test_validation_reports_index()
+    test_client_timestamps_clamped()
+    test_batch_applied_once()
+    test_foreign_session_rolls_back()
+    test_page_reads_rolled_up()
+
+if __name__ == "__main__":
+    main()
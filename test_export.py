@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming CSV and NDJSON exports
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+import migrations
+from db_pool import ConnectionPool
+
+BATCH_SIZE = 3
+USERS = 7
+NAMES = [('Asha, "Jr"', 'Ravi'), ('Mira\nRose', 'Dév'), ('Lena', 'Tom')]
+
+@contextmanager
+def _exporting(tmp):
+    """The app's test client over a seeded database, exporting in small batches"""
+    database = os.path.join(tmp, 'names.db')
+    with closing(sqlite3.connect(database)) as conn:
+        migrations.migrate(conn)
+        conn.executemany('INSERT INTO users (id, library_id) VALUES (?, ?)',
+                         [(f'u{i}', f'LIB-EXPT-{i:04d}') for i in range(USERS)])
+        conn.executemany('INSERT INTO user_sessions (user_id, book_id, pages_read) VALUES (?, 1, ?)',
+                         [(f'u{i}', i) for i in range(USERS)])
+        conn.executemany('INSERT INTO user_names (user_id, female_name, male_name) VALUES (?, ?, ?)',
+                         [('u0', female, male) for female, male in NAMES])
+        conn.commit()
+
+    pool, server.db_pool = server.db_pool, ConnectionPool(database, max_size=1)
+    batch_size, server.app_config.EXPORT_BATCH_SIZE = server.app_config.EXPORT_BATCH_SIZE, BATCH_SIZE
+    try:
+        yield server.app.test_client()
+    finally:
+        server.app_config.EXPORT_BATCH_SIZE = batch_size
+        server.db_pool.close_all()
+        server.db_pool = pool
+
+def _export(client, query):
+    response = client.get(f'/api/admin/export?{query}', buffered=False)
+    assert response.status_code == 200
+    chunks = list(response.response)
+    response.close()
+    return response, b''.join(chunks).decode('utf-8'), len(chunks)
+
+def test_csv_streams_every_row():
+    """CSV has a header and every row, sent in one chunk per batch"""
+    with tempfile.TemporaryDirectory() as tmp, _exporting(tmp) as client:
+        response, body, chunks = _export(client, 'dataset=users&format=csv')
+        assert response.mimetype == 'text/csv'
+        assert response.headers['Content-Disposition'].startswith('attachment; filename="ebook-library-users-')
+        rows = list(csv.reader(io.StringIO(body)))
+        assert rows[0] == server.EXPORT_DATASETS['users'][0]
+        assert [row[0] for row in rows[1:]] == [f'u{i}' for i in range(USERS)]
+        assert chunks == -(-USERS // BATCH_SIZE)
+
+        # Empty values stay empty columns
+        _, body, _ = _export(client, 'dataset=sessions&format=csv')
+        rows = list(csv.reader(io.StringIO(body)))
+        assert rows[0] == ['session_id', 'user_id', 'book_id', 'session_start', 'session_end', 'pages_read']
+        assert len(rows) == USERS + 1 and rows[1][2] == '1' and rows[1][4] == '' and rows[-1][5] == str(USERS - 1)
+    print("✅ CSV exports stream every row across batches")
+
+def test_csv_escaping():
+    """Commas, quotes, newlines and non-ASCII text survive a CSV round-trip"""
+    with tempfile.TemporaryDirectory() as tmp, _exporting(tmp) as client:
+        _, body, _ = _export(client, 'dataset=names&format=csv')
+        assert '"Asha, ""Jr"""' in body
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert [(row['female_name'], row['male_name']) for row in rows] == NAMES
+    print("✅ CSV fields are escaped")
+
+def test_ndjson_streams_every_row():
+    """NDJSON is one JSON object per row, keyed by the dataset's columns"""
+    with tempfile.TemporaryDirectory() as tmp, _exporting(tmp) as client:
+        response, body, chunks = _export(client, 'dataset=users&format=ndjson')
+        assert response.mimetype == 'application/x-ndjson'
+        assert body.endswith('\n')
+        records = [json.loads(line) for line in body.splitlines()]
+        assert [r['user_id'] for r in records] == [f'u{i}' for i in range(USERS)]
+        assert list(records[0]) == server.EXPORT_DATASETS['users'][0]
+        assert records[3]['total_pages_read'] == 3 and records[3]['total_sessions'] == 1
+        assert chunks == -(-USERS // BATCH_SIZE)
+
+        _, body, _ = _export(client, 'dataset=sessions&format=ndjson')
+        record = json.loads(body.splitlines()[0])
+        assert record['book_id'] == 1 and record['session_end'] is None
+        _, body, _ = _export(client, 'dataset=names&format=ndjson')
+        assert [(r['female_name'], r['male_name']) for r in map(json.loads, body.splitlines())] == NAMES
+    print("✅ NDJSON exports stream every row across batches")
+
+def test_pool_free_between_batches():
+    """A stream holds no pooled connection while the client reads a batch"""
+    with tempfile.TemporaryDirectory() as tmp, _exporting(tmp) as client:
+        response = client.get('/api/admin/export?dataset=sessions&format=ndjson', buffered=False)
+        chunks = iter(response.response)
+        records = [json.loads(line) for line in next(chunks).splitlines()]
+        assert server.db_pool.stats()['in_use'] == 0
+
+        # Rows added mid-stream after the last key sent are still exported
+        with server.get_db_connection() as conn:
+            conn.execute("INSERT INTO user_sessions (user_id, book_id, pages_read) VALUES ('u0', 1, 99)")
+            conn.commit()
+        for chunk in chunks:
+            assert server.db_pool.stats()['in_use'] == 0
+            records += [json.loads(line) for line in chunk.splitlines()]
+        response.close()
+        assert [r['pages_read'] for r in records] == list(range(USERS)) + [99]
+        assert len({r['session_id'] for r in records}) == USERS + 1
+    print("✅ Exports release the pool between batches")
+
+def test_unknown_dataset_or_format_rejected():
+    """Unknown datasets and formats answer 400 before anything is streamed"""
+    with tempfile.TemporaryDirectory() as tmp, _exporting(tmp) as client:
+        for query in ('dataset=passwords', 'format=xml', 'dataset=users&format=json'):
+            response = client.get(f'/api/admin/export?{query}')
+            assert response.status_code == 400 and not response.get_json()['success'], query
+    print("✅ Unknown export formats answer 400")
+
+def main():
+    print("=== Export Test ===")
+    test_csv_streams_every_row()
+    test_csv_escaping()
+    test_ndjson_streams_every_row()
+    test_pool_free_between_batches()
+    test_unknown_dataset_or_format_rejected()
+
+if __name__ == "__main__":
+    main()
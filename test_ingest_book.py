@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for building a page store from a .docx manuscript
+"""
+
+import os
+import sys
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from book_renderer import BookRenderer
+from ingest_book import build, paginate, read_manuscript
+
+NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+def _p(text, bold=False, page_break=False):
+    props = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    runs = []
+    for i, line in enumerate(text.split('\n')):
+        if i:
+            runs.append('<w:r><w:br/></w:r>')
+        runs.append(f'<w:r>{props}<w:t xml:space="preserve">{escape(line)}</w:t></w:r>')
+    if page_break:
+        runs.append('<w:r><w:br w:type="page"/></w:r>')
+    return f'<w:p><w:pPr><w:rPr><w:b/></w:rPr></w:pPr>{"".join(runs)}</w:p>'
+
+def make_docx(path, paragraphs):
+    body = ''.join(paragraphs)
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml',
+                         f'<?xml version="1.0"?><w:document xmlns:w="{NS}"><w:body>{body}</w:body></w:document>')
+
+def test_manuscript_blocks():
+    """Metadata, headings, dialogue and soft line breaks are recognised; markers dropped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'book.docx')
+        make_docx(source, [
+            _p('Title: A Test Author: Someone', bold=True),
+            _p('Chapter 1: Start', bold=True),
+            _p('Page 1'),
+            _p('Sanjay waited.\nSameena wrote back.'),
+            _p('“Hello.”', bold=True),
+            _p('Bottom of Form'),
+        ])
+        meta, blocks = read_manuscript(source)
+    assert meta == {'title': 'A Test', 'author': 'Someone'}
+    assert blocks == [
+        ('heading', 'Chapter 1: Start', 'chapter-title'),
+        ('text', 'Sanjay waited.', None),
+        ('text', 'Sameena wrote back.', None),
+        ('text', '“Hello.”', 'message'),
+    ]
+    print("✅ Manuscript parsed into blocks")
+
+def test_paginate_respects_line_budget():
+    """Pages fill up to the line budget; headings and page breaks start new pages"""
+    blocks = [('heading', 'Chapter 1', 'chapter-title')]
+    blocks += [('text', 'x' * 100, None)] * 5            # 2 lines each
+    blocks += [('break', '', None), ('text', 'after break', None)]
+    pages = paginate(blocks, lines_per_page=8, chars_per_line=50)
+    assert [len(p['paragraphs']) for p in pages] == [2, 3, 1]
+    assert pages[0]['heading'] == 'Chapter 1' and pages[1]['heading'] is None
+    assert pages[2]['paragraphs'] == [('after break', None)]
+    print("✅ Paragraphs packed onto pages")
+
+def test_store_loads_into_renderer():
+    """The built store serves personalised pages through BookRenderer"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'book.docx')
+        output = os.path.join(tmp, 'book.pages.db')
+        make_docx(source, [_p('Chapter 1: Start'), _p('Sanjay & Sameena <3', page_break=True), _p('The end.')])
+        meta = build(source, output)
+        assert meta['total_pages'] == 3
+
+        book = BookRenderer.from_path(output)
+        assert book.total_pages == 3 and book.has_page(1) and book.has_page(2)
+        html = book.render_page(1, 'Ana', 'Bo')
+        assert '<p>Bo &amp; Ana &lt;3</p>' in html and 'id="page-1"' in html
+        assert not os.path.exists(output + '.partial')
+    print("✅ Page store served by the renderer")
+
+def main():
+    print("=== Book Ingestion Test ===")
+    test_manuscript_blocks()
+    test_paginate_respects_line_budget()
+    test_store_loads_into_renderer()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for sequence-backed library ID generation
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+from library_ids import KeyMismatch, LibraryIdCodec, LibraryIdGenerator, is_valid
+
+KEY = 'test-key'
+
+def connection_factory(database):
+    @contextmanager
+    def connect():
+        with closing(sqlite3.connect(database)) as conn:
+            yield conn
+    return connect
+
+def test_codec_is_unique_and_valid():
+    """Consecutive sequence values map to distinct, well-formed IDs"""
+    codec = LibraryIdCodec(KEY)
+    ids = [codec.encode(value) for value in range(20000)]
+    assert len(set(ids)) == len(ids)
+    assert all(is_valid(library_id) for library_id in ids)
+    assert LibraryIdCodec('other-key').encode(0) != ids[0]
+    print("✅ Codec produces unique, valid IDs")
+
+def test_check_digit_rejects_typos():
+    """Single substitutions and adjacent transpositions fail the check digit"""
+    library_id = LibraryIdCodec(KEY).encode(42)
+    chars = list(library_id)
+    chars[5] = '0' if chars[5] != '0' else '1'
+    assert not is_valid(''.join(chars))
+
+    chars = list(library_id)
+    if chars[5] != chars[6]:
+        chars[5], chars[6] = chars[6], chars[5]
+        assert not is_valid(''.join(chars))
+    assert not is_valid('LIB-1234')
+    assert not is_valid(None)
+    print("✅ Check digit rejects malformed IDs")
+
+def test_generators_share_sequence():
+    """Two processes allocate disjoint blocks from the same database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        with closing(sqlite3.connect(database)) as conn:
+            migrations.migrate(conn)
+
+        first = LibraryIdGenerator(connection_factory(database), KEY, block_size=10)
+        second = LibraryIdGenerator(connection_factory(database), KEY, block_size=10)
+        ids = [gen.next_id() for _ in range(25) for gen in (first, second)]
+        assert len(set(ids)) == 50
+        assert first.blocks_allocated == 3 and second.blocks_allocated == 3
+
+        with closing(sqlite3.connect(database)) as conn:
+            assert conn.execute("SELECT next_value FROM sequences WHERE name = 'library_id'").fetchone()[0] == 60
+    print("✅ Generators allocate disjoint blocks")
+
+def test_legacy_ids_skipped_and_accepted():
+    """Pre-existing random IDs are never reissued and still pass the login check"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        clash = LibraryIdCodec(KEY).encode(0)
+        with closing(sqlite3.connect(database)) as conn:
+            conn.executescript('''
+                CREATE TABLE users (
+                    id TEXT PRIMARY KEY,
+                    library_id TEXT UNIQUE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_access TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    access_count INTEGER DEFAULT 1
+                );
+            ''')
+            conn.executemany('INSERT INTO users (id, library_id) VALUES (?, ?)',
+                             [('u1', clash), ('u2', 'LIB-AAAA-AAAA')])
+            conn.commit()
+            migrations.migrate(conn)
+
+        generator = LibraryIdGenerator(connection_factory(database), KEY)
+        assert generator.legacy_ids == {clash, 'LIB-AAAA-AAAA'}
+        assert generator.next_id() == LibraryIdCodec(KEY).encode(1)
+        assert generator.accepts('LIB-AAAA-AAAA')
+        assert not generator.accepts('LIB-AAAA-AAAB')
+    print("✅ Legacy IDs are skipped and still accepted")
+
+def test_key_is_stored_and_checked():
+    """The first key is kept in the database and a different configured key is refused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        with closing(sqlite3.connect(database)) as conn:
+            migrations.migrate(conn)
+        connect = connection_factory(database)
+
+        # No configured key: a random one is stored and reused by later generators
+        first = LibraryIdGenerator(connect, block_size=10)
+        issued = first.next_id()
+        second = LibraryIdGenerator(connect, block_size=10)
+        assert second.codec.key == first.codec.key != KEY.encode('utf-8')
+        assert second.codec.encode(0) == issued
+
+        try:
+            LibraryIdGenerator(connect, KEY).codec
+            assert False, 'changed key accepted'
+        except KeyMismatch:
+            pass
+    print("✅ The library ID key is stored on first use and cannot change")
+
+def main():
+    print("=== Library ID Test ===")
+    test_codec_is_unique_and_valid()
+    test_check_digit_rejects_typos()
+    test_generators_share_sequence()
+    test_legacy_ids_skipped_and_accepted()
+    test_key_is_stored_and_checked()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for library ID search: prefix range scans, trigram FTS and the LIKE fallback
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+import migrations
+from db_pool import ConnectionPool
+
+LIBRARY_IDS = ['LIB-ABCD-0001', 'LIB-ABCE-0002', 'LIB-XABC-0003', 'LIB-ZZZZ-9999', 'LIB-50%_-0005']
+
+class NoTrigramConnection(sqlite3.Connection):
+    """A connection behaving like a SQLite build without the trigram tokenizer"""
+
+    def execute(self, sql, *args):
+        if 'USING fts5' in sql:
+            raise sqlite3.OperationalError('no such tokenizer: trigram')
+        return super().execute(sql, *args)
+
+def _database(tmp, fts=True):
+    database = os.path.join(tmp, 'names.db')
+    factory = sqlite3.Connection if fts else NoTrigramConnection
+    with closing(sqlite3.connect(database, factory=factory)) as conn:
+        migrations.migrate(conn)
+        conn.executemany('INSERT INTO users (id, library_id) VALUES (?, ?)',
+                         [(f'u{i}', library_id) for i, library_id in enumerate(LIBRARY_IDS)])
+        conn.commit()
+    return database
+
+@contextmanager
+def _serving(database):
+    """The app's test client with its pool pointed at database"""
+    pool, server.db_pool = server.db_pool, ConnectionPool(database, max_size=1)
+    try:
+        yield server.app.test_client()
+    finally:
+        server.db_pool.close_all()
+        server.db_pool = pool
+
+def _found(client, query):
+    response = client.get(f'/api/admin/users/search?{query}')
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    return [user['library_id'] for user in data['users']], data['pagination']
+
+def _plan(database, term, mode, use_fts=True):
+    query, params = server._user_search_query(term, mode, use_fts)
+    with closing(sqlite3.connect(database)) as conn:
+        return ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, (*params, 10, 0)))
+
+def test_prefix_uses_range_scan():
+    """Prefix search seeks the UNIQUE library_id index and returns IDs in order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = _database(tmp)
+        assert 'SEARCH u USING INDEX sqlite_autoindex_users_2 (library_id>? AND library_id<?)' \
+            in _plan(database, 'LIB-ABC', 'prefix')
+        with _serving(database) as client:
+            assert _found(client, 'q=lib-abc&mode=prefix')[0] == ['LIB-ABCD-0001', 'LIB-ABCE-0002']
+            assert _found(client, 'q=LIB-ABCD-0001&mode=prefix')[0] == ['LIB-ABCD-0001']
+            assert _found(client, 'q=ABC&mode=prefix')[0] == []
+    print("✅ Prefix search is an index range scan")
+
+def test_substring_uses_trigram_index():
+    """Three or more characters are matched through the FTS5 trigram index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = _database(tmp)
+        assert 'VIRTUAL TABLE INDEX' in _plan(database, 'ABC', 'substring')
+        with _serving(database) as client:
+            expected = ['LIB-ABCD-0001', 'LIB-ABCE-0002', 'LIB-XABC-0003']
+            assert _found(client, 'q=abc')[0] == expected
+            assert _found(client, 'q=ZZZ-99')[0] == ['LIB-ZZZZ-9999']
+            assert _found(client, 'q="AB"')[0] == []
+    print("✅ Substring search uses the trigram index")
+
+def test_short_terms_and_fallback_use_like():
+    """Short terms, and every term on builds without FTS5 trigrams, use an escaped LIKE"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = _database(tmp, fts=False)
+        with closing(sqlite3.connect(database)) as conn:
+            # The migration is recorded even though the index could not be created
+            assert migrations.current_version(conn) == migrations.LATEST_VERSION
+            assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'users_library_id_fts'"
+                                ).fetchone()[0] == 0
+        assert 'VIRTUAL TABLE' not in _plan(database, 'ABC', 'substring', use_fts=False)
+
+        with _serving(database) as client:
+            expected = ['LIB-ABCD-0001', 'LIB-ABCE-0002', 'LIB-XABC-0003']
+            assert _found(client, 'q=ABC')[0] == expected
+            assert _found(client, 'q=AB')[0] == expected
+            # LIKE wildcards in the term match literally
+            assert _found(client, 'q=%25')[0] == ['LIB-50%_-0005']
+            assert _found(client, 'q=_')[0] == ['LIB-50%_-0005']
+    print("✅ Short terms and builds without trigrams fall back to LIKE")
+
+def test_term_and_page_limits():
+    """Empty, overlong and malformed queries answer 400; limit is clamped and offset pages"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with _serving(_database(tmp)) as client:
+            for query in ('q=', 'q=%20%20', 'q=' + 'A' * 51, 'q=ABC&mode=regex', 'q=ABC&offset=two',
+                          'q=ABC&limit=many'):
+                response = client.get(f'/api/admin/users/search?{query}')
+                assert response.status_code == 400 and not response.get_json()['success'], query
+
+            assert len(_found(client, 'q=' + 'A' * 50)[0]) == 0
+            found, pagination = _found(client, 'q=LIB&limit=2')
+            assert len(found) == 2 and pagination['has_more']
+            rest, pagination = _found(client, 'q=LIB&limit=2&offset=4')
+            assert len(rest) == 1 and not pagination['has_more']
+            assert _found(client, 'q=LIB&limit=1000')[1]['limit'] == 100
+            assert _found(client, 'q=LIB&limit=0')[1]['limit'] == 1
+    print("✅ Search term length and page limits are enforced")
+
+def main():
+    print("=== Library ID Search Test ===")
+    test_prefix_uses_range_scan()
+    test_substring_uses_trigram_index()
+    test_short_terms_and_fallback_use_like()
+    test_term_and_page_limits()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for running migrations once under a file lock
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+from lifecycle import migrate_once
+
+def test_concurrent_starts_migrate_once():
+    """Only the first of several concurrent processes applies migrations"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(migrate_once(database)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        applied = [r for r in results if r]
+        assert len(results) == 4 and len(applied) == 1
+        assert applied[0][-1] == migrations.LATEST_VERSION
+        assert os.path.exists(database + '.migrate.lock')
+
+        conn = sqlite3.connect(database)
+        assert migrations.current_version(conn) == migrations.LATEST_VERSION
+        conn.close()
+    print("✅ Migrations applied once across concurrent starts")
+
+def test_memory_database_skipped():
+    """:memory: is never locked or migrated on behalf of other processes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            assert migrate_once(':memory:') == []
+            assert os.listdir(tmp) == []
+        finally:
+            os.chdir(cwd)
+    print("✅ In-memory databases leave no lock file behind")
+
+def main():
+    print("=== Lifecycle Test ===")
+    test_concurrent_starts_migrate_once()
+    test_memory_database_skipped()
+
+if __name__ == "__main__":
+    main()
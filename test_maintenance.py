@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for closing idle sessions and archiving old ones
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+from maintenance import SessionReaper
+
+def _setup(tmp):
+    database = os.path.join(tmp, 'names.db')
+    with closing(sqlite3.connect(database)) as conn:
+        migrations.migrate(conn)
+        conn.executemany('INSERT INTO users (id, library_id) VALUES (?, ?)',
+                         [('u1', 'LIB-AAAA-AAAA'), ('u2', 'LIB-BBBB-BBBB')])
+        conn.executemany('''
+            INSERT INTO user_sessions (user_id, book_id, session_start, session_end, pages_read)
+            VALUES (?, 1, datetime('now', ?), ?, ?)
+        ''', [
+            ('u1', '-200 days', None, 3),            # abandoned long ago
+            ('u1', '-100 days', None, 2),            # ended an hour after starting, past retention
+            ('u2', '-2 hours', None, 1),             # idle
+            ('u2', '-1 minutes', None, 0),           # active
+        ])
+        conn.execute("UPDATE user_sessions SET session_end = datetime(session_start, '+1 hour') WHERE id = 2")
+        conn.execute('INSERT INTO page_events (session_id, user_id, book_id, page, viewed_at) VALUES (1, ?, 1, 4, ?)',
+                     ('u1', '2000-01-01 00:00:00'))
+        conn.execute("INSERT INTO processed_events (user_id, event_id, event_type, processed_at) "
+                     "VALUES ('u1', 'old', 'page_view', datetime('now', '-30 days')), "
+                     "('u1', 'new', 'page_view', CURRENT_TIMESTAMP)")
+        conn.commit()
+
+    @contextmanager
+    def connect():
+        with closing(sqlite3.connect(database)) as conn:
+            yield conn
+    return database, connect
+
+def test_reaper_closes_and_archives():
+    """Idle sessions close at their last activity; old ones move to the archive"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database, connect = _setup(tmp)
+        archive = os.path.join(tmp, 'archive.db')
+        reaper = SessionReaper(connect, archive, idle_timeout=1800, retention_days=90, chunk_size=1)
+
+        result = reaper.run()
+        assert result['error'] is None
+        assert result['sessions_closed'] == 2
+        assert result['sessions_archived'] == 2
+        assert result['events_pruned'] == 1
+
+        with closing(sqlite3.connect(database)) as conn:
+            open_ids = [r[0] for r in conn.execute('SELECT id FROM user_sessions WHERE session_end IS NULL')]
+            assert open_ids == [4]
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions ORDER BY id')] == [3, 4]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 0
+            summary = conn.execute('''
+                SELECT sessions, pages_read, reading_seconds FROM session_summaries WHERE user_id = 'u1'
+            ''').fetchone()
+            assert summary == (2, 5, 3600)
+            # Counters keep the archived history
+            assert conn.execute("SELECT total_sessions, total_pages_read FROM user_counters "
+                                "WHERE user_id = 'u1'").fetchone() == (2, 5)
+            assert [r[0] for r in conn.execute('SELECT event_id FROM processed_events')] == ['new']
+
+        with closing(sqlite3.connect(archive)) as conn:
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions ORDER BY id')] == [1, 2]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 1
+
+        # A second pass finds nothing left to do
+        again = reaper.run()
+        assert (again['sessions_closed'], again['sessions_archived'], again['events_pruned']) == (0, 0, 0)
+        assert reaper.stats()['sessions_archived'] == 2
+    print("✅ Idle sessions closed and old sessions archived in chunks")
+
+def test_crash_between_copy_and_delete():
+    """A failure after the archive copy loses nothing and the next run finishes the move"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database, connect = _setup(tmp)
+        archive = os.path.join(tmp, 'archive.db')
+        reaper = SessionReaper(connect, archive, retention_days=90, chunk_size=1)
+
+        def crash(conn, ids):
+            raise sqlite3.OperationalError('disk I/O error')
+        reaper._remove_archived = crash
+        assert reaper.run()['error'] == 'disk I/O error'
+
+        # The first chunk reached the archive and is still live
+        with closing(sqlite3.connect(archive)) as conn:
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions')] == [1]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 1
+        with closing(sqlite3.connect(database)) as conn:
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions ORDER BY id')] == [1, 2, 3, 4]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 1
+            assert conn.execute('SELECT COUNT(*) FROM session_summaries').fetchone()[0] == 0
+
+        del reaper._remove_archived
+        result = reaper.run()
+        assert result['error'] is None and result['sessions_archived'] == 2
+
+        with closing(sqlite3.connect(database)) as conn:
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions ORDER BY id')] == [3, 4]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 0
+            # Summarised once, not once per attempt
+            summary = conn.execute('''
+                SELECT sessions, pages_read, reading_seconds FROM session_summaries WHERE user_id = 'u1'
+            ''').fetchone()
+            assert summary == (2, 5, 3600)
+        with closing(sqlite3.connect(archive)) as conn:
+            assert [r[0] for r in conn.execute('SELECT id FROM user_sessions ORDER BY id')] == [1, 2]
+            assert conn.execute('SELECT COUNT(*) FROM page_events').fetchone()[0] == 1
+    print("✅ Archiving survives a crash between copy and delete")
+
+def test_last_activity_follows_progress():
+    """Progress updates move last_activity so active readers are never reaped"""
+    with closing(sqlite3.connect(':memory:')) as conn:
+        migrations.migrate(conn)
+        conn.execute("INSERT INTO user_sessions (user_id, session_start) VALUES ('u1', datetime('now', '-2 hours'))")
+        conn.execute('UPDATE user_sessions SET pages_read = 5 WHERE id = 1')
+        conn.commit()
+        idle = conn.execute("SELECT last_activity > datetime('now', '-1 minutes') FROM user_sessions").fetchone()[0]
+        assert idle == 1
+    print("✅ Progress updates record last activity")
+
+def test_one_reaper_per_lock():
+    """Reapers sharing a lock file elect one leader; another takes over when it stops"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, connect = _setup(tmp)
+        lock_path = os.path.join(tmp, 'names.db.maintenance.lock')
+        first, second = (SessionReaper(connect, ':memory:', lock_path=lock_path) for _ in range(2))
+        assert first.is_leader() and not second.is_leader()
+        assert not second.stats()['leader']
+        first.stop()
+        assert second.is_leader()
+        second.stop()
+    print("✅ Only one reaper runs scheduled passes")
+
+def main():
+    print("=== Maintenance Test ===")
+    test_reaper_closes_and_archives()
+    test_crash_between_copy_and_delete()
+    test_last_activity_follows_progress()
+    test_one_reaper_per_lock()
+
+if __name__ == "__main__":
+    main()
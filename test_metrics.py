@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the metrics registry and SQLite statement timing
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import MetricsRegistry, statement_label, timed_connection_factory
+
+def test_histogram_renders_cumulative_buckets():
+    """Histogram buckets are cumulative and end with +Inf, _sum and _count"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    latency.observe(0.05, '/a')
+    latency.observe(0.5, '/a')
+    latency.observe(5.0, '/a')
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    print("✅ Histogram rendered in exposition format")
+
+def test_counters_and_collectors():
+    """Counters accumulate per label set and collectors are read at scrape time"""
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('status',))
+    requests.inc('200')
+    requests.inc('200')
+    requests.inc('500')
+    state = {'idle': 3}
+    registry.collect('pool_idle', 'Idle connections', 'gauge', lambda: state['idle'])
+    state['idle'] = 5
+
+    text = registry.render()
+    assert 'requests_total{status="200"} 2' in text
+    assert 'requests_total{status="500"} 1' in text
+    assert 'pool_idle 5' in text
+    print("✅ Counters and collectors rendered")
+
+def test_timed_connection_records_statements():
+    """Both cursor.execute and connection.execute are timed per statement"""
+    registry = MetricsRegistry()
+    queries = registry.histogram('query_seconds', 'Query time', ('statement',))
+    conn = sqlite3.connect(':memory:', factory=timed_connection_factory(queries))
+    conn.execute('CREATE TABLE t (x)')
+    conn.cursor().executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+    conn.cursor().execute('SELECT   x\n FROM t').fetchall()
+
+    text = registry.render()
+    assert 'query_seconds_count{statement="CREATE TABLE t (x)"} 1' in text
+    assert 'query_seconds_count{statement="INSERT INTO t VALUES (?)"} 1' in text
+    assert 'query_seconds_count{statement="SELECT x FROM t"} 1' in text
+    assert len(statement_label('SELECT ' + 'x, ' * 100)) == 80
+    # Labels are memoized, so repeated statements skip the regex
+    hits = statement_label.cache_info().hits
+    conn.cursor().execute('SELECT   x\n FROM t').fetchall()
+    assert statement_label.cache_info().hits == hits + 1
+    print("✅ SQLite statements timed with normalised labels")
+
+def main():
+    print("=== Metrics Test ===")
+    test_histogram_renders_cumulative_buckets()
+    test_counters_and_collectors()
+    test_timed_connection_records_statements()
+
+if __name__ == "__main__":
+    main()
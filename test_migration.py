@@ -2,11 +2,13 @@
 import sqlite3
 import sys
 import os
+import tempfile
 
 # Add the current directory to Python path to import from app.py
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import init_db, migrate_database
+import migrations
 
 def check_database_schema():
     """Check the current database schema"""
@@ -49,6 +51,53 @@ def check_database_schema():
     finally:
         conn.close()
 
+def test_legacy_user_names_is_rebuilt():
+    """A positional legacy user_names table is copied set-based into the new schema"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'legacy.db'))
+        conn.execute('CREATE TABLE user_names (female_name TEXT, male_name TEXT, timestamp DATETIME)')
+        conn.executemany('INSERT INTO user_names VALUES (?, ?, ?)', [
+            ('Asha', 'Ravi', '2024-01-01 10:00:00'),
+            ('Mira', 'Dev', None),
+        ])
+        conn.commit()
+
+        assert migrations.migrate(conn) == [v for v, _, _ in migrations.MIGRATIONS]
+        assert migrations.current_version(conn) == migrations.LATEST_VERSION
+        assert migrations.table_columns(conn, 'user_names') == migrations.USER_NAMES_COLUMNS
+
+        rows = conn.execute('SELECT user_id, female_name, male_name, created_at FROM user_names ORDER BY id').fetchall()
+        assert rows[0] == ('migrated_user_1', 'Asha', 'Ravi', '2024-01-01 10:00:00')
+        assert rows[1][1:3] == ('Mira', 'Dev') and rows[1][3] is not None
+
+        # Running again is a no-op
+        assert migrations.migrate(conn) == []
+        conn.close()
+        print("✅ Legacy table rebuilt and migrations idempotent")
+
+def test_duplicate_names_merged_before_unique_index():
+    """Duplicate name rows are folded together so the UNIQUE index can be built"""
+    conn = sqlite3.connect(':memory:')
+    migrations.migrate(conn, target=1)
+    conn.executemany('INSERT INTO user_names (user_id, female_name, male_name, usage_count) VALUES (?, ?, ?, ?)', [
+        ('u1', 'Asha', 'Ravi', 2),
+        ('u1', 'Asha', 'Ravi', 3),
+        ('u2', 'Asha', 'Ravi', 1),
+    ])
+    conn.commit()
+
+    migrations.migrate(conn)
+    rows = conn.execute('SELECT user_id, usage_count FROM user_names ORDER BY user_id').fetchall()
+    assert rows == [('u1', 5), ('u2', 1)]
+
+    try:
+        conn.execute("INSERT INTO user_names (user_id, female_name, male_name) VALUES ('u1', 'Asha', 'Ravi')")
+        assert False, 'expected UNIQUE constraint failure'
+    except sqlite3.IntegrityError:
+        pass
+    conn.close()
+    print("✅ Duplicates merged and UNIQUE index enforced")
+
 def main():
     print("=== Database Migration Test ===")
     
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped page archive
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from werkzeug.wsgi import FileWrapper
+
+from book_renderer import BookRenderer
+from page_archive import InvalidArchive, PageArchive, build_archive, file_digest
+
+BOOK = '''
+<div id="page-1" class="page"><p>Sameena met Sanjay. ''' + 'The rain kept falling. ' * 40 + '''</p></div>
+<div id="page-2" class="page"><p>Sanjay waved at Sameena &amp; smiled.</p></div>
+'''
+
+def _build(tmp, pairs=()):
+    source = os.path.join(tmp, 'book.html')
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write(BOOK)
+    renderer = BookRenderer.from_file(source)
+    output = os.path.join(tmp, 'book.pagearchive')
+    build_archive(renderer, output, file_digest(source), pairs)
+    return source, renderer, output
+
+def _body(response):
+    return b''.join(bytes(chunk) for chunk in response.response)
+
+def test_archive_matches_renderer():
+    """Stored bodies decode to exactly what the rendering route returns"""
+    app = Flask(__name__)
+    with tempfile.TemporaryDirectory() as tmp:
+        source, renderer, output = _build(tmp, [('Asha', 'Ravi')])
+        archive = PageArchive.for_source(output, source, renderer)
+        assert archive.pairs == {('Sameena', 'Sanjay'): 0, ('Asha', 'Ravi'): 1}
+
+        for names in (('Sameena', 'Sanjay'), ('Asha', 'Ravi')):
+            with app.test_request_context('/') as ctx:
+                payload = json.loads(_body(archive.response(ctx.request, 2, *names)))
+            assert payload == {'success': True, 'page': 2, 'total_pages': 3,
+                               'html': renderer.render_page(2, *names)}
+
+        # Unknown name pairs and pages are left to the renderer
+        with app.test_request_context('/') as ctx:
+            assert archive.response(ctx.request, 2, 'Lena', 'Tom') is None
+            assert archive.response(ctx.request, 9, 'Asha', 'Ravi') is None
+        assert archive.stats()['misses'] == 2
+        archive.close()
+    print("✅ Archived pages match the rendered responses")
+
+def test_encodings_and_etags():
+    """gzip is chosen when accepted; a matching If-None-Match answers 304"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source, renderer, output = _build(tmp)
+        archive = PageArchive(output)
+        app = Flask(__name__)
+
+        with app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}) as ctx:
+            response = archive.response(ctx.request, 1, 'Sameena', 'Sanjay')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = _body(response)
+        assert response.content_length == len(body)
+        assert json.loads(gzip.decompress(body))['page'] == 1
+
+        with app.test_request_context('/', headers={'If-None-Match': f'"{response.get_etag()[0]}"',
+                                                    'Accept-Encoding': 'gzip'}) as ctx:
+            assert archive.response(ctx.request, 1, 'Sameena', 'Sanjay').status_code == 304
+        archive.close()
+    print("✅ Precompressed variants and ETags are served")
+
+def test_file_wrapper_sends_only_the_slice():
+    """With a server file_wrapper the body is a file positioned at the blob"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source, renderer, output = _build(tmp)
+        archive = PageArchive(output)
+        app = Flask(__name__)
+
+        with app.test_request_context('/', environ_base={'wsgi.file_wrapper': FileWrapper}) as ctx:
+            response = archive.response(ctx.request, 1, 'Sameena', 'Sanjay')
+        assert isinstance(response.response, FileWrapper)
+        body = b''.join(response.response)
+        response.response.close()
+        assert len(body) == response.content_length
+        assert json.loads(body)['html'] == renderer.render_page(1, 'Sameena', 'Sanjay')
+        assert archive.stats()['sendfile_responses'] == 1
+        archive.close()
+    print("✅ file_wrapper bodies stop at the end of the page")
+
+def test_stale_archive_rejected():
+    """An archive built from another source, or a corrupt file, is refused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source, renderer, output = _build(tmp)
+        with open(source, 'a', encoding='utf-8') as f:
+            f.write('<!-- edited -->')
+        for path in (output, source):
+            try:
+                PageArchive.for_source(path, source, renderer).close()
+                assert False, f'{path} accepted'
+            except InvalidArchive:
+                pass
+    print("✅ Stale and corrupt archives are rejected")
+
+def main():
+    print("=== Page Archive Test ===")
+    test_archive_matches_renderer()
+    test_encodings_and_etags()
+    test_file_wrapper_sends_only_the_slice()
+    test_stale_archive_rejected()
+
+if __name__ == "__main__":
+    main()
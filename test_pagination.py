@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset pagination of the admin user list and its trigger-maintained totals
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+import migrations
+from maintenance import SessionReaper
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def _seed_users(count=13):
+    """Users whose sort columns repeat, so every page boundary falls inside a tie
+
+    Every third user has never logged in, so last_access is NULL.
+    """
+    with server.get_db_connection() as conn:
+        for i in range(count):
+            user_id = f'page-user-{i:02d}'
+            conn.execute('''
+                INSERT OR IGNORE INTO users (id, library_id, created_at, last_access, access_count)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, f'LIB-PAGE-{i:04d}', f'2024-01-0{i % 3 + 1} 00:00:00',
+                  f'2024-02-0{i % 2 + 1} 00:00:00' if i % 3 else None, i % 4))
+            conn.execute('INSERT INTO user_sessions (user_id, pages_read) VALUES (?, ?)',
+                         (user_id, i % 3))
+        conn.commit()
+
+def _expected(sort, order):
+    column, tie_breaker = server.ADMIN_USER_SORTS[sort]
+    with server.get_db_connection() as conn:
+        return [row[0] for row in conn.execute(f'''
+            SELECT u.id FROM users u JOIN user_counters uc ON uc.user_id = u.id
+            ORDER BY {column} {order}, {tie_breaker} {order}
+        ''')]
+
+def test_cursor_round_trip():
+    """encode_cursor/decode_cursor round-trip and reject malformed tokens"""
+    for values in (['2024-01-01 00:00:00', 7], [None, 'user-id'], [3, 'ä"\\']):
+        assert decode_cursor(encode_cursor(values), 2) == values
+    for token in ('not a cursor', encode_cursor([1]), encode_cursor({'a': 1})[:-2]):
+        try:
+            decode_cursor(token, 2)
+            assert False, f'{token} accepted'
+        except InvalidCursor:
+            pass
+    print("✅ Cursors round-trip")
+
+def test_every_sort_pages_through_ties():
+    """Following next_cursor visits every user once, in order, for every sort and order"""
+    server.init_db()
+    _seed_users()
+    client = server.app.test_client()
+    for sort in server.ADMIN_USER_SORTS:
+        for order in ('asc', 'desc'):
+            seen = []
+            cursor = None
+            while True:
+                query = f'/api/admin/stats?sort={sort}&order={order}&limit=4'
+                response = client.get(query + (f'&cursor={cursor}' if cursor else ''))
+                assert response.status_code == 200, response.get_json()
+                data = response.get_json()
+                seen += [user['user_id'] for user in data['users']]
+                cursor = data['pagination']['next_cursor']
+                assert data['pagination']['has_more'] == (cursor is not None)
+                if cursor is None:
+                    break
+            assert seen == _expected(sort, order), (sort, order)
+    print("✅ Keyset pages cover every user once for every sort column")
+
+def test_invalid_requests_rejected():
+    """Malformed cursors, unknown sorts and orders answer 400"""
+    server.init_db()
+    client = server.app.test_client()
+    for query in ('cursor=not-a-cursor', f'cursor={encode_cursor([1])}', 'sort=password',
+                  'order=sideways', 'limit=ten'):
+        response = client.get(f'/api/admin/stats?{query}')
+        assert response.status_code == 400 and not response.get_json()['success'], query
+    print("✅ Invalid cursors answer 400")
+
+def test_counters_match_counts():
+    """Trigger-maintained totals equal COUNT(*)/SUM over live and archived rows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        archive = os.path.join(tmp, 'archive.db')
+
+        @contextmanager
+        def connect():
+            with closing(sqlite3.connect(database)) as conn:
+                yield conn
+
+        with connect() as conn:
+            migrations.migrate(conn)
+            conn.executemany('INSERT INTO users (id, library_id) VALUES (?, ?)',
+                             [(f'u{i}', f'LIB-CNT-{i}') for i in range(5)])
+            conn.executemany('''
+                INSERT INTO user_sessions (user_id, session_start, pages_read)
+                VALUES (?, datetime('now', ?), ?)
+            ''', [(f'u{i % 5}', f'-{i * 30} days', i) for i in range(8)])
+            conn.executemany('UPDATE user_sessions SET pages_read = ? WHERE id = ?', [(10, 1), (0, 2), (4, 3)])
+            conn.execute("UPDATE user_sessions SET session_end = datetime(session_start, '+1 hour')")
+            conn.executemany('''
+                INSERT INTO user_names (user_id, female_name, male_name) VALUES (?, ?, ?)
+                ON CONFLICT (user_id, female_name, male_name) DO UPDATE SET usage_count = usage_count + 1
+            ''', [('u0', 'Asha', 'Ravi'), ('u0', 'Asha', 'Ravi'), ('u1', 'Mira', 'Dev')])
+            conn.commit()
+
+        result = SessionReaper(connect, archive, retention_days=90, chunk_size=2).run()
+        assert result['error'] is None and result['sessions_archived'] > 0
+
+        with connect() as conn:
+            conn.execute('ATTACH DATABASE ? AS archive', (archive,))
+            counters = dict(conn.execute('SELECT name, value FROM stats_counters'))
+            sessions = '(SELECT user_id, pages_read FROM main.user_sessions UNION ALL ' \
+                       'SELECT user_id, pages_read FROM archive.user_sessions)'
+            expected = {
+                'total_users': conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+                'total_sessions': conn.execute(f'SELECT COUNT(*) FROM {sessions}').fetchone()[0],
+                'total_pages_read': conn.execute(f'SELECT SUM(pages_read) FROM {sessions}').fetchone()[0],
+                'total_name_combinations': conn.execute('SELECT COUNT(*) FROM user_names').fetchone()[0],
+            }
+            assert counters == expected == {'total_users': 5, 'total_sessions': 8,
+                                            'total_pages_read': 39, 'total_name_combinations': 2}
+            per_user = conn.execute(f'''
+                SELECT user_id, COUNT(*), SUM(pages_read) FROM {sessions} GROUP BY user_id ORDER BY user_id
+            ''').fetchall()
+            assert conn.execute('SELECT user_id, total_sessions, total_pages_read FROM user_counters '
+                                'ORDER BY user_id').fetchall() == per_user
+    print("✅ stats_counters match COUNT(*) after inserts, updates and archiving")
+
+def main():
+    print("=== Pagination Test ===")
+    test_cursor_round_trip()
+    test_every_sort_pages_through_ties()
+    test_invalid_requests_rejected()
+    test_counters_match_counts()
+
+if __name__ == "__main__":
+    main()
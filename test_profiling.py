@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in request profiling
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from profiling import HEADER, RequestProfiler, sign, verify
+
+def make_app(profiler):
+    app = Flask(__name__)
+    profiler.init_app(app)
+
+    @app.route('/slow')
+    def slow():
+        conn = sqlite3.connect(':memory:')
+        conn.execute('SELECT 1').fetchall()
+        conn.close()
+        return 'ok'
+
+    return app
+
+def test_signed_header():
+    """Signatures are bound to method, path and a recent timestamp"""
+    value = sign('secret', 'GET', '/slow', timestamp=1000)
+    assert verify('secret', value, 'GET', '/slow', now=1100)
+    assert not verify('other', value, 'GET', '/slow', now=1100)
+    assert not verify('secret', value, 'POST', '/slow', now=1100)
+    assert not verify('secret', value, 'GET', '/slow', now=5000)
+    assert not verify('secret', 'garbage', 'GET', '/slow', now=1100)
+    print("✅ Signed profiling header verified")
+
+def test_only_selected_requests_profiled():
+    """Requests are profiled for listed paths or a valid signature only"""
+    profiler = RequestProfiler(secret='secret', history=2)
+    client = make_app(profiler).test_client()
+
+    client.get('/slow')
+    client.get('/slow', headers={HEADER: sign('wrong', 'GET', '/slow')})
+    assert profiler.profiles() == []
+
+    client.get('/slow', headers={HEADER: sign('secret', 'GET', '/slow')})
+    profiles = profiler.profiles()
+    assert len(profiles) == 1 and profiles[0]['path'] == '/slow'
+    assert profiles[0]['sql_ms'] > 0
+    assert 'report' in profiler.get(profiles[0]['id'])
+    print("✅ Only signed requests profiled")
+
+def test_ring_buffer_keeps_latest():
+    """Configured endpoints are always profiled and only N profiles are kept"""
+    profiler = RequestProfiler(endpoints=['/slow'], history=2)
+    client = make_app(profiler).test_client()
+    for _ in range(3):
+        client.get('/slow')
+    assert [p['id'] for p in profiler.profiles()] == [3, 2]
+    assert profiler.get(1) is None
+    print("✅ Ring buffer keeps the latest profiles")
+
+def main():
+    print("=== Request Profiling Test ===")
+    test_signed_header()
+    test_only_selected_requests_profiled()
+    test_ring_buffer_keeps_latest()
+
+if __name__ == "__main__":
+    main()
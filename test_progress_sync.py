@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for long-poll progress sync
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from progress_sync import ProgressHub
+
+def make_hub(store, poll_interval=0.05):
+    load = lambda ids: {i: store[i] for i in ids if i in store}
+    return ProgressHub(load, ThreadPoolExecutor(max_workers=2), poll_interval=poll_interval)
+
+def test_publish_wakes_waiter():
+    """A publish from another thread wakes the waiter before the poll interval"""
+    store = {1: 3}
+    hub = make_hub(store, poll_interval=10)
+
+    async def scenario():
+        waiter = asyncio.ensure_future(hub.wait(1, since=3, timeout=5))
+        await asyncio.sleep(0.05)
+        threading.Thread(target=hub.publish, args=(1, 7)).start()
+        return await waiter
+
+    assert asyncio.run(scenario()) == (7, True)
+    assert hub.stats()['waiters'] == 0
+    print("✅ Publish wakes long-poll waiter")
+
+def test_poller_sees_external_writes():
+    """Changes made elsewhere are found by the shared batched poll"""
+    store = {1: 3, 2: 5}
+    hub = make_hub(store)
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(hub.wait(1, since=3, timeout=5)),
+                   asyncio.ensure_future(hub.wait(2, since=5, timeout=0.3))]
+        await asyncio.sleep(0.05)
+        store[1] = 4
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(scenario()) == [(4, True), (5, False)]
+    print("✅ Poller picks up external writes; unchanged sessions time out")
+
+def test_changed_and_missing_sessions():
+    """Stale since returns at once and unknown sessions raise KeyError"""
+    hub = make_hub({1: 9})
+    assert asyncio.run(hub.wait(1, since=2, timeout=5)) == (9, True)
+    try:
+        asyncio.run(hub.wait(2, since=0, timeout=5))
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+    print("✅ Immediate answers for stale or unknown sessions")
+
+def main():
+    print("=== Progress Sync Test ===")
+    test_publish_wakes_waiter()
+    test_poller_sees_external_writes()
+    test_changed_and_missing_sessions()
+
+if __name__ == "__main__":
+    main()
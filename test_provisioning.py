@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk library card provisioning
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+import migrations
+from library_ids import is_valid, normalize
+from provisioning import main as provision_main, provision_users, write_users
+
+def test_cli_creates_cards():
+    """The CLI creates every card in one go and writes them as NDJSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'names.db')
+        output = os.path.join(tmp, 'cards.ndjson')
+        provision_main(['250', '--database', database, '--format', 'ndjson', '--output', output])
+        provision_main(['10', '--database', database, '--output', os.path.join(tmp, 'more.csv')])
+
+        with open(output) as f:
+            cards = [json.loads(line) for line in f]
+        assert len(cards) == 250
+        assert all(is_valid(card['library_id']) for card in cards)
+
+        with closing(sqlite3.connect(database)) as conn:
+            assert migrations.current_version(conn) == migrations.LATEST_VERSION
+            assert conn.execute('SELECT COUNT(DISTINCT library_id) FROM users').fetchone()[0] == 260
+            assert conn.execute("SELECT value FROM stats_counters WHERE name = 'total_users'").fetchone()[0] == 260
+    print("✅ CLI provisions cards and keeps counters current")
+
+def test_failed_batch_creates_nothing():
+    """A duplicate library ID rolls back the whole batch"""
+    with closing(sqlite3.connect(':memory:', isolation_level=None)) as conn:
+        migrations.migrate(conn)
+        users = provision_users(conn, ['LIB-AAAA-AAAA', 'LIB-BBBB-BBBB'])
+        assert [library_id for _, library_id in users] == ['LIB-AAAA-AAAA', 'LIB-BBBB-BBBB']
+        try:
+            provision_users(conn, ['LIB-CCCC-CCCC', 'LIB-AAAA-AAAA'])
+            assert False, 'duplicate library ID was accepted'
+        except sqlite3.IntegrityError:
+            pass
+        assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 2
+    print("✅ Failed batches are rolled back")
+
+def test_write_users_csv():
+    out = io.StringIO()
+    write_users([('u1', 'LIB-AAAA-AAAA')], 'csv', out)
+    assert out.getvalue().splitlines() == ['user_id,library_id', 'u1,LIB-AAAA-AAAA']
+    print("✅ Cards written as CSV")
+
+def _bulk(client, body, query=''):
+    return client.post(f'/api/users/bulk{query}', json=body)
+
+def _check_cards(cards):
+    """Cards are unique, canonical, valid library IDs of users that exist"""
+    library_ids = [card['library_id'] for card in cards]
+    assert len(set(library_ids)) == len(library_ids)
+    assert len({card['user_id'] for card in cards}) == len(cards)
+    assert all(normalize(library_id) == library_id and is_valid(library_id) for library_id in library_ids)
+    with server.get_db_connection() as conn:
+        placeholders = ','.join('?' * len(cards))
+        rows = conn.execute(f'SELECT id, library_id FROM users WHERE library_id IN ({placeholders})',
+                            library_ids).fetchall()
+    assert sorted(map(tuple, rows)) == sorted((card['user_id'], card['library_id']) for card in cards)
+
+def test_bulk_endpoint_csv():
+    """POST /api/users/bulk answers 201 with one CSV row per new card"""
+    server.init_db()
+    client = server.app.test_client()
+    response = _bulk(client, {'count': 25})
+    assert response.status_code == 201 and response.mimetype == 'text/csv'
+    assert response.headers['X-Users-Created'] == '25'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="library-cards-')
+    cards = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(cards) == 25
+    _check_cards(cards)
+
+    # A provisioned card logs in like any other
+    login = client.post('/api/login', json={'library_id': cards[0]['library_id'].lower()})
+    assert login.status_code == 200 and login.get_json()['user_id'] == cards[0]['user_id']
+    print("✅ Bulk endpoint streams new cards as CSV")
+
+def test_bulk_endpoint_ndjson():
+    """format=ndjson, in the body or the query string, answers one JSON object per card"""
+    server.init_db()
+    client = server.app.test_client()
+    seen = []
+    for body, query in (({'count': 7, 'format': 'ndjson'}, ''), ({'count': 3}, '?format=ndjson')):
+        response = _bulk(client, body, query)
+        assert response.status_code == 201 and response.mimetype == 'application/x-ndjson'
+        assert response.headers['X-Users-Created'] == str(body['count'])
+        cards = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(cards) == body['count'] and all(list(card) == ['user_id', 'library_id'] for card in cards)
+        seen += cards
+    _check_cards(seen)
+    print("✅ Bulk endpoint streams new cards as NDJSON")
+
+def test_bulk_endpoint_rejects_bad_requests():
+    """count outside 1..BULK_USERS_MAX, non-integer counts and unknown formats answer 400"""
+    server.init_db()
+    client = server.app.test_client()
+    maximum, server.app_config.BULK_USERS_MAX = server.app_config.BULK_USERS_MAX, 5
+    try:
+        with server.get_db_connection() as conn:
+            users = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        for body in ({'count': 0}, {'count': -3}, {'count': 6}, {'count': 'ten'}, {},
+                     {'count': 2, 'format': 'xml'}):
+            response = _bulk(client, body)
+            assert response.status_code == 400 and not response.get_json()['success'], body
+        with server.get_db_connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == users
+        assert _bulk(client, {'count': 5}).headers['X-Users-Created'] == '5'
+    finally:
+        server.app_config.BULK_USERS_MAX = maximum
+    print("✅ Bulk endpoint rejects bad counts and formats")
+
+def main():
+    print("=== Provisioning Test ===")
+    test_cli_creates_cards()
+    test_failed_batch_creates_nothing()
+    test_write_users_csv()
+    test_bulk_endpoint_csv()
+    test_bulk_endpoint_ndjson()
+    test_bulk_endpoint_rejects_bad_requests()
+
+if __name__ == "__main__":
+    main()
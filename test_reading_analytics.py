@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the page rollup and drop-off endpoints under /api/admin/reading
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+
+# 10:00 UTC ten days ago, inside the window events are accepted for
+BASE = (datetime.now(timezone.utc) - timedelta(days=10)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+def _reading_session(client):
+    server.init_db()
+    user = client.post('/api/create-user').get_json()
+    session = client.post('/api/login', json={'library_id': user['library_id']}).get_json()
+    return user['user_id'], session['session_id']
+
+def _read(client, user_id, session_id, reads):
+    """Post page_read events; each (page, viewed_at, dwell_ms) starts at viewed_at"""
+    events = [{
+        'id': f'read-{session_id}-{i}',
+        'type': 'page_read',
+        'session_id': session_id,
+        'page': page,
+        'dwell_ms': dwell_ms,
+        'ts': int(viewed_at.timestamp() * 1000) + dwell_ms,
+    } for i, (page, viewed_at, dwell_ms) in enumerate(reads)]
+    response = client.post('/api/events/batch', json={'user_id': user_id, 'events': events})
+    assert response.status_code == 200, response.get_json()
+
+def _rollups(client, **query):
+    response = client.get('/api/admin/reading/pages', query_string=query)
+    assert response.status_code == 200, response.get_json()
+    return [(r['bucket_start'], r['page'], r['views'], r['avg_dwell_ms'])
+            for r in response.get_json()['rollups']]
+
+def test_page_rollups_by_bucket_and_window():
+    """Hourly and daily rollups are filtered by a UTC window and page"""
+    client = server.app.test_client()
+    user_id, session_id = _reading_session(client)
+    _read(client, user_id, session_id, [
+        (2, BASE, 1000),
+        (2, BASE + timedelta(minutes=20), 3000),
+        (3, BASE + timedelta(hours=1), 500),
+    ])
+    hour = BASE.strftime('%Y-%m-%d %H:00:00')
+    next_hour = (BASE + timedelta(hours=1)).strftime('%Y-%m-%d %H:00:00')
+    window = {'since': BASE.replace(tzinfo=None).isoformat(),
+              'until': (BASE + timedelta(hours=2)).replace(tzinfo=None).isoformat()}
+
+    assert _rollups(client, bucket='hour', **window) == [(hour, 2, 2, 2000), (next_hour, 3, 1, 500)]
+    assert _rollups(client, bucket='hour', page=3, **window) == [(next_hour, 3, 1, 500)]
+    day = _rollups(client, bucket='day', since=BASE.date().isoformat(),
+                   until=(BASE + timedelta(days=1)).date().isoformat())
+    assert (BASE.strftime('%Y-%m-%d'), 2, 2, 2000) in day and (BASE.strftime('%Y-%m-%d'), 3, 1, 500) in day
+    print("✅ Rollups are filtered by bucket, window and page")
+
+def test_since_until_converted_to_utc():
+    """Offsets in since/until are converted to UTC; naive values are taken as UTC"""
+    client = server.app.test_client()
+    user_id, session_id = _reading_session(client)
+    start = BASE + timedelta(hours=4)
+    _read(client, user_id, session_id, [(5, start, 700), (6, start + timedelta(hours=1), 900)])
+    second_hour = (start + timedelta(hours=1)).strftime('%Y-%m-%d %H:00:00')
+
+    # The start of the second hour, spelled with offsets, with Z and naive
+    india = timezone(timedelta(hours=5, minutes=30))
+    pacific = timezone(timedelta(hours=-8))
+    until = (start + timedelta(hours=2)).replace(tzinfo=None).isoformat()
+    for since in ((start + timedelta(hours=1)).astimezone(india).isoformat(),
+                  (start + timedelta(hours=1)).astimezone(pacific).isoformat(),
+                  (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                  (start + timedelta(hours=1)).replace(tzinfo=None).isoformat()):
+        assert _rollups(client, bucket='hour', since=since, until=until) == [(second_hour, 6, 1, 900)], since
+    print("✅ since/until offsets are converted to UTC")
+
+def test_invalid_rollup_queries_rejected():
+    """Unparseable dates, pages and buckets answer 400; unknown books 404"""
+    client = server.app.test_client()
+    server.init_db()
+    for query in ({'since': 'yesterday'}, {'until': '2024-13-01'}, {'since': '2024-01-01T25:00'},
+                  {'page': 'two'}, {'bucket': 'week'}):
+        response = client.get('/api/admin/reading/pages', query_string=query)
+        assert response.status_code == 400 and not response.get_json()['success'], query
+    response = client.get('/api/admin/reading/pages', query_string={'book': 'no-such-book'})
+    assert response.status_code == 404
+    print("✅ Invalid rollup queries answer 400")
+
+def test_drop_off_counts_furthest_page():
+    """Each session counts once, at its furthest page; every page of the book is listed"""
+    client = server.app.test_client()
+    server.init_db()
+    before = client.get('/api/admin/reading/drop-off').get_json()
+    first = _reading_session(client)
+    second = _reading_session(client)
+    _read(client, *first, [(1, BASE, 100), (2, BASE, 100), (4, BASE, 100)])
+    _read(client, *second, [(1, BASE, 100), (2, BASE, 100), (2, BASE, 100)])
+
+    after = client.get('/api/admin/reading/drop-off').get_json()
+    assert after['success'] and after['book'] == server.app_config.BOOK_SLUG
+    assert len(after['pages']) == server.book.total_pages
+    assert [p['page'] for p in after['pages']] == list(range(server.book.total_pages))
+    assert after['total_sessions'] - before['total_sessions'] == 2
+
+    delta = {p['page']: (p['reached'] - b['reached'], p['stopped'] - b['stopped'])
+             for p, b in zip(after['pages'], before['pages'])}
+    assert delta[1] == (2, 0) and delta[2] == (2, 1) and delta[3] == (1, 0) and delta[4] == (1, 1)
+    assert delta[5] == (0, 0)
+    page = after['pages'][4]
+    assert page['drop_off_rate'] == round(page['stopped'] / page['reached'], 4)
+
+    response = client.get('/api/admin/reading/drop-off', query_string={'book': 'no-such-book'})
+    assert response.status_code == 404 and not response.get_json()['success']
+    print("✅ Drop-off counts each session at its furthest page")
+
+def main():
+    print("=== Reading Analytics Test ===")
+    test_page_rollups_by_bucket_and_window()
+    test_since_until_converted_to_utc()
+    test_invalid_rollup_queries_rejected()
+    test_drop_off_counts_furthest_page()
+
+if __name__ == "__main__":
+    main()
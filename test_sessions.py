@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for reading sessions: login, buffered progress and ending a session
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+
+def _login(client):
+    server.init_db()
+    user = client.post('/api/create-user').get_json()
+    session = client.post('/api/login', json={'library_id': user['library_id']}).get_json()
+    return user, session
+
+def _session_row(session_id):
+    with server.get_db_connection() as conn:
+        return conn.execute('SELECT pages_read, session_end FROM user_sessions WHERE id = ?',
+                            (session_id,)).fetchone()
+
+@contextmanager
+def _database_down():
+    """Every new request's connection fails, as if the database were locked"""
+    @contextmanager
+    def failing_connection():
+        raise sqlite3.OperationalError('database is locked')
+        yield
+    connection, server.get_db_connection = server.get_db_connection, failing_connection
+    try:
+        yield
+    finally:
+        server.get_db_connection = connection
+
+def test_failed_end_session_keeps_progress():
+    """Progress popped by a failed end-session goes back to the buffer and is written later"""
+    client = server.app.test_client()
+    _, session = _login(client)
+    session_id = session['session_id']
+    client.post('/api/update-session', json={'session_id': session_id, 'pages_read': 5})
+
+    with _database_down():
+        response = client.post('/api/end-session', json={'session_id': session_id})
+    assert response.status_code == 500 and not response.get_json()['success']
+    pages_read, session_end = _session_row(session_id)
+    assert session_end is None
+    # Back in the buffer, unless the background flush already wrote it
+    assert server.progress_buffer.peek(session_id) == 5 or pages_read == 5
+
+    assert client.post('/api/end-session', json={'session_id': session_id}).status_code == 200
+    pages_read, session_end = _session_row(session_id)
+    assert pages_read == 5 and session_end is not None
+    assert server.progress_buffer.peek(session_id) is None
+    print("✅ A failed end-session keeps the buffered progress")
+
+def _login_again(client, user, **body):
+    return client.post('/api/login', json={'library_id': user['library_id'], **body}).get_json()
+
+def test_login_resumes_recent_session():
+    """A login within the resume window continues the open session with its buffered progress"""
+    client = server.app.test_client()
+    user, session = _login(client)
+    assert not session['resumed']
+    client.post('/api/update-session', json={'session_id': session['session_id'], 'pages_read': 4})
+
+    again = _login_again(client, user)
+    assert again['resumed'] and again['session_id'] == session['session_id']
+    assert again['pages_read'] == 4
+    print("✅ Recent open sessions are resumed")
+
+def test_no_resume_past_window():
+    """A session idle for longer than SESSION_RESUME_WINDOW is left alone"""
+    client = server.app.test_client()
+    user, session = _login(client)
+    with server.get_db_connection() as conn:
+        conn.execute("UPDATE user_sessions SET session_start = datetime('now', ?), last_activity = NULL "
+                     "WHERE id = ?", (f'-{server.app_config.SESSION_RESUME_WINDOW + 60} seconds',
+                                      session['session_id']))
+        conn.commit()
+
+    again = _login_again(client, user)
+    assert not again['resumed'] and again['session_id'] != session['session_id']
+    assert again['pages_read'] == 0
+
+    # Recent activity counts from last_activity, not from the start
+    with server.get_db_connection() as conn:
+        conn.execute("UPDATE user_sessions SET session_start = datetime('now', '-1 days'), "
+                     "last_activity = datetime('now', '-1 minutes') WHERE id = ?", (again['session_id'],))
+        conn.commit()
+    assert _login_again(client, user)['session_id'] == again['session_id']
+
+    window, server.app_config.SESSION_RESUME_WINDOW = server.app_config.SESSION_RESUME_WINDOW, 0
+    try:
+        assert not _login_again(client, user)['resumed']
+    finally:
+        server.app_config.SESSION_RESUME_WINDOW = window
+    print("✅ Sessions past the resume window are not resumed")
+
+def test_no_resume_across_books():
+    """An open session of one book is not resumed when the reader opens another"""
+    client = server.app.test_client()
+    user, session = _login(client)
+    server.default_book_slug()
+    server.catalog.ensure('second-book', 'Second Book', None, server.app_config.BOOK_SOURCE,
+                          server.book.default_female, server.book.default_male, renderer=server.book)
+
+    other = _login_again(client, user, book='second-book')
+    assert not other['resumed'] and other['book'] == 'second-book'
+    assert other['session_id'] != session['session_id']
+    with server.get_db_connection() as conn:
+        books = dict(conn.execute('SELECT id, book_id FROM user_sessions WHERE id IN (?, ?)',
+                                  (session['session_id'], other['session_id'])).fetchall())
+    assert books[session['session_id']] != books[other['session_id']]
+
+    # Each book resumes its own session
+    assert _login_again(client, user)['session_id'] == session['session_id']
+    assert _login_again(client, user, book='second-book')['session_id'] == other['session_id']
+    print("✅ Sessions are only resumed for the same book")
+
+def test_no_resume_after_session_end():
+    """An ended session is never resumed, however recent"""
+    client = server.app.test_client()
+    user, session = _login(client)
+    assert client.post('/api/end-session', json={'session_id': session['session_id']}).status_code == 200
+
+    again = _login_again(client, user)
+    assert not again['resumed'] and again['session_id'] != session['session_id']
+    print("✅ Ended sessions are not resumed")
+
+def test_access_counts_coalesced():
+    """Logins are counted in the access buffer and written in one flush"""
+    client = server.app.test_client()
+    user, first = _login(client)
+    server.access_buffer.flush()
+    with server.get_db_connection() as conn:
+        count, last_access = conn.execute('SELECT access_count, last_access FROM users WHERE id = ?',
+                                          (user['user_id'],)).fetchone()
+    assert first['access_count'] == count
+
+    # Holding the flush lock keeps the background flusher out until the explicit flush
+    with server.access_buffer._flush_lock:
+        counts = [_login_again(client, user)['access_count'] for _ in range(3)]
+        assert counts == [count + 1, count + 2, count + 3]
+        pending = server.access_buffer.peek(user['user_id'])
+        assert pending[0] == 3 and pending[1] >= last_access
+        with server.get_db_connection() as conn:
+            assert conn.execute('SELECT access_count FROM users WHERE id = ?',
+                                (user['user_id'],)).fetchone()[0] == count
+
+    assert server.access_buffer.flush() >= 1
+    assert server.access_buffer.peek(user['user_id']) is None
+    with server.get_db_connection() as conn:
+        assert tuple(conn.execute('SELECT access_count, last_access FROM users WHERE id = ?',
+                                  (user['user_id'],)).fetchone()) == (count + 3, pending[1])
+    print("✅ Login access counts are coalesced and flushed")
+
+def main():
+    print("=== Reading Session Test ===")
+    test_failed_end_session_keeps_progress()
+    test_login_resumes_recent_session()
+    test_no_resume_past_window()
+    test_no_resume_across_books()
+    test_no_resume_after_session_end()
+    test_access_counts_coalesced()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for fingerprinted, precompressed frontend assets
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from static_assets import IMMUTABLE, REVALIDATE, StaticAssets, brotli
+
+INDEX = '''<html><head>
+<link rel="stylesheet" href="css/style.css">
+<script src='script.js'></script>
+<script src="https://cdn.example.com/lib.js"></script>
+</head><body><a href="admin.html">Admin</a><img src="missing.png"></body></html>
+'''
+SCRIPT = 'console.log("reading");\n' * 40
+
+def _assets(tmp):
+    os.makedirs(os.path.join(tmp, 'css'))
+    files = {'index.html': INDEX, 'admin.html': '<html></html>', 'script.js': SCRIPT,
+             'css/style.css': 'body { margin: 0; }\n' * 30}
+    for name, content in files.items():
+        with open(os.path.join(tmp, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return StaticAssets(tmp)
+
+def _response(assets, path, headers=None):
+    app = Flask(__name__)
+    with app.test_request_context('/', headers=headers or {}) as ctx:
+        return assets.response(ctx.request, path)
+
+def test_html_references_fingerprinted():
+    """Local src/href links in HTML point at hashed URLs; external, HTML and unknown links do not"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assets = _assets(tmp)
+        html = assets.assets['index.html'].data.decode('utf-8')
+        script = assets.url_for('script.js')
+        style = assets.url_for('css/style.css')
+        assert script != 'script.js' and script.startswith('script.') and script.endswith('.js')
+        assert f"src='{script}'" in html and f'href="{style}"' in html
+        assert 'https://cdn.example.com/lib.js' in html
+        assert 'href="admin.html"' in html and 'src="missing.png"' in html
+        assert assets.url_for('unknown.js') == 'unknown.js'
+    print("✅ HTML links are rewritten to fingerprinted URLs")
+
+def test_encoding_negotiation():
+    """br is preferred when installed, then gzip; otherwise the identity body is sent"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assets = _assets(tmp)
+
+        response = _response(assets, 'script.js', {'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()).decode('utf-8') == SCRIPT
+
+        response = _response(assets, 'script.js', {'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == ('br' if brotli is not None else 'gzip')
+
+        for headers in ({}, {'Accept-Encoding': 'deflate'}):
+            response = _response(assets, 'script.js', headers)
+            assert 'Content-Encoding' not in response.headers
+            assert response.get_data().decode('utf-8') == SCRIPT
+        assert response.headers['Vary'] == 'Accept-Encoding'
+
+        # Files too small to gain from compression are always identity
+        response = _response(assets, 'admin.html', {'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+    print("✅ Accept-Encoding selects the precompressed variant")
+
+def test_etags_and_revalidation():
+    """Each encoding has its own ETag, and a matching If-None-Match answers 304"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assets = _assets(tmp)
+        identity = _response(assets, 'script.js').get_etag()[0]
+        gzipped = _response(assets, 'script.js', {'Accept-Encoding': 'gzip'}).get_etag()[0]
+        assert identity != gzipped
+
+        response = _response(assets, 'script.js', {'Accept-Encoding': 'gzip', 'If-None-Match': f'"{gzipped}"'})
+        assert response.status_code == 304 and response.get_data() == b''
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        # The identity ETag does not validate the gzip variant
+        response = _response(assets, 'script.js', {'Accept-Encoding': 'gzip', 'If-None-Match': f'"{identity}"'})
+        assert response.status_code == 200
+    print("✅ ETags revalidate with 304")
+
+def test_immutable_only_for_hashed_urls():
+    """Current hashed URLs are cached forever; plain and outdated hashed URLs are revalidated"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assets = _assets(tmp)
+        hashed = assets.url_for('script.js')
+        assert _response(assets, hashed).headers['Cache-Control'] == IMMUTABLE
+        assert _response(assets, 'script.js').headers['Cache-Control'] == REVALIDATE
+
+        response = _response(assets, 'script.000000000000.js')
+        assert response.headers['Cache-Control'] == REVALIDATE
+        assert response.get_data().decode('utf-8') == SCRIPT
+        assert _response(assets, 'nothing.000000000000.js') is None
+    print("✅ Only current fingerprinted URLs are immutable")
+
+def main():
+    print("=== Static Assets Test ===")
+    test_html_references_fingerprinted()
+    test_encoding_negotiation()
+    test_etags_and_revalidation()
+    test_immutable_only_for_hashed_urls()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for ETag revalidation of /api/user-stats
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_ENV'] = 'testing'
+
+import app as server
+
+def _client():
+    server.init_db()
+    return server.app.test_client()
+
+def _stats(client, user_id, query='', etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    return client.get(f'/api/user-stats/{user_id}{query}', headers=headers)
+
+def _etag(client, user_id, query=''):
+    response = _stats(client, user_id, query)
+    assert response.status_code == 200
+    return response.get_etag()[0], response.get_json()
+
+def test_etag_follows_stats_version():
+    """Login, progress and names writes each bump stats_version and so the ETag"""
+    client = _client()
+    user = client.post('/api/create-user').get_json()
+    user_id = user['user_id']
+
+    session = client.post('/api/login', json={'library_id': user['library_id']}).get_json()
+    server.access_buffer.flush()
+    before, _ = _etag(client, user_id)
+
+    # A second login resumes the session, so only the buffered access write changes stats
+    assert client.post('/api/login', json={'library_id': user['library_id']}).get_json()['resumed']
+    server.access_buffer.flush()
+    after_login, payload = _etag(client, user_id)
+    assert after_login != before and payload['user']['access_count'] == 2
+
+    client.post('/api/update-session', json={'session_id': session['session_id'], 'pages_read': 5})
+    server.progress_buffer.flush()
+    after_progress, payload = _etag(client, user_id)
+    assert after_progress != after_login
+    assert payload['session_stats']['total_pages_read'] == 5
+
+    client.post('/api/save-names', json={'user_id': user_id, 'female': 'Asha', 'male': 'Ravi'})
+    after_names, payload = _etag(client, user_id)
+    assert after_names != after_progress
+    assert [n['female_name'] for n in payload['names_used']] == ['Asha']
+    print("✅ ETags change whenever stats_version is bumped")
+
+def test_matching_etag_returns_304():
+    """A current If-None-Match answers 304 with no body; a stale one gets the new stats"""
+    client = _client()
+    user_id = client.post('/api/create-user').get_json()['user_id']
+    etag, _ = _etag(client, user_id)
+
+    response = _stats(client, user_id, etag=etag)
+    assert response.status_code == 304 and response.data == b''
+    assert response.get_etag()[0] == etag
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    client.post('/api/save-names', json={'user_id': user_id, 'female': 'Mira', 'male': 'Dev'})
+    response = _stats(client, user_id, etag=etag)
+    assert response.status_code == 200 and response.get_etag()[0] != etag
+    assert _stats(client, 'no-such-user').status_code == 404
+    print("✅ Matching ETags answer 304")
+
+def test_etag_varies_with_names_page():
+    """Each names_offset/names_limit page has its own ETag"""
+    client = _client()
+    user_id = client.post('/api/create-user').get_json()['user_id']
+    for female in ('Asha', 'Mira', 'Lena'):
+        client.post('/api/save-names', json={'user_id': user_id, 'female': female, 'male': 'Ravi'})
+
+    default, payload = _etag(client, user_id)
+    offset, offset_payload = _etag(client, user_id, '?names_offset=1')
+    limit, limit_payload = _etag(client, user_id, '?names_limit=1')
+    assert len({default, offset, limit}) == 3
+    assert len(payload['names_used']) == 3 and len(offset_payload['names_used']) == 2
+    assert len(limit_payload['names_used']) == 1 and limit_payload['names_pagination']['has_more']
+
+    # An ETag validates only the page it was issued for
+    assert _stats(client, user_id, '?names_offset=1', etag=offset).status_code == 304
+    assert _stats(client, user_id, '?names_limit=1', etag=offset).status_code == 200
+    print("✅ ETags differ by names offset and limit")
+
+def main():
+    print("=== User Stats ETag Test ===")
+    test_etag_follows_stats_version()
+    test_matching_etag_returns_304()
+    test_etag_varies_with_names_page()
+
+if __name__ == "__main__":
+    main()
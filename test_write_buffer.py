@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the session progress and login access write-behind buffers
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import ConnectionPool
+from write_buffer import SessionProgressBuffer, UserAccessBuffer, WriteBehindBuffer
+
+def make_pool():
+    pool = ConnectionPool(':memory:')
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE user_sessions (id INTEGER PRIMARY KEY, pages_read INTEGER DEFAULT 0)')
+        conn.executemany('INSERT INTO user_sessions (id) VALUES (?)', [(1,), (2,)])
+        conn.commit()
+    return pool
+
+def test_latest_value_per_session_in_one_commit():
+    """Many heartbeats collapse into a single batched transaction"""
+    pool = make_pool()
+    buffer = SessionProgressBuffer(pool.connection, flush_interval=60)
+    commits = []
+    with pool.connection() as conn:
+        conn.set_trace_callback(lambda sql: commits.append(sql) if sql == 'COMMIT' else None)
+
+    for page in range(1, 11):
+        buffer.record(1, page)
+    buffer.record(2, 4)
+    assert buffer.stats()['pending'] == 2
+
+    assert buffer.flush() == 2
+    assert len(commits) == 1
+    with pool.connection() as conn:
+        rows = dict(conn.execute('SELECT id, pages_read FROM user_sessions').fetchall())
+    assert rows == {1: 10, 2: 4}
+    buffer.stop()
+    pool.close_all()
+    print("✅ Heartbeats coalesced into one commit")
+
+def test_pop_and_stop_flush():
+    """Popped values skip the buffer and stop() flushes the rest"""
+    pool = make_pool()
+    buffer = SessionProgressBuffer(pool.connection, flush_interval=60)
+    buffer.record(1, 7)
+    buffer.record(2, 3)
+
+    assert buffer.pop(1) == 7
+    assert buffer.pop(1) is None
+
+    buffer.stop()
+    with pool.connection() as conn:
+        rows = dict(conn.execute('SELECT id, pages_read FROM user_sessions').fetchall())
+    assert rows == {1: 0, 2: 3}
+    pool.close_all()
+    print("✅ Pending progress flushed at shutdown")
+
+def test_logins_accumulate():
+    """Login increments add up per user and keep the latest access time"""
+    pool = ConnectionPool(':memory:')
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE users (id TEXT PRIMARY KEY, last_access DATETIME, access_count INTEGER DEFAULT 0)')
+        conn.executemany('INSERT INTO users (id, last_access, access_count) VALUES (?, ?, ?)',
+                         [('u1', '2024-01-01 00:00:00', 5), ('u2', None, 0)])
+        conn.commit()
+
+    buffer = UserAccessBuffer(pool.connection, flush_interval=60)
+    buffer.record('u1', (1, '2024-03-01 10:00:00'))
+    buffer.record('u1', (1, '2024-03-01 09:00:00'))
+    buffer.record('u2', (1, '2024-03-02 08:00:00'))
+    assert buffer.peek('u1') == (2, '2024-03-01 10:00:00')
+
+    assert buffer.flush() == 2
+    with pool.connection() as conn:
+        rows = {r[0]: (r[1], r[2]) for r in conn.execute('SELECT id, access_count, last_access FROM users')}
+    assert rows == {'u1': (7, '2024-03-01 10:00:00'), 'u2': (1, '2024-03-02 08:00:00')}
+    buffer.stop()
+    pool.close_all()
+    print("✅ Logins coalesced per user")
+
+def test_restore_keeps_newer_values():
+    """Restored values never overwrite newer ones; additive buffers keep both"""
+    pool = make_pool()
+    buffer = SessionProgressBuffer(pool.connection, flush_interval=60)
+    buffer.record(1, 5)
+    popped = buffer.pop(1)
+    buffer.record(1, 9)
+    buffer.restore(1, popped)
+    buffer.restore(2, 4)
+    assert buffer.peek(1) == 9 and buffer.peek(2) == 4
+    buffer.stop()
+    pool.close_all()
+
+    logins = UserAccessBuffer(make_pool().connection, flush_interval=60)
+    logins.record('u1', (1, '2024-03-01 10:00:00'))
+    popped = logins.pop('u1')
+    logins.record('u1', (1, '2024-03-01 09:00:00'))
+    logins.restore('u1', popped)
+    assert logins.peek('u1') == (2, '2024-03-01 10:00:00')
+    print("✅ Restored values merge under newer ones")
+
+def test_base_buffer_is_abstract():
+    """A buffer without params() cannot be created"""
+    try:
+        WriteBehindBuffer(make_pool().connection)
+        assert False, 'abstract buffer instantiated'
+    except TypeError:
+        pass
+    print("✅ Buffers must define their statement parameters")
+
+def main():
+    print("=== Write Buffer Test ===")
+    test_latest_value_per_session_in_one_commit()
+    test_pop_and_stop_flush()
+    test_logins_accumulate()
+    test_restore_keeps_newer_values()
+    test_base_buffer_is_abstract()
+
+if __name__ == "__main__":
+    main()
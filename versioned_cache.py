@@ -0,0 +1,51 @@
+"""
+Bounded LRU cache whose entries are tagged with a version number.
+
+Writers never touch the cache directly: they bump a version counter stored
+alongside the data, and readers only accept an entry whose version matches
+the current one. Stale entries are simply replaced on the next read.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """LRU of (version, value) pairs with hit/miss accounting"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """Return the cached value for key if it was stored at this version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters in the same shape as the page render cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+            }
@@ -0,0 +1,166 @@
+"""
+Write-behind buffers that coalesce hot-path UPDATEs into batched commits.
+
+Each buffer keeps only the latest value per key in memory and a background
+thread flushes everything with a single ``executemany`` transaction when the
+flush interval elapses or the number of pending keys reaches a threshold.
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(ABC):
+    """Coalesce keyed writes in memory and flush them in batches
+
+    Subclasses set ``sql`` and implement ``params``.
+    """
+
+    # Parameterised statement executed once per pending key
+    sql = None
+
+    def __init__(self, connection_factory, flush_interval=2.0, max_pending=500):
+        self.connection_factory = connection_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Held while a batch is being written so pop() never races a flush
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failed_flushes = 0
+
+    def merge(self, old, new):
+        """Combine a new value with the one already pending for the same key"""
+        return new
+
+    @abstractmethod
+    def params(self, key, value):
+        """Statement parameters for one pending entry"""
+
+    def record(self, key, value):
+        """Buffer a write; the caller never waits on disk"""
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(self._pending[key], value)
+            self._pending[key] = value
+            pending = len(self._pending)
+        self._ensure_started()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def restore(self, key, value):
+        """Put back a value taken by pop() or a failed flush, merged under anything newer
+
+        A value recorded for the key since it was taken is newer, so it is
+        merged on top rather than overwritten.
+        """
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(value, self._pending[key])
+            self._pending[key] = value
+        self._ensure_started()
+
+    def peek(self, key):
+        """Return the value waiting to be flushed for a key, if any"""
+        with self._lock:
+            return self._pending.get(key)
+
+    def pop(self, key):
+        """Remove and return a pending value so the caller can write it itself"""
+        with self._flush_lock:
+            with self._lock:
+                return self._pending.pop(key, None)
+
+    def flush(self):
+        """Write every pending entry in one transaction; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            try:
+                with self.connection_factory() as conn:
+                    conn.executemany(self.sql, [self.params(k, v) for k, v in batch.items()])
+                    conn.commit()
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"{type(self).__name__} flush of {len(batch)} rows failed: {e}")
+                # Put the batch back under any newer values that arrived meanwhile
+                for key, value in batch.items():
+                    self.restore(key, value)
+                return 0
+
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            return len(batch)
+
+    def _ensure_started(self):
+        if self._thread is None and not self._stopping.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=type(self).__name__, daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still pending"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.flush_interval, 1.0) * 2)
+        self.flush()
+
+    def stats(self):
+        """Buffer depth and flush counters"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'failed_flushes': self.failed_flushes,
+        }
+
+
+class SessionProgressBuffer(WriteBehindBuffer):
+    """Latest pages_read per session, flushed to user_sessions in batches"""
+
+    sql = 'UPDATE user_sessions SET pages_read = ? WHERE id = ?'
+
+    def params(self, session_id, pages_read):
+        return (pages_read, session_id)
+
+
+class UserAccessBuffer(WriteBehindBuffer):
+    """Login count increments and latest access time per user, flushed to users in batches"""
+
+    sql = '''
+        UPDATE users
+        SET access_count = access_count + ?, last_access = MAX(COALESCE(last_access, ?), ?)
+        WHERE id = ?
+    '''
+
+    def merge(self, old, new):
+        return (old[0] + new[0], max(old[1], new[1]))
+
+    def params(self, user_id, value):
+        logins, accessed_at = value
+        return (logins, accessed_at, accessed_at, user_id)
@@ -0,0 +1,18 @@
+"""
+Production WSGI entry point.
+
+Serve with gunicorn, which picks up gunicorn.conf.py from this directory:
+
+    gunicorn
+
+The schema is migrated once by the gunicorn master before workers fork,
+so importing this module never touches the schema.
+"""
+
+import os
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from app import app  # noqa: E402
+
+application = app